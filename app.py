@@ -13,18 +13,27 @@ Desarrollado para el concurso "Hack the Track" 2024
 """
 
 import dash
-from dash import dcc, html, Input, Output, State, callback_context
+from dash import dcc, html, Input, Output, State, ALL, Patch, callback_context
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 import json
 import pickle
+import uuid
 from pathlib import Path
-import base64
-import io
 from datetime import datetime, timedelta
 
+from decimation import PIXEL_BUDGET, DecimationCache, decimate
+from ml_inference import PitDecisionModel
+from playback_clock import RaceClock, advance, speed_label, stop_clock
+from race_library import RaceLibrary
+from telemetry_store import TelemetryStore
+from track_geometry import TrackGeometry
+from upload_stream import register_upload_routes, take_ingested, upload_area
+from yellow_flags import YellowFlagIndex, detect_yellow_flags
+
 # ============================================================================
 # CONFIGURACIÓN
 # ============================================================================
@@ -32,6 +41,9 @@ from datetime import datetime, timedelta
 PROJECT_ROOT = Path(__file__).parent.parent
 MODELS_PATH = PROJECT_ROOT / "models"
 
+# Directorio para archivos subidos (se escriben a disco por bloques)
+TEMP_DIR = Path(__file__).parent / "temp"
+
 # Cargar modelos ML
 model_file = MODELS_PATH / "gradient_boosting_pit_decision.pkl"
 encoders_file = MODELS_PATH / "label_encoders.pkl"
@@ -59,6 +71,11 @@ except Exception as e:
     label_encoders = None
     feature_columns = None
 
+# Inferencia por lotes con caché por (yellow flag, vehículo)
+pit_model = None
+if ml_model is not None:
+    pit_model = PitDecisionModel(ml_model, label_encoders, feature_columns, circuit='barber')
+
 # ============================================================================
 # INICIALIZAR APP
 # ============================================================================
@@ -71,6 +88,12 @@ app = dash.Dash(
 
 server = app.server
 
+# Subida por bloques directo a TEMP_DIR (sin base64)
+register_upload_routes(server, TEMP_DIR)
+
+# Carreras de sample_data/ con caché Arrow memory-mapped en TEMP_DIR
+race_library = RaceLibrary(Path(__file__).parent / "sample_data", TEMP_DIR / "race_cache")
+
 # ============================================================================
 # VARIABLES GLOBALES PARA ESTADO
 # ============================================================================
@@ -88,175 +111,74 @@ race_data = {
 # DataFrame global para evitar deserialización repetida
 telemetry_df_global = None
 
-# ============================================================================
-# FUNCIONES AUXILIARES
-# ============================================================================
-
-def parse_uploaded_file(contents, filename):
-    """Parse archivo subido (CSV o Parquet)"""
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-
-    try:
-        if filename.endswith('.csv'):
-            df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
-        elif filename.endswith('.parquet'):
-            df = pd.read_parquet(io.BytesIO(decoded))
-        else:
-            return None
-
-        # Validar columnas requeridas
-        required_cols = ['timestamp', 'vehicle_id', 'telemetry_name', 'telemetry_value']
-        if not all(col in df.columns for col in required_cols):
-            return None
-
-        # Convertir timestamp
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.sort_values('timestamp').reset_index(drop=True)
+# Telemetría pivotada por vehículo × canal (construida una vez al cargar)
+telemetry_store_global = None
 
-        return df
-    except Exception as e:
-        print(f"Error parsing file: {e}")
-        return None
-
-
-def detect_yellow_flags_realtime(telemetry_df, speed_threshold=50):
-    """Detecta períodos de Yellow Flag en telemetría completa"""
-    speed_data = telemetry_df[telemetry_df['telemetry_name'] == 'speed'].copy()
-
-    if len(speed_data) == 0:
-        return []
-
-    # Agrupar por ventanas de 5 segundos
-    speed_data['time_window'] = speed_data['timestamp'].dt.floor('5S')
-    avg_speed = speed_data.groupby('time_window')['telemetry_value'].mean()
-
-    # Detectar períodos bajo threshold
-    yellow_periods = []
-    in_yellow = False
-    yellow_start = None
-
-    for time_window, speed in avg_speed.items():
-        if speed < speed_threshold and not in_yellow:
-            in_yellow = True
-            yellow_start = time_window
-        elif speed >= speed_threshold and in_yellow:
-            yellow_end = time_window
-            duration = (yellow_end - yellow_start).total_seconds()
+# Yellow Flags de la carrera como índice de intervalos (búsqueda binaria por tick)
+yellow_index_global = None
 
-            if duration >= 30:  # Mínimo 30 segundos
-                yellow_periods.append({
-                    'start': yellow_start,
-                    'end': yellow_end,
-                    'duration': duration
-                })
+# Líneas GPS simplificadas y posiciones por vehículo (mapa)
+track_geometry_global = None
 
-            in_yellow = False
-            yellow_start = None
+# Ventanas de telemetría decimadas para las gráficas (caché de la carrera)
+decimation_cache_global = None
 
-    return yellow_periods
+# Fila <-> tiempo de carrera para el reloj de reproducción
+race_clock_global = None
 
+# Metadatos de la carrera (yellow flags, vehículos, registros). El dcc.Store
+# 'race-data-store' solo lleva el handle {'race': id}: no viaja en cada tick
+race_summary_global = None
 
-def predict_pit_decision(yellow_flag_data, circuit='barber'):
-    """Predice decisión de pit usando el modelo ML"""
-    if ml_model is None:
-        return None
+# ============================================================================
+# FUNCIONES AUXILIARES
+# ============================================================================
 
-    try:
-        # Crear features
-        yellow_duration = yellow_flag_data['duration']
-        min_speed = yellow_flag_data['min_speed']
-        avg_speed = yellow_flag_data['avg_speed']
-        speed_variance = avg_speed - min_speed
-
-        is_long_yellow = 1 if yellow_duration > 300 else 0
-        is_short_yellow = 1 if yellow_duration < 60 else 0
-        very_low_speed = 1 if avg_speed < 10 else 0
-
-        # Encode circuit
-        circuit_encoded = label_encoders['circuit'].transform([circuit])[0]
-        race_encoded = 0  # Default
-
-        # Crear array de features en el orden correcto
-        features = [
-            yellow_duration,
-            min_speed,
-            avg_speed,
-            speed_variance,
-            is_long_yellow,
-            is_short_yellow,
-            very_low_speed,
-            circuit_encoded,
-            race_encoded
-        ]
-
-        X = pd.DataFrame([features], columns=feature_columns)
-        prediction = ml_model.predict(X)[0]
-        proba = ml_model.predict_proba(X)[0]
-
-        return {
-            'decision': 'PIT' if prediction == 1 else 'NO PIT',
-            'confidence': max(proba) * 100,
-            'pit_probability': proba[1] * 100
-        }
-    except Exception as e:
-        print(f"Error predicting: {e}")
+def race_summary(race_handle):
+    """Metadatos de la carrera del handle de 'race-data-store' (None si no es la carrera cargada)"""
+    if race_handle is None or race_summary_global is None or race_handle.get('race') != race_summary_global['race']:
         return None
+    return race_summary_global
 
 
-def create_track_map(telemetry_df, current_index=0, yellow_flags=[]):
-    """Crea mapa GPS del circuito con posición actual"""
-    gps_data = telemetry_df[telemetry_df['telemetry_name'].isin(['latitude', 'longitude'])].copy()
-
-    if len(gps_data) == 0:
-        return go.Figure()
-
-    # Pivot para obtener lat/lon por timestamp
-    gps_pivot = gps_data.pivot_table(
-        index=['timestamp', 'vehicle_id'],
-        columns='telemetry_name',
-        values='telemetry_value'
-    ).reset_index()
-
-    if 'latitude' not in gps_pivot.columns or 'longitude' not in gps_pivot.columns:
+def create_track_map(geometry, current_ns):
+    """Figura base del mapa GPS: líneas del circuito (fijas) y un marcador por vehículo"""
+    if geometry is None or len(geometry) == 0:
         return go.Figure()
 
     fig = go.Figure()
 
-    # Línea de carrera completa (todos los vehículos)
-    for vehicle_id in gps_pivot['vehicle_id'].unique():
-        vehicle_gps = gps_pivot[gps_pivot['vehicle_id'] == vehicle_id]
-
+    # Línea de carrera completa (todos los vehículos), simplificada al cargar la carrera
+    for vehicle_id in geometry.vehicles:
+        lat, lon = geometry.lines[vehicle_id]
         fig.add_trace(go.Scattermapbox(
-            lat=vehicle_gps['latitude'],
-            lon=vehicle_gps['longitude'],
+            lat=lat,
+            lon=lon,
             mode='lines',
             line=dict(width=1, color='rgba(100, 100, 100, 0.3)'),
             name=f'Vehicle {vehicle_id} - Track',
             showlegend=False
         ))
 
-    # Posición actual de cada vehículo
-    current_time = telemetry_df['timestamp'].iloc[current_index]
-    current_gps = gps_pivot[gps_pivot['timestamp'] <= current_time].groupby('vehicle_id').tail(1)
-
-    for _, row in current_gps.iterrows():
+    # Posición actual de cada vehículo (los ticks siguientes solo cambian lat/lon)
+    positions = geometry.positions(current_ns)
+    for vehicle_id in geometry.vehicles:
+        lat, lon = positions.get(vehicle_id, (None, None))
         fig.add_trace(go.Scattermapbox(
-            lat=[row['latitude']],
-            lon=[row['longitude']],
+            lat=[lat] if lat is not None else [],
+            lon=[lon] if lon is not None else [],
             mode='markers',
             marker=dict(size=12, color='red'),
-            name=f"Vehicle {row['vehicle_id']}",
-            text=f"Vehicle {row['vehicle_id']}"
+            name=f"Vehicle {vehicle_id}",
+            text=f"Vehicle {vehicle_id}"
         ))
 
     # Configurar mapa
-    if len(current_gps) > 0:
-        center_lat = current_gps['latitude'].mean()
-        center_lon = current_gps['longitude'].mean()
+    if len(positions) > 0:
+        center_lat = np.nanmean([lat for lat, _ in positions.values()])
+        center_lon = np.nanmean([lon for _, lon in positions.values()])
     else:
-        center_lat = gps_pivot['latitude'].mean()
-        center_lon = gps_pivot['longitude'].mean()
+        center_lat, center_lon = geometry.center
 
     fig.update_layout(
         mapbox=dict(
@@ -273,37 +195,81 @@ def create_track_map(telemetry_df, current_index=0, yellow_flags=[]):
     return fig
 
 
-def create_telemetry_chart(telemetry_df, current_index, telemetry_type='speed'):
-    """Crea gráfico de telemetría (velocidad, RPM, etc.)"""
-    data = telemetry_df[telemetry_df['telemetry_name'] == telemetry_type].copy()
+def update_track_markers(geometry, current_ns):
+    """Patch del mapa con solo la posición de los marcadores (la figura base ya está en el navegador)"""
+    if geometry is None or len(geometry) == 0:
+        return dash.no_update
+
+    patched = Patch()
+    positions = geometry.positions(current_ns)
+    first_marker = len(geometry.vehicles)  # los marcadores van después de las líneas
+
+    for k, vehicle_id in enumerate(geometry.vehicles):
+        lat, lon = positions.get(vehicle_id, (None, None))
+        patched['data'][first_marker + k]['lat'] = [lat] if lat is not None else []
+        patched['data'][first_marker + k]['lon'] = [lon] if lon is not None else []
+
+    return patched
+
+
+# Ventana de las gráficas de telemetría y umbral para usar WebGL (Scattergl)
+TELEMETRY_WINDOW_SECONDS = 60
+WEBGL_MIN_POINTS = 2000
+
+# Canales graficados por defecto
+DEFAULT_CHART_CHANNELS = ['speed', 'throttle']
+
+
+def chart_vehicles(store, telemetry_type):
+    """Vehículos con muestras del canal (un trace por vehículo, en orden fijo)"""
+    return [vehicle_id for vehicle_id in store.vehicles if len(store.series(vehicle_id, telemetry_type)) > 0]
+
 
-    if len(data) == 0:
+def window_points(series, window_seconds=TELEMETRY_WINDOW_SECONDS):
+    """Puntos de la ventana según la frecuencia media de la serie, a lo sumo PIXEL_BUDGET (maxPoints)"""
+    if len(series) < 2:
+        return max(1, len(series))
+    duration = (series.timestamps[-1] - series.timestamps[0]) / 1e9
+    if duration <= 0:
+        return min(len(series), PIXEL_BUDGET)
+    return min(int(np.ceil(len(series) / duration * window_seconds)), PIXEL_BUDGET)
+
+
+def create_telemetry_chart(store, current_index, telemetry_type='speed', cache=None):
+    """Crea gráfico de telemetría (velocidad, RPM, etc.) con la ventana hasta current_index, decimada"""
+    if telemetry_type not in store.channels:
         return go.Figure()
 
     fig = go.Figure()
 
-    current_time = telemetry_df['timestamp'].iloc[current_index]
+    current_ns = store.timestamp_at(current_index)
 
-    # Mostrar últimos 60 segundos
-    time_window_start = current_time - timedelta(seconds=60)
-    windowed_data = data[(data['timestamp'] >= time_window_start) & (data['timestamp'] <= current_time)]
+    # Mostrar últimos 60 segundos (ventana por vehículo con searchsorted)
+    time_window_start = current_ns - int(timedelta(seconds=TELEMETRY_WINDOW_SECONDS).total_seconds() * 1e9)
+    vehicles = chart_vehicles(store, telemetry_type)
 
-    for vehicle_id in windowed_data['vehicle_id'].unique():
-        vehicle_data = windowed_data[windowed_data['vehicle_id'] == vehicle_id]
+    # WebGL cuando la ventana completa tiene muchos puntos
+    total_points = sum(window_points(store.series(vehicle_id, telemetry_type)) for vehicle_id in vehicles)
+    trace_type = go.Scattergl if total_points >= WEBGL_MIN_POINTS else go.Scatter
 
-        fig.add_trace(go.Scatter(
-            x=vehicle_data['timestamp'],
-            y=vehicle_data['telemetry_value'],
+    # Un trace por vehículo (aunque todavía no tenga muestras): los ticks solo le agregan puntos
+    for vehicle_id in vehicles:
+        # Ventana reducida a PIXEL_BUDGET puntos (LTTB), cacheada por carrera
+        if cache is not None:
+            timestamps, values = cache.window(vehicle_id, telemetry_type, time_window_start, current_ns)
+        else:
+            window = store.series(vehicle_id, telemetry_type).between(time_window_start, current_ns)
+            timestamps, values = decimate(window.timestamps, window.values)
+        fig.add_trace(trace_type(
+            x=store.to_datetime(timestamps),
+            y=values,
             mode='lines',
             name=f'Vehicle {vehicle_id}',
             line=dict(width=2)
         ))
 
-    # Línea vertical en posición actual
-    fig.add_vline(x=current_time, line_dash="dash", line_color="red")
-
     fig.update_layout(
-        title=f'{telemetry_type.capitalize()} - Last 60s',
+        title=f'{telemetry_type.capitalize()} - Last {TELEMETRY_WINDOW_SECONDS}s',
         xaxis_title='Time',
         yaxis_title=telemetry_type.capitalize(),
         height=300,
@@ -317,6 +283,59 @@ def create_telemetry_chart(telemetry_df, current_index, telemetry_type='speed'):
     return fig
 
 
+def extend_telemetry_chart(store, previous_index, current_index, telemetry_type='speed'):
+    """
+    Muestras nuevas del canal entre dos ticks, para extendData de dcc.Graph.
+
+    Returns:
+        [datos, índices de trace, maxPoints] o None si no hay muestras nuevas
+    """
+    if telemetry_type not in store.channels:
+        return None
+
+    previous_ns = store.timestamp_at(previous_index)
+    current_ns = store.timestamp_at(current_index)
+    time_window_start = current_ns - int(timedelta(seconds=TELEMETRY_WINDOW_SECONDS).total_seconds() * 1e9)
+
+    xs, ys, indices, max_points = [], [], [], []
+    for trace_index, vehicle_id in enumerate(chart_vehicles(store, telemetry_type)):
+        series = store.series(vehicle_id, telemetry_type)
+        new_samples = series.between(max(previous_ns + 1, time_window_start), current_ns)
+        if len(new_samples) > 0:
+            # Presupuesto de puntos proporcional a la porción de ventana que cubre el tick
+            tick_fraction = (current_ns - max(previous_ns, time_window_start)) / (current_ns - time_window_start)
+            budget = max(2, int(np.ceil(PIXEL_BUDGET * tick_fraction)))
+            timestamps, values = decimate(new_samples.timestamps, new_samples.values, budget, method='minmax')
+            xs.append(store.to_datetime(timestamps))
+            ys.append(values)
+            indices.append(trace_index)
+            # maxPoints descarta lo que sale de la ventana
+            max_points.append(window_points(series))
+
+    if not indices:
+        return None
+    return [dict(x=xs, y=ys), indices, dict(x=max_points, y=max_points)]
+
+
+def stream_telemetry_charts(store, charts, cursor, current_index, cache=None):
+    """
+    Agregar a las gráficas solo las muestras nuevas desde el tick anterior (cursor).
+
+    Returns:
+        (extendData, figure) por gráfica y el nuevo cursor
+    """
+    unchanged = [dash.no_update] * len(charts)
+    channels = [chart['id']['channel'] for chart in charts]
+
+    if cursor is None or cursor > current_index:
+        # Reset o salto hacia atrás: redibujar la ventana completa
+        figures = [create_telemetry_chart(store, current_index, channel, cache) for channel in channels]
+        return unchanged, figures, current_index
+
+    extensions = [extend_telemetry_chart(store, cursor, current_index, channel) for channel in channels]
+    return [extension if extension is not None else dash.no_update for extension in extensions], unchanged, current_index
+
+
 # ============================================================================
 # LAYOUT
 # ============================================================================
@@ -326,6 +345,9 @@ app.layout = dbc.Container([
     dcc.Store(id='playback-state', data={'is_playing': False, 'current_index': 0}),
     dcc.Interval(id='playback-interval', interval=500, disabled=True),  # 500ms en lugar de 100ms
 
+    # Último índice enviado a las gráficas de telemetría (los ticks agregan desde ahí)
+    dcc.Store(id='telemetry-cursor'),
+
     # Header
     dbc.Row([
         dbc.Col([
@@ -340,8 +362,7 @@ app.layout = dbc.Container([
             dbc.Card([
                 dbc.CardHeader(html.H4("📁 Load Race Data")),
                 dbc.CardBody([
-                    dcc.Upload(
-                        id='upload-data',
+                    upload_area(
                         children=html.Div([
                             'Drag and Drop or ',
                             html.A('Select Telemetry File'),
@@ -357,8 +378,24 @@ app.layout = dbc.Container([
                             'borderRadius': '10px',
                             'textAlign': 'center',
                             'backgroundColor': '#333'
-                        },
-                        multiple=False
+                        }
+                    ),
+                    dbc.InputGroup([
+                        dcc.Dropdown(
+                            id='race-library-select',
+                            options=race_library.dropdown_options(),
+                            placeholder='Or choose a race from the server library...',
+                            style={'flex': '1', 'color': '#000'}
+                        ),
+                        dbc.Button("Load Race", id='btn-load-race', color='primary')
+                    ], className='mt-3'),
+                    dcc.Dropdown(
+                        id='race-library-vehicles',
+                        multi=True,
+                        disabled=True,
+                        placeholder='All vehicles (partitioned races only)',
+                        style={'color': '#000'},
+                        className='mt-2'
                     ),
                     html.Div(id='upload-status', className='mt-3')
                 ])
@@ -433,8 +470,16 @@ app.layout = dbc.Container([
             dbc.Card([
                 dbc.CardHeader(html.H4("📊 Live Telemetry")),
                 dbc.CardBody([
-                    dcc.Graph(id='telemetry-speed'),
-                    dcc.Graph(id='telemetry-throttle')
+                    dcc.Dropdown(
+                        id='telemetry-channels',
+                        options=[{'label': channel.capitalize(), 'value': channel} for channel in DEFAULT_CHART_CHANNELS],
+                        value=DEFAULT_CHART_CHANNELS,
+                        multi=True,
+                        placeholder='Channels to plot...',
+                        className='mb-2',
+                        style={'color': '#000'}
+                    ),
+                    html.Div(id='telemetry-charts')
                 ])
             ])
         ])
@@ -454,35 +499,66 @@ app.layout = dbc.Container([
 # CALLBACKS
 # ============================================================================
 
+@app.callback(
+    [Output('race-library-vehicles', 'options'),
+     Output('race-library-vehicles', 'value'),
+     Output('race-library-vehicles', 'disabled')],
+    Input('race-library-select', 'value')
+)
+def update_library_vehicles(race_id):
+    """Vehículos de la carrera elegida (solo carreras particionadas por vehículo)"""
+    vehicles = race_library.vehicles(race_id) if race_id else []
+    return [{'label': v, 'value': v} for v in vehicles], None, len(vehicles) == 0
+
+
 @app.callback(
     [Output('race-data-store', 'data'),
      Output('upload-status', 'children'),
      Output('playback-state', 'data', allow_duplicate=True)],
-    Input('upload-data', 'contents'),
-    State('upload-data', 'filename'),
+    [Input('chunked-upload-result', 'data'),
+     Input('btn-load-race', 'n_clicks')],
+    [State('race-library-select', 'value'),
+     State('race-library-vehicles', 'value')],
     prevent_initial_call=True
 )
-def load_race_data(contents, filename):
-    """Cargar archivo de telemetría"""
-    global telemetry_df_global
+def load_race_data(upload_result, load_clicks, race_id, vehicles):
+    """Cargar archivo de telemetría (subido por bloques o desde la biblioteca del servidor)"""
+    if callback_context.triggered_id == 'btn-load-race':
+        if race_id is None:
+            return None, "", {'is_playing': False, 'current_index': 0}
+        df, filename = race_library.load(race_id, vehicles)
+    else:
+        if upload_result is None:
+            return None, "", {'is_playing': False, 'current_index': 0}
+        df, filename = take_ingested(upload_result['upload_id'])
 
-    if contents is None:
-        return None, "", {'is_playing': False, 'current_index': 0}
+    return activate_race(df, filename)
 
-    df = parse_uploaded_file(contents, filename)
+
+def activate_race(df, filename):
+    """Dejar la carrera lista para visualizar (store y yellow flags)"""
+    global telemetry_df_global, telemetry_store_global, yellow_index_global, track_geometry_global, decimation_cache_global
+    global race_clock_global, race_summary_global
 
     if df is None:
         return None, dbc.Alert("Error: Invalid file format", color='danger'), {'is_playing': False, 'current_index': 0}
 
     # Detectar Yellow Flags
-    yellow_flags = detect_yellow_flags_realtime(df)
+    yellow_flags = detect_yellow_flags(df)
 
     # OPTIMIZACIÓN: Guardar DataFrame en variable global en lugar de JSON
     telemetry_df_global = df
-
-    # Guardar solo metadatos (NO el DataFrame completo)
-    race_data_json = {
-        'telemetry': 'loaded_in_memory',  # NO serializar a JSON
+    telemetry_store_global = TelemetryStore(df)
+    yellow_index_global = YellowFlagIndex(yellow_flags, store=telemetry_store_global)
+    track_geometry_global = TrackGeometry(telemetry_store_global)
+    decimation_cache_global = DecimationCache(telemetry_store_global)
+    race_clock_global = RaceClock(telemetry_store_global.timestamps)
+    if pit_model is not None:
+        pit_model.clear()
+
+    # Metadatos en el servidor; el navegador solo guarda el handle
+    race_summary_global = {
+        'race': uuid.uuid4().hex,
         'yellow_flags': yellow_flags,
         'total_records': len(df),
         'vehicles': df['vehicle_id'].unique().tolist(),
@@ -492,10 +568,10 @@ def load_race_data(contents, filename):
 
     status_msg = dbc.Alert([
         html.H5(f"✓ {filename} loaded successfully!", className='alert-heading'),
-        html.P(f"Records: {len(df):,} | Vehicles: {len(race_data_json['vehicles'])} | Yellow Flags: {len(yellow_flags)}")
+        html.P(f"Records: {len(df):,} | Vehicles: {len(race_summary_global['vehicles'])} | Yellow Flags: {len(yellow_flags)}")
     ], color='success')
 
-    return race_data_json, status_msg, {'is_playing': False, 'current_index': 0}
+    return {'race': race_summary_global['race']}, status_msg, {'is_playing': False, 'current_index': 0}
 
 
 @app.callback(
@@ -515,6 +591,9 @@ def control_playback(play_clicks, pause_clicks, reset_clicks, current_state):
 
     button_id = ctx.triggered[0]['prop_id'].split('.')[0]
 
+    # El reloj se vuelve a anclar en el primer tick después del botón
+    stop_clock(current_state)
+
     if button_id == 'btn-play':
         current_state['is_playing'] = True
     elif button_id == 'btn-pause':
@@ -526,87 +605,94 @@ def control_playback(play_clicks, pause_clicks, reset_clicks, current_state):
     return current_state
 
 
-@app.callback(
+# Activar/desactivar interval según estado de reproducción (en el navegador: sin request por tick)
+app.clientside_callback(
+    """
+    function(state) {
+        return !(state && state.is_playing);
+    }
+    """,
     Output('playback-interval', 'disabled'),
     Input('playback-state', 'data')
 )
-def toggle_interval(state):
-    """Activar/desactivar interval según estado de reproducción"""
-    return not state.get('is_playing', False)
-
-
-@app.callback(
-    Output('playback-state', 'data'),
-    Input('playback-interval', 'n_intervals'),
-    [State('playback-state', 'data'),
-     State('race-data-store', 'data'),
-     State('speed-slider', 'value')],
-    prevent_initial_call=True
-)
-def update_playback_position(n_intervals, state, race_data_json, speed):
-    """Actualizar posición de reproducción"""
-    if race_data_json is None or not state.get('is_playing', False):
-        return state
-
-    total_records = race_data_json['total_records']
-    current_index = state.get('current_index', 0)
-
-    # Incrementar índice según velocidad (ajustado para intervalo de 500ms)
-    increment = int(speed * 50)  # 50 registros por tick (500ms) = 100 registros/segundo
-    new_index = current_index + increment
-
-    if new_index >= total_records:
-        state['is_playing'] = False
-        state['current_index'] = total_records - 1
-    else:
-        state['current_index'] = new_index
-
-    return state
 
 
 @app.callback(
     [Output('track-map', 'figure'),
-     Output('telemetry-speed', 'figure'),
-     Output('telemetry-throttle', 'figure'),
      Output('playback-info', 'children'),
      Output('progress-bar', 'value'),
      Output('yellow-flag-status', 'children'),
-     Output('ml-predictions', 'children')],
-    Input('playback-state', 'data'),
-    State('race-data-store', 'data')
+     Output('ml-predictions', 'children'),
+     Output({'type': 'telemetry-chart', 'channel': ALL}, 'extendData'),
+     Output({'type': 'telemetry-chart', 'channel': ALL}, 'figure'),
+     Output('telemetry-cursor', 'data'),
+     Output('playback-state', 'data')],
+    [Input('playback-interval', 'n_intervals'),
+     Input('playback-state', 'data'),
+     Input('race-data-store', 'data')],
+    [State('telemetry-cursor', 'data'),
+     State('speed-slider', 'value'),
+     State('playback-interval', 'interval')]
 )
-def update_visualizations(state, race_data_json):
-    """Actualizar todas las visualizaciones"""
-    global telemetry_df_global
-
-    if race_data_json is None or telemetry_df_global is None:
+def update_visualizations(n_intervals, state, race_data_json, cursor, speed, interval_ms):
+    """
+    Tick de reproducción en un solo request: avanza el reloj (si lo disparó el
+    interval), mueve el mapa y agrega las muestras nuevas a las gráficas. El
+    nuevo playback-state sale en el mismo response.
+    """
+    global telemetry_df_global, telemetry_store_global, yellow_index_global, track_geometry_global
+
+    charts = callback_context.outputs_list[5]
+    unchanged_charts = [dash.no_update] * len(charts)
+    summary = race_summary(race_data_json)
+
+    if summary is None or telemetry_df_global is None or telemetry_store_global is None:
         empty_fig = go.Figure()
         empty_fig.update_layout(
             paper_bgcolor='#222',
             plot_bgcolor='#333',
             font=dict(color='white')
         )
-        return (empty_fig, empty_fig, empty_fig,
+        return (empty_fig,
                 "No data loaded", 0,
-                "No data", "No data")
+                "No data", "No data",
+                unchanged_charts, unchanged_charts, dash.no_update, dash.no_update)
 
     # OPTIMIZACIÓN: Usar DataFrame global en lugar de deserializar JSON
     df = telemetry_df_global
+    store = telemetry_store_global
+    triggered = set(callback_context.triggered_prop_ids)
+
+    # Tick del interval: avanzar la posición (tiempo real × velocidad, ver playback_clock)
+    new_state = dash.no_update
+    if 'playback-interval.n_intervals' in triggered:
+        if not state.get('is_playing', False):
+            raise PreventUpdate
+        state = new_state = advance(state, race_clock_global, speed, interval_ms)
 
     current_index = state.get('current_index', 0)
-    total_records = race_data_json['total_records']
+    total_records = summary['total_records']
 
-    # Mapa
-    track_fig = create_track_map(df, current_index, race_data_json['yellow_flags'])
+    # Mapa: figura completa al cargar la carrera (o la página); los ticks solo mueven los marcadores
+    current_ns = store.timestamp_at(current_index)
+    if triggered and triggered <= {'playback-interval.n_intervals', 'playback-state.data'}:
+        track_fig = update_track_markers(track_geometry_global, current_ns)
+    else:
+        track_fig = create_track_map(track_geometry_global, current_ns)
 
-    # Telemetría
-    speed_fig = create_telemetry_chart(df, current_index, 'speed')
-    throttle_fig = create_telemetry_chart(df, current_index, 'throttle')
+    # Gráficas: build_telemetry_charts las arma al cambiar de carrera; los ticks solo agregan
+    if 'race-data-store.data' in triggered:
+        chart_extensions, chart_figures, cursor = unchanged_charts, unchanged_charts, dash.no_update
+    else:
+        chart_extensions, chart_figures, cursor = stream_telemetry_charts(
+            store, charts, cursor, min(current_index, total_records - 1), decimation_cache_global)
 
-    # Info de reproducción
-    current_time = df['timestamp'].iloc[current_index]
-    elapsed = (current_time - df['timestamp'].min()).total_seconds()
-    total_duration = (df['timestamp'].max() - df['timestamp'].min()).total_seconds()
+    # Info de reproducción (df ordenado por timestamp: primera y última fila, sin recorrerlo)
+    timestamps = df['timestamp']
+    current_time = timestamps.iloc[current_index]
+    start_time = timestamps.iloc[0]
+    elapsed = (current_time - start_time).total_seconds()
+    total_duration = (timestamps.iloc[-1] - start_time).total_seconds()
 
     playback_info = html.Div([
         html.Strong(f"Current Time: {current_time.strftime('%H:%M:%S')}"),
@@ -614,20 +700,16 @@ def update_visualizations(state, race_data_json):
         f"Elapsed: {elapsed:.1f}s / {total_duration:.1f}s | Record: {current_index:,} / {total_records:,}"
     ])
 
-    progress = (current_index / total_records * 100) if total_records > 0 else 0
+    # Velocidad lograda vs pedida (solo mientras corre el reloj)
+    speed_text = speed_label(state)
+    if speed_text:
+        playback_info.children += [html.Br(), html.Small(speed_text)]
 
-    # Yellow Flag status
-    yellow_flags = race_data_json['yellow_flags']
-    in_yellow = False
-    current_yellow = None
+    progress = (current_index / total_records * 100) if total_records > 0 else 0
 
-    for yf in yellow_flags:
-        yf_start = pd.to_datetime(yf['start'])
-        yf_end = pd.to_datetime(yf['end'])
-        if yf_start <= current_time <= yf_end:
-            in_yellow = True
-            current_yellow = yf
-            break
+    # Yellow Flag status (índice de intervalos, búsqueda binaria)
+    current_yellow, _, yellow_key = yellow_index_global.active(store.timestamp_at(current_index))
+    in_yellow = current_yellow is not None
 
     if in_yellow:
         yellow_status = dbc.Alert([
@@ -638,22 +720,19 @@ def update_visualizations(state, race_data_json):
         yellow_status = dbc.Alert("🟢 Green Flag - Racing", color='success')
 
     # ML Predictions
-    if in_yellow and current_yellow and ml_model:
-        # Calcular speeds durante este yellow
-        yf_start = pd.to_datetime(current_yellow['start'])
-        yf_end = pd.to_datetime(current_yellow['end'])
-
-        yf_data = df[(df['timestamp'] >= yf_start) & (df['timestamp'] <= yf_end)]
-        speed_data = yf_data[yf_data['telemetry_name'] == 'speed']['telemetry_value']
+    if in_yellow and current_yellow and pit_model is not None:
+        # Speeds durante este yellow (precalculadas al cargar la carrera)
+        field_stats = current_yellow['field_stats']
 
-        if len(speed_data) > 0:
+        if field_stats['samples'] > 0:
             prediction_data = {
                 'duration': current_yellow['duration'],
-                'min_speed': speed_data.min(),
-                'avg_speed': speed_data.mean()
+                'min_speed': field_stats['min_speed'],
+                'avg_speed': field_stats['avg_speed']
             }
 
-            prediction = predict_pit_decision(prediction_data)
+            # Predicción para todo el campo (cacheada mientras dure la bandera)
+            prediction = pit_model.predict_batch(yellow_key, {'field': prediction_data})['field']
 
             if prediction:
                 ml_content = dbc.Alert([
@@ -669,7 +748,54 @@ def update_visualizations(state, race_data_json):
     else:
         ml_content = dbc.Alert("No Yellow Flag - No prediction needed", color='secondary')
 
-    return track_fig, speed_fig, throttle_fig, playback_info, progress, yellow_status, ml_content
+    return (track_fig, playback_info, progress, yellow_status, ml_content,
+            chart_extensions, chart_figures, cursor, new_state)
+
+
+@app.callback(
+    Output('telemetry-channels', 'options'),
+    Input('race-data-store', 'data')
+)
+def update_chart_channels(race_data_json):
+    """Canales de la carrera que se pueden graficar"""
+    if race_summary(race_data_json) is None or telemetry_store_global is None:
+        channels = DEFAULT_CHART_CHANNELS
+    else:
+        channels = telemetry_store_global.channels
+    return [{'label': channel.capitalize(), 'value': channel} for channel in channels]
+
+
+@app.callback(
+    [Output('telemetry-charts', 'children'),
+     Output('telemetry-cursor', 'data', allow_duplicate=True)],
+    [Input('race-data-store', 'data'),
+     Input('telemetry-channels', 'value')],
+    State('playback-state', 'data'),
+    prevent_initial_call='initial_duplicate'
+)
+def build_telemetry_charts(race_data_json, channels, state):
+    """Gráficas de los canales elegidos (se arman al cambiar carrera o canales; los ticks solo agregan muestras)"""
+    channels = channels or []
+    summary = race_summary(race_data_json)
+
+    if summary is None or telemetry_store_global is None:
+        empty_fig = go.Figure()
+        empty_fig.update_layout(
+            paper_bgcolor='#222',
+            plot_bgcolor='#333',
+            font=dict(color='white')
+        )
+        figures = [empty_fig for _ in channels]
+        cursor = None
+    else:
+        cursor = min(state.get('current_index', 0), summary['total_records'] - 1)
+        figures = [create_telemetry_chart(telemetry_store_global, cursor, channel, decimation_cache_global) for channel in channels]
+
+    graphs = [
+        dcc.Graph(id={'type': 'telemetry-chart', 'channel': channel}, figure=figure)
+        for channel, figure in zip(channels, figures)
+    ]
+    return graphs, cursor
 
 
 # ============================================================================
@@ -37,14 +37,24 @@ os.environ['PYTHON_EGG_CACHE'] = str(TEMP_DIR)
 print(f"[CONFIG] Temp files configured at: {TEMP_DIR}")
 
 import dash
-from dash import dcc, html, Input, Output, State, callback_context, dash_table
+from dash import dcc, html, Input, Output, State, ClientsideFunction, callback_context, dash_table
+from dash.development.base_component import Component
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 import pandas as pd
 import pickle
-import base64
-import io
+import uuid
 from datetime import datetime, timedelta
 
+from ml_inference import PitDecisionModel
+from playback_buffer import CHUNK_SECONDS, CHUNK_URL, register_playback_buffer
+from playback_clock import advance, speed_label, stop_clock
+from playback_stream import MAX_SPEED, STREAM_HZ, STREAM_URL, register_playback_stream, stop_stream
+from race_library import RaceLibrary
+from race_sessions import LoadedRace, RaceRegistry
+from shared_races import SharedRaceStore
+from upload_stream import register_upload_routes, take_ingested, upload_area
+
 # ============================================================================
 # CONFIGURACIÓN
 # ============================================================================
@@ -55,9 +65,6 @@ MODELS_PATH = PROJECT_ROOT / "models"
 # Cargar modelos ML
 ml_model = None
 label_encoders = None
-
-# Variable global para mantener la última recomendación ML
-last_ml_recommendation = None
 feature_columns = None
 
 try:
@@ -82,6 +89,11 @@ except Exception as e:
     print(f"[INFO] ML model not available: {e}")
     ml_model = None
 
+# Inferencia por lotes con caché por (yellow flag, vehículo); cada carrera usa un fork
+pit_model = None
+if ml_model is not None and label_encoders is not None and feature_columns is not None:
+    pit_model = PitDecisionModel(ml_model, label_encoders, feature_columns, circuit='indianapolis')
+
 # ============================================================================
 # INICIALIZAR APP
 # ============================================================================
@@ -94,71 +106,64 @@ app = dash.Dash(
 
 server = app.server
 
-# DataFrame global
-telemetry_df_global = None
+# Subida por bloques directo a TEMP_DIR (sin base64)
+register_upload_routes(server, TEMP_DIR)
 
-# ============================================================================
-# FUNCIONES AUXILIARES
-# ============================================================================
+# Carreras de sample_data/ con caché Arrow memory-mapped en TEMP_DIR
+race_library = RaceLibrary(Path(__file__).parent / "sample_data", TEMP_DIR / "race_cache")
 
-def parse_uploaded_file(contents, filename):
-    """Parse archivo subido"""
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
+# Carreras cargadas por sesión (DataFrame, store, motor, índices), compartidas
+# entre sesiones con la misma carrera y desalojadas LRU según RACE_MEMORY_BUDGET_MB.
+# Publicadas memory-mapped en TEMP_DIR: todos los workers de gunicorn usan la misma copia
+race_registry = RaceRegistry(shared=SharedRaceStore(TEMP_DIR / "shared_races"), pit_model=pit_model)
 
-    try:
-        if filename.endswith('.parquet'):
-            df = pd.read_parquet(io.BytesIO(decoded))
-        elif filename.endswith('.csv'):
-            df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
-        else:
-            return None
 
-        # Validar columnas
-        required_cols = ['timestamp', 'vehicle_id', 'telemetry_name', 'telemetry_value']
-        if not all(col in df.columns for col in required_cols):
-            return None
+def session_race(race_handle, session_id):
+    """
+    RaceSession de la sesión si su carrera es la del handle de 'race-data-store'.
+
+    El dcc.Store solo lleva {'race': race_key}; los metadatos (yellow flags,
+    vehículos, registros) se resuelven aquí desde race_registry (LoadedRace.summary)
+    y no viajan en cada tick.
+    """
+    if race_handle is None:
+        return None
+    session = race_registry.get(session_id)
+    if session is None or session.race_key != race_handle.get('race'):
+        return None
+    return session
 
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.sort_values('timestamp').reset_index(drop=True)
 
-        return df
-    except Exception as e:
-        print(f"Error parsing file: {e}")
+def current_race(session_id):
+    """Carrera de la sesión para el stream y los chunks (None si no hay carrera)"""
+    session = race_registry.get(session_id)
+    if session is None:
         return None
+    race = session.race
+    return race.engine, race.store, race.yellow_index, race.clock
 
 
-def detect_yellow_flags(df):
-    """Detecta Yellow Flags"""
-    speed_data = df[df['telemetry_name'] == 'speed'].copy()
-    if len(speed_data) == 0:
-        return []
-
-    speed_data['time_window'] = speed_data['timestamp'].dt.floor('5S')
-    avg_speed = speed_data.groupby('time_window')['telemetry_value'].mean()
-
-    yellow_periods = []
-    in_yellow = False
-    yellow_start = None
-
-    for time_window, speed in avg_speed.items():
-        if speed < 50 and not in_yellow:
-            in_yellow = True
-            yellow_start = time_window
-        elif speed >= 50 and in_yellow:
-            yellow_end = time_window
-            duration = (yellow_end - yellow_start).total_seconds()
-
-            if duration >= 30:
-                yellow_periods.append({
-                    'start': yellow_start,
-                    'end': yellow_end,
-                    'duration': duration
-                })
+# Reproducción con push del servidor (SSE) sobre el mismo servidor Flask
+# (posición y stop junto a las sesiones compartidas: pausa puede caer en otro worker)
+register_playback_stream(server, current_race, race_registry.shared.directory / "streams")
 
-            in_yellow = False
+# Chunks para el buffer de reproducción en el navegador
+register_playback_buffer(server, current_race)
 
-    return yellow_periods
+# ============================================================================
+# FUNCIONES AUXILIARES
+# ============================================================================
+
+def estimate_tire_wear(rolling_stats, vehicle_id, current_index, elapsed, total_duration):
+    """Desgaste estimado: tiempo + intensidad de frenado + aceleraciones (medias acumuladas)"""
+    brake_mean = rolling_stats.mean_upto(vehicle_id, 'brake_front', current_index)
+    acc_abs_mean = rolling_stats.mean_upto(vehicle_id, 'acc_x', current_index, absolute=True)
+
+    time_factor = (elapsed / total_duration) * 100
+    brake_factor = (brake_mean / 100) * 30 if brake_mean is not None else 0
+    acc_factor = (acc_abs_mean / 10) * 20 if acc_abs_mean is not None else 0
+
+    return min(100, time_factor + brake_factor + acc_factor)
 
 
 def get_current_data_snapshot(df, current_index, window_size=10):
@@ -173,60 +178,554 @@ def get_current_data_snapshot(df, current_index, window_size=10):
     return snapshot
 
 
-def predict_pit_decision(yellow_flag_data, circuit='indianapolis'):
-    """Predice decisión de pit usando ML"""
-    if ml_model is None or label_encoders is None or feature_columns is None:
-        return None
+# ============================================================================
+# TARJETAS DE VEHÍCULOS
+# ============================================================================
+# El layout de las tarjetas se arma una sola vez por carrera con IDs estables
+# (pattern-matching); en cada tick solo viajan los valores que cambiaron.
+
+CARD_STYLE = {'border': '2px solid #00d4ff', 'borderRadius': '10px'}
+
+# Valores que el navegador también escribe (data-live, modos push/buffer): se envían siempre
+LIVE_FIELDS = {'time', 'speed', 'gear', 'rpm'}
+
+
+def card_field(vehicle_id, field):
+    """ID de un valor de la tarjeta del vehículo"""
+    return {'type': 'card-field', 'vehicle': vehicle_id, 'field': field}
+
+
+def card_metric(vehicle_id, field, label, color, unit=None, live=False):
+    """Columna de métrica: etiqueta, valor (con ID) y unidad opcional"""
+    value_props = {'data-live': f"{vehicle_id}|{field}"} if live else {}
+    children = [
+        html.Small(label, style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left'}),
+        html.H3(id=card_field(vehicle_id, field), style={'color': color, 'fontWeight': 'bold', 'margin': '0', 'textAlign': 'left'},
+                **value_props)
+    ]
+    if unit is not None:
+        children.append(html.Small(unit, style={'color': '#666', 'fontSize': '9px', 'textAlign': 'left'}))
+    return dbc.Col([html.Div(children, style={'padding': '5px'})], width=3)
+
+
+def empty_metric():
+    """Columna vacía para completar la fila"""
+    return dbc.Col([
+        html.Div([
+            html.Small("", style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left', 'visibility': 'hidden'}),
+            html.H3("", style={'margin': '0', 'visibility': 'hidden'}),
+        ], style={'padding': '5px'})
+    ], width=3)
+
+
+def build_vehicle_card(vehicle_id):
+    """Tarjeta profesional del vehículo sin valores (los completa update_displays)"""
+    return dbc.Card([
+        # Header con identificación del vehículo
+        dbc.CardHeader([
+            dbc.Row([
+                dbc.Col([
+                    html.H3(f"🏎️ {vehicle_id}", className='mb-0',
+                           style={'color': '#00d4ff', 'fontWeight': 'bold'})
+                ], width=6),
+                dbc.Col([
+                    html.H2(id=card_field(vehicle_id, 'position'), className='mb-0 text-end',
+                           style={'color': '#ffd700', 'fontWeight': 'bold'})
+                ], width=6)
+            ])
+        ], style={'backgroundColor': '#1a1a2e', 'padding': '12px'}),
+
+        # Body con métricas organizadas
+        dbc.CardBody([
+            # ========== SECCIÓN YELLOW FLAG + ML (ARRIBA) ==========
+            html.Div(id=card_field(vehicle_id, 'alerts')),
+
+            # SECCIÓN TIEMPO/VUELTA/TRANSCURRIDO (siempre visible)
+            dbc.Row([
+                dbc.Col([
+                    html.Div([
+                        html.Small("TIME", style={'color': '#888', 'fontSize': '10px', 'display': 'block'}),
+                        html.H5(id=card_field(vehicle_id, 'time'), style={'color': '#00d4ff', 'fontWeight': 'bold', 'margin': '0'},
+                                **{'data-live': 'time'})
+                    ], style={'padding': '5px', 'backgroundColor': '#1a2a3a', 'borderRadius': '5px', 'textAlign': 'left'})
+                ], width=3),
+                dbc.Col([
+                    html.Div([
+                        html.Small("LAP", style={'color': '#888', 'fontSize': '10px', 'display': 'block'}),
+                        html.H5(id=card_field(vehicle_id, 'lap'), style={'color': '#ffd700', 'fontWeight': 'bold', 'margin': '0'})
+                    ], style={'padding': '5px', 'backgroundColor': '#2a2a1a', 'borderRadius': '5px', 'textAlign': 'left'})
+                ], width=3),
+                dbc.Col([
+                    html.Div([
+                        html.Small("PLAYBACK", style={'color': '#888', 'fontSize': '10px', 'display': 'block'}),
+                        html.H6(id=card_field(vehicle_id, 'playback'), style={'color': '#95e1d3', 'fontWeight': 'bold', 'margin': '0', 'fontSize': '14px'}),
+                        html.Small(id=card_field(vehicle_id, 'record'), style={'color': '#888', 'fontSize': '9px'})
+                    ], style={'padding': '5px', 'backgroundColor': '#1a2a2a', 'borderRadius': '5px', 'textAlign': 'left'})
+                ], width=6),
+            ], className='mb-2'),
+
+            # SECCIÓN 0: UBICACIÓN (compacto)
+            dbc.Row([
+                dbc.Col([
+                    html.Div([
+                        html.Small("SECTOR", style={'color': '#888', 'fontSize': '11px', 'display': 'block', 'textAlign': 'center'}),
+                        html.H4(id=card_field(vehicle_id, 'sector'), style={'color': '#95e1d3', 'fontWeight': 'bold', 'margin': '0', 'textAlign': 'center'})
+                    ], style={'padding': '8px', 'backgroundColor': '#2a4a3a', 'borderRadius': '5px'})
+                ], width=6),
+                dbc.Col(id=card_field(vehicle_id, 'section'), width=6),
+            ], className='mb-2'),
+
+            # SECCIÓN 2: VELOCIDAD Y GAPS
+            html.Hr(style={'borderColor': '#444', 'margin': '5px 0'}),
+            html.H6("⚡ SPEED AND POSITION", style={'color': '#00d4ff', 'marginBottom': '5px', 'fontSize': '14px'}),
+            dbc.Row([
+                card_metric(vehicle_id, 'speed', "Speed", '#4ecdc4', unit="km/h", live=True),
+                card_metric(vehicle_id, 'top_speed', "Top Speed", '#51cf66', unit="km/h"),
+                card_metric(vehicle_id, 'delta_leader', "Δ Leader", '#ff6b6b', unit="sec"),
+                card_metric(vehicle_id, 'gap_next', "Gap Next", '#ffa94d', unit="sec"),
+            ], className='mb-3'),
+
+            # SECCIÓN 3: MOTOR
+            html.Hr(style={'borderColor': '#444', 'margin': '5px 0'}),
+            html.H6("🔧 ENGINE AND TRANSMISSION", style={'color': '#00d4ff', 'marginBottom': '5px', 'fontSize': '14px'}),
+            dbc.Row([
+                card_metric(vehicle_id, 'gear', "Gear", '#ffd43b', live=True),
+                card_metric(vehicle_id, 'rpm', "RPM", '#ff6b6b', live=True),
+                card_metric(vehicle_id, 'engine_temp', "Engine Temp", '#ff8787'),
+                empty_metric(),
+            ], className='mb-3'),
+
+            # SECCIÓN 4: FRENOS
+            html.Hr(style={'borderColor': '#444', 'margin': '5px 0'}),
+            html.H6("🛑 BRAKING SYSTEM", style={'color': '#00d4ff', 'marginBottom': '5px', 'fontSize': '14px'}),
+            dbc.Row([
+                card_metric(vehicle_id, 'brake', "Brake", '#ff6b6b'),
+                card_metric(vehicle_id, 'brake_temp', "Brake Temp", '#fa5252'),
+                dbc.Col(id=card_field(vehicle_id, 'trail_braking'), width=3),
+                empty_metric(),
+            ], className='mb-3'),
+
+            # SECCIÓN 5: CONDUCCIÓN
+            html.Hr(style={'borderColor': '#444', 'margin': '5px 0'}),
+            html.H6("🎯 DRIVING ANALYSIS", style={'color': '#00d4ff', 'marginBottom': '5px', 'fontSize': '14px'}),
+            dbc.Row([
+                card_metric(vehicle_id, 'intensity', "Intensity", '#da77f2', unit="/100"),
+                dbc.Col(id=card_field(vehicle_id, 'apex'), width=3),
+                empty_metric(),
+                empty_metric(),
+            ]),
+        ], style={'backgroundColor': '#0f1419', 'padding': '12px'}),
+    ], id={'type': 'vehicle-card', 'vehicle': vehicle_id}, className='mb-3', style={**CARD_STYLE, 'display': 'none'})
+
+
+def card_fields(component, path=()):
+    """(componente, ruta en el JSON de la tarjeta) de cada valor con ID card_field"""
+    component_id = getattr(component, 'id', None)
+    if isinstance(component_id, dict) and component_id.get('type') == 'card-field':
+        yield component, path
+    children = getattr(component, 'children', None)
+    if isinstance(children, (list, tuple)):
+        for i, child in enumerate(children):
+            yield from card_fields(child, (*path, 'props', 'children', i))
+    elif isinstance(children, Component):
+        yield from card_fields(children, (*path, 'props', 'children'))
+
+
+# Ruta de cada campo dentro de una tarjeta (igual en todos los vehículos): destino de los Patch del tick
+CARD_FIELD_PATHS = {component.id['field']: (*path, 'props', 'children')
+                    for component, path in card_fields(build_vehicle_card(''))}
+
+
+def render_alerts(alerts):
+    """Alertas de Yellow Flag y recomendación ML de la tarjeta"""
+    yellow, ml = alerts
+    return [
+        # Si hay Yellow Flag activo, mostrar información completa
+        (dbc.Alert([
+            dbc.Row([
+                dbc.Col([
+                    html.H5("🚩 YELLOW FLAG", className='mb-1', style={'fontWeight': 'bold'}),
+                    html.P(f"Duration: {yellow['duration']}s", className='mb-0', style={'fontSize': '12px'})
+                ], width=4),
+                dbc.Col([
+                    html.Small("YF Start: " + yellow['start'], className='d-block', style={'fontSize': '11px'}),
+                    html.Small("YF End: " + yellow['end'], className='d-block', style={'fontSize': '11px'}),
+                ], width=4),
+                dbc.Col([
+                    html.Div([
+                        html.Strong("Time Remaining:", style={'fontSize': '11px'}),
+                        html.H6(f"{yellow['remaining']}s",
+                               className='mb-0', style={'color': '#ff6b6b'})
+                    ])
+                ], width=4)
+            ])
+        ], color='warning', className='mb-2', style={'padding': '10px'}) if yellow is not None else html.Div()),
+
+        # ML RECOMMENDATIONS (solo si hay Yellow Flag Y hay recomendación para este vehículo)
+        (dbc.Alert([
+            dbc.Row([
+                dbc.Col([
+                    html.H6(f"🎯 {ml['decision']}",
+                           className='mb-0',
+                           style={'color': '#ff4444' if ml['decision'] == 'PIT' else '#44ff44',
+                                  'fontWeight': 'bold'})
+                ], width=3),
+                dbc.Col([
+                    html.Small(f"Confidence: {ml['confidence']}%", className='d-block', style={'fontSize': '11px'}),
+                    html.Small(f"PIT Prob: {ml['pit_probability']}%", className='d-block', style={'fontSize': '11px'}),
+                ], width=3),
+                dbc.Col([
+                    html.Small(f"Tire Wear: {ml['tire_wear']:.0f}%", className='d-block', style={'fontSize': '11px'}),
+                    dbc.Progress(
+                        value=ml['tire_wear'],
+                        color='danger' if ml['tire_wear'] > 70 else 'warning',
+                        style={'height': '8px'},
+                        className='mt-1'
+                    )
+                ], width=6),
+            ])
+        ], color='info', className='mb-3', style={'padding': '10px'}) if ml is not None else html.Div())
+    ]
+
+
+def render_section(track_section):
+    """Curva/recta con su color"""
+    return html.Div([
+        html.Small("SECTION", style={'color': '#888', 'fontSize': '11px', 'display': 'block', 'textAlign': 'center'}),
+        html.H4(track_section, style={
+            'color': '#ff9800' if track_section == "CURVE" else '#4caf50',
+            'fontWeight': 'bold',
+            'margin': '0',
+            'textAlign': 'center'
+        })
+    ], style={
+        'padding': '8px',
+        'backgroundColor': '#3a2a1a' if track_section == "CURVE" else '#1a3a2a',
+        'borderRadius': '5px'
+    })
+
+
+def render_trail_braking(trail_braking):
+    """Trail braking con su color (naranja si frena girando)"""
+    return html.Div([
+        html.Small("Trail Braking", style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left'}),
+        html.H3(trail_braking, style={'color': '#ff9800' if trail_braking == "SÍ" else '#4caf50',
+                                      'fontWeight': 'bold', 'margin': '0', 'textAlign': 'left'}),
+    ], style={'padding': '5px'})
+
+
+def render_apex(apex_speed):
+    """Velocidad mínima en curva (N/A en recta)"""
+    return html.Div([
+        html.Small("Apex Speed", style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left'}),
+        html.H3(f"{apex_speed:.0f}" if apex_speed > 0 else "N/A",
+               style={'color': '#74c0fc', 'fontWeight': 'bold', 'margin': '0', 'textAlign': 'left'}),
+        html.Small("km/h" if apex_speed > 0 else "", style={'color': '#666', 'fontSize': '9px', 'textAlign': 'left'})
+    ], style={'padding': '5px'})
+
+
+# Campos cuyo valor se envía como componente (cambia también el estilo)
+CARD_RENDERERS = {
+    'alerts': render_alerts,
+    'section': render_section,
+    'trail_braking': render_trail_braking,
+    'apex': render_apex
+}
+
+
+def card_children(field, value):
+    """children de un campo de la tarjeta a partir de su valor"""
+    render = CARD_RENDERERS.get(field)
+    return render(value) if render is not None else value
+
+
+def race_tick(race, engine, current_index, total_records):
+    """Estado de la carrera en current_index (reproducción, posiciones, Yellow Flag y ML) con el motor de la sesión"""
+    df = race.df
+    store = race.store
+    pit_model = race.pit_model
+
+    # Info de reproducción (df ordenado por timestamp: primera y última fila, sin recorrerlo)
+    timestamps = df['timestamp']
+    current_time = timestamps.iloc[current_index]
+    start_time = timestamps.iloc[0]
+    elapsed = (current_time - start_time).total_seconds()
+    total_duration = (timestamps.iloc[-1] - start_time).total_seconds()
+
+    # Datos actuales de cada vehículo (FORMATO HORIZONTAL) y progreso por vehículo,
+    # avanzados incrementalmente desde el tick anterior de esta sesión
+    current_data, vehicle_progress = engine.snapshot(current_index)
+
+    # Calcular posiciones de carrera basado en progreso (índice actual)
+    vehicle_positions = vehicle_progress.rank(method='min', ascending=False).astype(int).to_dict()
+
+    # Calcular número de vuelta del líder
+    leader_id = vehicle_progress.idxmax() if len(vehicle_progress) > 0 else None
+
+    current_lap = 1  # Valor por defecto
+    if leader_id is not None:
+        # Resets de lap_distance del líder hasta el índice actual (índice de vueltas)
+        current_lap = race.lap_index.lap_at_index(leader_id, current_index)
 
-    try:
-        # Extraer features
-        yellow_duration = yellow_flag_data['duration']
-        min_speed = yellow_flag_data['min_speed']
-        avg_speed = yellow_flag_data['avg_speed']
-        speed_variance = avg_speed - min_speed
-
-        is_long_yellow = 1 if yellow_duration > 300 else 0
-        is_short_yellow = 1 if yellow_duration < 60 else 0
-        very_low_speed = 1 if avg_speed < 10 else 0
-
-        # Encode circuit
-        circuit_encoded = label_encoders['circuit'].transform([circuit])[0]
-        race_encoded = 0  # Default
-
-        # Crear features array
-        features = [
-            yellow_duration,
-            min_speed,
-            avg_speed,
-            speed_variance,
-            is_long_yellow,
-            is_short_yellow,
-            very_low_speed,
-            circuit_encoded,
-            race_encoded
-        ]
-
-        X = pd.DataFrame([features], columns=feature_columns)
-        prediction = ml_model.predict(X)[0]
-        proba = ml_model.predict_proba(X)[0]
-
-        return {
-            'decision': 'PIT' if prediction == 1 else 'NO PIT',
-            'confidence': max(proba) * 100,
-            'pit_probability': proba[1] * 100 if len(proba) > 1 else 0
+    # CALCULAR YELLOW FLAG STATUS (antes del loop de vehículos)
+    current_yellow, yf_remaining, yellow_key = race.yellow_index.active(store.timestamp_at(current_index))
+    in_yellow = current_yellow is not None
+
+    # GENERAR RECOMENDACIONES ML POR VEHÍCULO (si hay Yellow Flag)
+    ml_recommendations_by_vehicle = {}
+
+    # Features por vehículo durante la Yellow Flag y predicción por lotes (cacheada por bandera)
+    yellow_inputs = {}
+    yellow_predictions = {}
+
+    if in_yellow and current_yellow and pit_model is not None:
+        # Estadísticas de velocidad precalculadas al cargar la carrera
+        for vehicle_id, stats in current_yellow['vehicle_stats'].items():
+            if stats['samples'] > 0:
+                yellow_inputs[vehicle_id] = {
+                    'duration': current_yellow['duration'],
+                    'min_speed': stats['min_speed'],
+                    'avg_speed': stats['avg_speed']
+                }
+
+        if yellow_inputs:
+            yellow_predictions = pit_model.predict_batch(yellow_key, yellow_inputs)
+
+        for vehicle_id, prediction in yellow_predictions.items():
+            if prediction:
+                # Calcular métricas adicionales
+                tire_wear = estimate_tire_wear(race.rolling_stats, vehicle_id, current_index, elapsed, total_duration)
+
+                # Guardar recomendación para este vehículo
+                ml_recommendations_by_vehicle[vehicle_id] = {
+                    'decision': prediction['decision'],
+                    'confidence': prediction['confidence'],
+                    'pit_probability': prediction['pit_probability'],
+                    'tire_wear': tire_wear,
+                    'duration': current_yellow['duration']
+                }
+
+    return {
+        'current_index': current_index,
+        'total_records': total_records,
+        'current_time': current_time,
+        'elapsed': elapsed,
+        'total_duration': total_duration,
+        'current_data': current_data,
+        'vehicle_positions': vehicle_positions,
+        'leader_id': leader_id,
+        'current_lap': current_lap,
+        'current_yellow': current_yellow,
+        'yf_remaining': yf_remaining,
+        'yellow_inputs': yellow_inputs,
+        'yellow_predictions': yellow_predictions,
+        'ml_recommendations_by_vehicle': ml_recommendations_by_vehicle
+    }
+
+
+def vehicle_card_values(race, tick):
+    """
+    Valores de las tarjetas en el tick (ya formateados, comparables con ==).
+
+    Returns:
+        {vehicle_id: {'order': posición, campo: valor}} de los vehículos con telemetría
+    """
+    current_index = tick['current_index']
+    total_records = tick['total_records']
+    current_data = tick['current_data']
+    vehicle_positions = tick['vehicle_positions']
+    leader_id = tick['leader_id']
+    current_yellow = tick['current_yellow']
+    ml_recommendations_by_vehicle = tick['ml_recommendations_by_vehicle']
+
+    # DETECTAR longitud del circuito automáticamente
+    track_length = race.store.channel_max('lap_distance', default=4000)
+
+    # Alerta de Yellow Flag (la misma en todas las tarjetas)
+    if current_yellow is not None:
+        yellow_alert = {
+            'duration': f"{current_yellow['duration']:.0f}",
+            'start': current_yellow['start'].strftime('%H:%M:%S'),
+            'end': current_yellow['end'].strftime('%H:%M:%S'),
+            'remaining': f"{max(0, tick['yf_remaining']):.0f}"
         }
-    except Exception as e:
-        print(f"Error predicting: {e}")
-        return None
+    else:
+        yellow_alert = None
+
+    # Valores comunes a todas las tarjetas
+    time_text = tick['current_time'].strftime('%H:%M:%S')
+    lap_text = f"{tick['current_lap']}"
+    playback_text = f"{tick['elapsed']:.1f}s / {tick['total_duration']:.1f}s"
+    record_text = f"Record: {current_index:,} / {total_records:,}"
+
+    cards = {}
+
+    for vehicle_id, position in vehicle_positions.items():
+        # Diccionario pivotado (último valor por canal)
+        telemetry_dict = current_data.get(vehicle_id, {})
+
+        if len(telemetry_dict) > 0:
+
+            # ========== VALORES BÁSICOS ==========
+            lap_distance = float(telemetry_dict.get('lap_distance', 0))
+            speed = float(telemetry_dict.get('speed', 0))
+            gear = int(telemetry_dict.get('gear', 0))
+            rpm = float(telemetry_dict.get('rpm', 0))
+            brake_front = float(telemetry_dict.get('brake_front', 0))
+            brake_rear = float(telemetry_dict.get('brake_rear', 0))
+            brake_avg = (brake_front + brake_rear) / 2
+            steering = float(telemetry_dict.get('steering', 0))
+            acc_x = float(telemetry_dict.get('acc_x', 0))
+            acc_y = float(telemetry_dict.get('acc_y', 0))
+            throttle = float(telemetry_dict.get('aps', 0))
+
+            # ========== CALCULAR SECTOR ==========
+            sector_1_limit = track_length / 3
+            sector_2_limit = (track_length * 2) / 3
+
+            if lap_distance < sector_1_limit:
+                sector = "S1"
+            elif lap_distance < sector_2_limit:
+                sector = "S2"
+            else:
+                sector = "S3"
+
+            # ========== DETECTAR CURVA/RECTA ==========
+            if abs(steering) > 20 or abs(acc_x) > 0.4:
+                track_section = "CURVE"
+            else:
+                track_section = "STRAIGHT"
+
+            # ========== TOP SPEED ==========
+            top_speed = race.rolling_stats.max_upto(vehicle_id, 'speed', current_index)
+            if top_speed is None:
+                top_speed = 0
+
+            # ========== DELTA CON LÍDER ==========
+            if leader_id and leader_id != vehicle_id:
+                leader_telemetry = current_data.get(leader_id, {})
+                if len(leader_telemetry) > 0:
+                    leader_lap_dist = float(leader_telemetry.get('lap_distance', 0))
+                    # Delta aproximado basado en distancia (cada 100m ≈ 3-4 segundos en promedio)
+                    distance_diff = leader_lap_dist - lap_distance
+                    if distance_diff < 0:  # El vehículo está en vuelta siguiente
+                        distance_diff += track_length
+                    # Estimación: 1 segundo cada 80 metros a velocidad promedio
+                    delta_leader = distance_diff / 80.0
+                else:
+                    delta_leader = 0
+            else:
+                delta_leader = 0
+
+            # ========== GAP CON SIGUIENTE ==========
+            # Encontrar el vehículo inmediatamente adelante
+            next_position = position - 1
+            gap_next = 0
+            if next_position >= 1:
+                next_vehicle_id = None
+                for vid, pos in vehicle_positions.items():
+                    if pos == next_position:
+                        next_vehicle_id = vid
+                        break
+
+                if next_vehicle_id:
+                    next_telemetry = current_data.get(next_vehicle_id, {})
+                    if len(next_telemetry) > 0:
+                        next_lap_dist = float(next_telemetry.get('lap_distance', 0))
+                        distance_diff = next_lap_dist - lap_distance
+                        if distance_diff < 0:
+                            distance_diff += track_length
+                        gap_next = distance_diff / 80.0
+
+            # ========== TEMPERATURA FRENOS (Estimada) ==========
+            # Basado en uso de frenos en los últimos segundos
+            brake_usage = race.rolling_stats.tail_mean(vehicle_id, 'brake_front', current_index, 100)
+            if brake_usage is not None:
+                # Temperatura base 100°C + incremento por uso (hasta 600°C en frenado intenso)
+                temp_frenos = 100 + (brake_usage / 100) * 500
+            else:
+                temp_frenos = 100
+
+            # ========== TEMPERATURA MOTOR (Estimada) ==========
+            # Basado en RPM promedio reciente
+            avg_rpm = race.rolling_stats.tail_mean(vehicle_id, 'rpm', current_index, 100)
+            if avg_rpm is not None:
+                # Temperatura base 80°C + incremento por RPM (hasta 110°C a RPM alto)
+                temp_motor = 80 + (avg_rpm / 8000) * 30
+            else:
+                temp_motor = 80
+
+            # ========== INTENSIDAD DE CONDUCCIÓN ==========
+            # Score 0-100 basado en G-forces, frenado, aceleración
+            avg_acc_x = race.rolling_stats.tail_mean(vehicle_id, 'acc_x', current_index, 50, absolute=True)
+            avg_acc_y = race.rolling_stats.tail_mean(vehicle_id, 'acc_y', current_index, 50, absolute=True)
+
+            if avg_acc_x is not None and avg_acc_y is not None:
+                avg_brake = brake_usage if brake_usage is not None else 0
+
+                # Score combinado
+                intensidad = min(100, (avg_acc_x * 20) + (avg_acc_y * 20) + (avg_brake / 2))
+            else:
+                intensidad = 0
+
+            # ========== TRAIL BRAKING ==========
+            # Detectar si frena mientras gira
+            if brake_avg > 20 and abs(steering) > 15:
+                trail_braking = "SÍ"
+            else:
+                trail_braking = "NO"
+
+            # ========== APEX SPEED ==========
+            # Velocidad mínima reciente en la curva actual (si está en curva)
+            if track_section == "CURVE":
+                apex_speed = race.rolling_stats.tail_min(vehicle_id, 'speed', current_index, 20)
+                if apex_speed is None:
+                    apex_speed = speed
+            else:
+                apex_speed = 0  # No aplicable en recta
+
+            ml = ml_recommendations_by_vehicle.get(vehicle_id)
+
+            cards[vehicle_id] = {
+                'order': position,
+                'position': f"P{position}",
+                'alerts': (yellow_alert, {
+                    'decision': ml['decision'],
+                    'confidence': f"{ml['confidence']:.0f}",
+                    'pit_probability': f"{ml['pit_probability']:.0f}",
+                    'tire_wear': ml['tire_wear']
+                } if ml is not None else None),
+                'time': time_text,
+                'lap': lap_text,
+                'playback': playback_text,
+                'record': record_text,
+                'sector': sector,
+                'section': track_section,
+                'speed': f"{speed:.0f}",
+                'top_speed': f"{top_speed:.0f}",
+                'delta_leader': f"+{delta_leader:.1f}",
+                'gap_next': f"{gap_next:.1f}",
+                'gear': f"{gear}",
+                'rpm': f"{rpm:.0f}",
+                'engine_temp': f"{temp_motor:.0f}°",
+                'brake': f"{brake_avg:.0f}%",
+                'brake_temp': f"{temp_frenos:.0f}°",
+                'trail_braking': trail_braking,
+                'intensity': f"{intensidad:.0f}",
+                'apex': apex_speed
+            }
+
+    return cards
 
 
 # ============================================================================
 # LAYOUT
 # ============================================================================
 
-app.layout = dbc.Container([
+main_layout = dbc.Container([
     dcc.Store(id='race-data-store'),
     dcc.Store(id='playback-state', data={'is_playing': False, 'current_index': 0}),
+    dcc.Store(id='buffer-playhead'),  # posición del reloj del navegador (modo buffer)
     dcc.Interval(id='playback-interval', interval=1000, disabled=True),  # 1 segundo
 
     # Header
@@ -243,8 +742,7 @@ app.layout = dbc.Container([
             dbc.Card([
                 dbc.CardHeader(html.H5("Load Telemetry Data")),
                 dbc.CardBody([
-                    dcc.Upload(
-                        id='upload-data',
+                    upload_area(
                         children=html.Div([
                             'Drag file or ',
                             html.A('Select'),
@@ -260,8 +758,24 @@ app.layout = dbc.Container([
                             'borderRadius': '5px',
                             'textAlign': 'center',
                             'backgroundColor': '#333'
-                        },
-                        multiple=False
+                        }
+                    ),
+                    dbc.InputGroup([
+                        dcc.Dropdown(
+                            id='race-library-select',
+                            options=race_library.dropdown_options(),
+                            placeholder='Or choose a race from the server library...',
+                            style={'flex': '1', 'color': '#000'}
+                        ),
+                        dbc.Button("Load", id='btn-load-race', color='primary', size='sm')
+                    ], className='mt-2'),
+                    dcc.Dropdown(
+                        id='race-library-vehicles',
+                        multi=True,
+                        disabled=True,
+                        placeholder='All vehicles (partitioned races only)',
+                        style={'color': '#000'},
+                        className='mt-2'
                     ),
                     html.Div(id='upload-status', className='mt-2')
                 ])
@@ -287,13 +801,30 @@ app.layout = dbc.Container([
                             dcc.Slider(
                                 id='speed-slider',
                                 min=1,
-                                max=25,
+                                max=MAX_SPEED,
                                 step=1,
                                 value=1,
                                 marks={1: '1x', 5: '5x', 10: '10x', 15: '15x', 20: '20x', 25: '25x'},
                                 tooltip={"placement": "bottom", "always_visible": True}
                             ),
-                        ])
+                        ]),
+                        html.Div([
+                            dbc.RadioItems(
+                                id='playback-mode',
+                                options=[
+                                    {'label': "Server ticks (1 Hz)", 'value': 'interval'},
+                                    {'label': f"Server push ({STREAM_HZ} Hz)", 'value': 'push'},
+                                    {'label': "Client buffer", 'value': 'buffer'}
+                                ],
+                                value='interval',
+                                inline=True,
+                                className='d-inline-block me-3'
+                            ),
+                            html.Small(id='server-push-status', className='text-muted',
+                                       **{'data-stream-url': STREAM_URL}),
+                            html.Small(id='client-buffer-status', className='text-muted',
+                                       **{'data-chunk-url': CHUNK_URL, 'data-chunk-seconds': str(CHUNK_SECONDS)})
+                        ], className='mt-2')
                     ], style={'padding': '10px'})
                 ])
             ], width=12)
@@ -305,6 +836,10 @@ app.layout = dbc.Container([
         html.Div(id='yellow-flag-status', style={'display': 'none'}),
         html.Div(id='ml-predictions', style={'display': 'none'}),
 
+        # Generación del layout de tarjetas y último tick enviado (para enviar solo cambios)
+        dcc.Store(id='cards-skeleton'),
+        dcc.Store(id='cards-rendered'),
+
         # Telemetry Cards (Professional Dashboard)
         dbc.Row([
             dbc.Col([
@@ -313,7 +848,11 @@ app.layout = dbc.Container([
                                           style={'fontWeight': 'bold', 'color': '#00d4ff'}),
                                   style={'padding': '12px', 'backgroundColor': '#1a1a2e'}),
                     dbc.CardBody([
-                        html.Div(id='telemetry-tables')
+                        dbc.Alert([
+                            html.H5("⏳ Esperando datos de telemetría", className='mb-2'),
+                            html.P("Cargue un archivo parquet y presione Play para comenzar el monitoreo.", className='mb-0')
+                        ], id='cards-waiting', color="info", style={'display': 'none'}),
+                        html.Div(id='telemetry-tables', style={'display': 'flex', 'flexDirection': 'column'})
                     ], style={'padding': '15px'})
                 ])
             ])
@@ -334,6 +873,17 @@ app.layout = dbc.Container([
 
 ], fluid=True, style={'backgroundColor': '#1a1a1a', 'minHeight': '100vh'})
 
+
+def serve_layout():
+    """Layout por carga de página: cada pestaña recibe su propio token de sesión"""
+    return html.Div([
+        dcc.Store(id='session-id', data=uuid.uuid4().hex),
+        main_layout
+    ])
+
+
+app.layout = serve_layout
+
 # ============================================================================
 # CALLBACKS
 # ============================================================================
@@ -356,47 +906,74 @@ app.clientside_callback(
     prevent_initial_call=True
 )
 
+@app.callback(
+    [Output('race-library-vehicles', 'options'),
+     Output('race-library-vehicles', 'value'),
+     Output('race-library-vehicles', 'disabled')],
+    Input('race-library-select', 'value')
+)
+def update_library_vehicles(race_id):
+    """Vehículos de la carrera elegida (solo carreras particionadas por vehículo)"""
+    vehicles = race_library.vehicles(race_id) if race_id else []
+    return [{'label': v, 'value': v} for v in vehicles], None, len(vehicles) == 0
+
+
 @app.callback(
     [Output('race-data-store', 'data'),
      Output('upload-status', 'children'),
      Output('playback-state', 'data', allow_duplicate=True)],
-    Input('upload-data', 'contents'),
-    State('upload-data', 'filename'),
+    [Input('chunked-upload-result', 'data'),
+     Input('btn-load-race', 'n_clicks')],
+    [State('race-library-select', 'value'),
+     State('race-library-vehicles', 'value'),
+     State('session-id', 'data')],
     prevent_initial_call=True
 )
-def load_race_data(contents, filename):
-    """Cargar archivo"""
-    global telemetry_df_global
-
-    if contents is None:
+def load_race_data(upload_result, load_clicks, race_id, vehicles, session_id):
+    """Cargar archivo (subido por bloques o desde la biblioteca del servidor)"""
+    if callback_context.triggered_id == 'btn-load-race':
+        if race_id is None:
+            return None, "", {'is_playing': False, 'current_index': 0}
+        # Cada selección de vehículos es una carrera distinta en el registro compartido
+        race_key = f"library:{race_id}" + (f":{','.join(sorted(vehicles))}" if vehicles else '')
+        return activate_race(session_id, race_key, lambda: race_library.load(race_id, vehicles))
+
+    if upload_result is None:
         return None, "", {'is_playing': False, 'current_index': 0}
+    upload_id = upload_result['upload_id']
+    return activate_race(session_id, f"upload:{upload_id}", lambda: take_ingested(upload_id))
 
-    df = parse_uploaded_file(contents, filename)
 
-    if df is None:
-        return None, dbc.Alert("Error: Formato inválido", color='danger'), {'is_playing': False, 'current_index': 0}
+def activate_race(session_id, race_key, load):
+    """
+    Asignar la carrera a la sesión (store, motor y yellow flags), construyéndola
+    solo si ninguna otra sesión la tiene cargada.
 
-    # Detectar Yellow Flags
-    yellow_flags = detect_yellow_flags(df)
+    Args:
+        session_id: Token de sesión (dcc.Store 'session-id')
+        race_key: Identidad de la carrera en race_registry
+        load: Función que devuelve (df, filename)
+    """
+    def build():
+        df, filename = load()
+        if df is None:
+            return None
+        return LoadedRace(df, filename, pit_model=pit_model.fork() if pit_model is not None else None)
 
-    # Guardar en memoria
-    telemetry_df_global = df
+    race = race_registry.attach(session_id, race_key, build)
+    if race is None:
+        return None, dbc.Alert("Error: Formato inválido", color='danger'), {'is_playing': False, 'current_index': 0}
 
-    race_data_json = {
-        'telemetry': 'loaded_in_memory',
-        'yellow_flags': yellow_flags,
-        'total_records': len(df),
-        'vehicles': df['vehicle_id'].unique().tolist(),
-        'start_time': df['timestamp'].min().isoformat(),
-        'end_time': df['timestamp'].max().isoformat()
-    }
+    summary = race.summary
 
     status_msg = dbc.Alert([
-        html.H6(f"✓ {filename} loaded", className='alert-heading'),
-        html.Small(f"Records: {len(df):,} | Vehicles: {len(race_data_json['vehicles'])} | Yellow Flags: {len(yellow_flags)}")
+        html.H6(f"✓ {race.filename} loaded", className='alert-heading'),
+        html.Small(f"Records: {summary['total_records']:,} | Vehicles: {len(summary['vehicles'])} | "
+                   f"Yellow Flags: {len(summary['yellow_flags'])}")
     ], color='success')
 
-    return race_data_json, status_msg, {'is_playing': False, 'current_index': 0}
+    # El navegador solo guarda el handle; los metadatos quedan en race_registry
+    return {'race': race_key}, status_msg, {'is_playing': False, 'current_index': 0}
 
 
 @app.callback(
@@ -404,10 +981,12 @@ def load_race_data(contents, filename):
     [Input('btn-play', 'n_clicks'),
      Input('btn-pause', 'n_clicks'),
      Input('btn-reset', 'n_clicks')],
-    State('playback-state', 'data'),
+    [State('playback-state', 'data'),
+     State('playback-mode', 'value'),
+     State('buffer-playhead', 'data')],
     prevent_initial_call=True
 )
-def control_playback(play_clicks, pause_clicks, reset_clicks, current_state):
+def control_playback(play_clicks, pause_clicks, reset_clicks, current_state, mode, buffer_playhead):
     """Controlar reproducción"""
     ctx = callback_context
 
@@ -416,6 +995,20 @@ def control_playback(play_clicks, pause_clicks, reset_clicks, current_state):
 
     button_id = ctx.triggered[0]['prop_id'].split('.')[0]
 
+    # Modo interval: el reloj se vuelve a anclar en el primer tick después del botón
+    stop_clock(current_state)
+
+    # Modo push: el reloj está en el servidor, tomar su posición al detener el stream
+    stream_id = current_state.pop('stream_id', None)
+    if stream_id is not None:
+        stream_index = stop_stream(stream_id)
+        if stream_index is not None and button_id == 'btn-pause':
+            current_state['current_index'] = stream_index
+
+    # Modo buffer: el reloj está en el navegador
+    if mode == 'buffer' and buffer_playhead is not None and button_id == 'btn-pause':
+        current_state['current_index'] = buffer_playhead
+
     if button_id == 'btn-play':
         current_state['is_playing'] = True
     elif button_id == 'btn-pause':
@@ -427,736 +1020,313 @@ def control_playback(play_clicks, pause_clicks, reset_clicks, current_state):
     return current_state
 
 
-@app.callback(
+# Activar/desactivar interval (solo en modo 'interval': en push/buffer el reloj está fuera).
+# En el navegador: cada tick cambia playback-state y no debe costar otro request
+app.clientside_callback(
+    """
+    function(state, mode) {
+        return !(state && state.is_playing) || mode !== 'interval';
+    }
+    """,
     Output('playback-interval', 'disabled'),
-    Input('playback-state', 'data')
+    [Input('playback-state', 'data'),
+     Input('playback-mode', 'value')]
 )
-def toggle_interval(state):
-    """Activar/desactivar interval"""
-    return not state.get('is_playing', False)
 
 
-@app.callback(
-    Output('playback-state', 'data'),
-    Input('playback-interval', 'n_intervals'),
-    [State('playback-state', 'data'),
-     State('race-data-store', 'data'),
-     State('speed-slider', 'value')],
-    prevent_initial_call=True
+# Modo push: abrir/cerrar el EventSource en el navegador (assets/playback_stream.js)
+app.clientside_callback(
+    ClientsideFunction(namespace='playback_stream', function_name='sync'),
+    Output('server-push-status', 'children'),
+    [Input('playback-state', 'data'),
+     Input('speed-slider', 'value'),
+     Input('playback-mode', 'value')],
+    State('session-id', 'data')
 )
-def update_playback_position(n_intervals, state, race_data_json, speed):
-    """Actualizar posición"""
-    if race_data_json is None or not state.get('is_playing', False):
-        return state
 
-    total_records = race_data_json['total_records']
-    current_index = state.get('current_index', 0)
 
-    # Avanzar N registros por segundo según velocidad
-    increment = int(speed * 100)  # 100 registros por segundo base
-    new_index = current_index + increment
+# Modo buffer: reloj local con chunks prefetcheados (assets/playback_buffer.js)
+app.clientside_callback(
+    ClientsideFunction(namespace='playback_buffer', function_name='sync'),
+    Output('client-buffer-status', 'children'),
+    [Input('playback-state', 'data'),
+     Input('speed-slider', 'value'),
+     Input('playback-mode', 'value')],
+    State('session-id', 'data')
+)
+
 
-    if new_index >= total_records:
-        state['is_playing'] = False
-        state['current_index'] = total_records - 1
-    else:
-        state['current_index'] = new_index
+@app.callback(
+    Output('cards-skeleton', 'data'),
+    Input('race-data-store', 'data'),
+    State('session-id', 'data')
+)
+def new_card_layout(race_data_json, session_id):
+    """Nueva generación de tarjetas por carrera (el primer tick la envía completa, los demás solo Patch)"""
+    session = session_race(race_data_json, session_id)
+
+    if session is None:
+        return None
 
-    return state
+    return {'gen': uuid.uuid4().hex, 'race': session.race_key}
+
+
+def card_layout(vehicles, cards):
+    """Tarjetas completas con los valores del tick (mismo orden que store.vehicles)"""
+    layout = []
+    for vehicle_id in vehicles:
+        card = build_vehicle_card(vehicle_id)
+        values = cards.get(vehicle_id)
+        if values is not None:
+            card.style = {**CARD_STYLE, 'order': values['order']}
+            for component, _ in card_fields(card):
+                component.children = card_children(component.id['field'], values.get(component.id['field']))
+        layout.append(card)
+    return layout
+
+
+def card_patch(vehicles, cards, previous):
+    """Patch de telemetry-tables con los valores y el orden que cambiaron desde previous"""
+    patch = dash.Patch()
+    for i, vehicle_id in enumerate(vehicles):
+        values = cards.get(vehicle_id)
+        shown = previous.get(vehicle_id, {}) if previous is not None else None
+
+        order = values['order'] if values is not None else None
+        if shown is None or shown.get('order') != order:
+            patch[i]['props']['style'] = {**CARD_STYLE, 'order': order} if order is not None else {**CARD_STYLE, 'display': 'none'}
+
+        if values is None:
+            continue
+        for field, path in CARD_FIELD_PATHS.items():
+            value = values.get(field)
+            if field in LIVE_FIELDS or shown is None or shown.get(field) != value:
+                target = patch[i]
+                for key in path[:-1]:
+                    target = target[key]
+                target[path[-1]] = card_children(field, value)
+    return patch
 
 
 @app.callback(
     [Output('telemetry-tables', 'children'),
+     Output('cards-waiting', 'style'),
+     Output('cards-rendered', 'data'),
      Output('playback-info', 'children'),
      Output('progress-bar', 'value'),
      Output('yellow-flag-status', 'children'),
      Output('ml-predictions', 'children'),
-     Output('yellow-flags-summary', 'children')],
-    Input('playback-state', 'data'),
-    State('race-data-store', 'data')
+     Output('yellow-flags-summary', 'children'),
+     Output('playback-state', 'data')],
+    [Input('playback-interval', 'n_intervals'),
+     Input('playback-state', 'data'),
+     Input('cards-skeleton', 'data')],
+    [State('speed-slider', 'value'),
+     State('playback-interval', 'interval'),
+     State('race-data-store', 'data'),
+     State('cards-rendered', 'data'),
+     State('session-id', 'data')]
 )
-def update_displays(state, race_data_json):
-    """Actualizar todas las visualizaciones"""
-    global telemetry_df_global
-
-    if race_data_json is None or telemetry_df_global is None:
-        return "No data loaded", "No data", 0, "No data", "No data", ""
-
-    df = telemetry_df_global
-    current_index = state.get('current_index', 0)
-    total_records = race_data_json['total_records']
-
-    # Info de reproducción
-    current_time = df['timestamp'].iloc[current_index]
-    elapsed = (current_time - df['timestamp'].min()).total_seconds()
-    total_duration = (df['timestamp'].max() - df['timestamp'].min()).total_seconds()
-
-    progress = (current_index / total_records * 100) if total_records > 0 else 0
-
-    # Datos actuales de cada vehículo (FORMATO HORIZONTAL)
-    current_data = df[df.index <= current_index].groupby(['vehicle_id', 'telemetry_name']).tail(1)
+def update_displays(n_intervals, state, skeleton, speed, interval_ms, race_data_json, rendered, session_id):
+    """
+    Tick de reproducción en un solo request: avanza el reloj (si lo disparó el
+    interval) y actualiza las visualizaciones (tarjetas: completas en el primer
+    tick de cada layout, después un Patch con los valores que cambiaron). El
+    nuevo playback-state sale en el mismo response.
+    """
+    session = session_race(race_data_json, session_id)
 
-    # Calcular posiciones de carrera basado en progreso (índice actual)
-    vehicle_progress = df[df.index <= current_index].groupby('vehicle_id')['timestamp'].max()
-    vehicle_positions = vehicle_progress.rank(method='min', ascending=False).astype(int).to_dict()
+    if session is None:
+        return ("No data loaded", {'display': 'none'}, None, "No data", 0, "No data", "No data", "", dash.no_update)
 
-    # Calcular número de vuelta del líder
-    leader_id = vehicle_progress.idxmax() if len(vehicle_progress) > 0 else None
+    race = session.race
 
-    current_lap = 1  # Valor por defecto
-    if leader_id is not None:
-        # Obtener lap_distance del líder
-        leader_data = df[(df.index <= current_index) & (df['vehicle_id'] == leader_id)]
-        leader_lap_dist_data = leader_data[leader_data['telemetry_name'] == 'lap_distance']
+    # Tick del interval: avanzar la posición (tiempo real × velocidad, ver playback_clock)
+    new_state = dash.no_update
+    if 'playback-interval.n_intervals' in callback_context.triggered_prop_ids:
+        if not state.get('is_playing', False):
+            raise PreventUpdate
+        state = new_state = advance(state, race.clock, speed, interval_ms)
 
-        if len(leader_lap_dist_data) > 0:
-            # Contar cuántas veces lap_distance "resetea" a un valor bajo (nueva vuelta)
-            lap_distances = leader_lap_dist_data['telemetry_value'].values
+    store = race.store
+    pit_model = race.pit_model
+    current_index = state.get('current_index', 0)
+    total_records = race.summary['total_records']
+
+    tick = race_tick(race, session.engine, current_index, total_records)
+    current_time = tick['current_time']
+    elapsed = tick['elapsed']
+    total_duration = tick['total_duration']
+    current_yellow = tick['current_yellow']
+    yf_remaining = tick['yf_remaining']
+    in_yellow = current_yellow is not None
+    yellow_inputs = tick['yellow_inputs']
+    yellow_predictions = tick['yellow_predictions']
 
-            # Detectar resets: cuando lap_distance disminuye significativamente
-            lap_count = 1
-            for i in range(1, len(lap_distances)):
-                if lap_distances[i] < lap_distances[i-1] - 1000:  # Reset detectado
-                    lap_count += 1
-            current_lap = lap_count
+    progress = (current_index / total_records * 100) if total_records > 0 else 0
 
     playback_info = html.Div([
         html.Strong(f"Time: {current_time.strftime('%H:%M:%S')}", style={'fontSize': '14px'}),
         html.Br(),
-        html.Strong(f"🏁 Lap: {current_lap}", style={'fontSize': '16px', 'color': '#00d4ff'}),
+        html.Strong(f"🏁 Lap: {tick['current_lap']}", style={'fontSize': '16px', 'color': '#00d4ff'}),
         html.Br(),
         html.Small(f"Elapsed: {elapsed:.1f}s / {total_duration:.1f}s | Record: {current_index:,} / {total_records:,}")
     ])
 
+    # Velocidad lograda vs pedida (solo mientras corre el reloj)
+    speed_text = speed_label(state)
+    if speed_text:
+        playback_info.children += [html.Br(), html.Small(speed_text)]
+
     # ============================================================================
-    # DASHBOARD PROFESIONAL: Solo seguimiento de 2do y 3er lugar
+    # DASHBOARD PROFESIONAL: tarjetas por vehículo (generación de new_card_layout)
     # ============================================================================
 
-    # DETECTAR longitud del circuito automáticamente
-    lap_dist_all = df[df['telemetry_name'] == 'lap_distance']['telemetry_value']
-    track_length = lap_dist_all.max() if len(lap_dist_all) > 0 else 4000
-
-    # CALCULAR YELLOW FLAG STATUS (antes del loop de vehículos)
-    yellow_flags = race_data_json['yellow_flags']
-    in_yellow = False
-    current_yellow = None
-
-    for yf in yellow_flags:
-        yf_start = pd.to_datetime(yf['start'])
-        yf_end = pd.to_datetime(yf['end'])
-        if yf_start <= current_time <= yf_end:
-            in_yellow = True
-            current_yellow = yf
-            break
-
-    # Determinar mensaje y color de Yellow Flag
-    if in_yellow:
-        yf_text = "🚩 YELLOW"
-        yf_color = '#ffc107'
-        yf_bg = '#3a2a1a'
-        yf_duration_text = f"{current_yellow['duration']:.0f}s"
+    if skeleton is None or skeleton['race'] != session.race_key:
+        # La generación de tarjetas de esta carrera todavía no llegó al navegador
+        card_update = dash.no_update
+        waiting_style = dash.no_update
+        rendered = dash.no_update
     else:
-        yf_text = "🟢 GREEN"
-        yf_color = '#4caf50'
-        yf_bg = '#1a3a2a'
-        yf_duration_text = "Racing"
+        cards = vehicle_card_values(race, tick)
+        vehicles = store.vehicles
 
-    # MOSTRAR TODOS los vehículos disponibles
-    vehicles_to_monitor = []
-    for vehicle_id, pos in vehicle_positions.items():
-        vehicles_to_monitor.append((vehicle_id, pos))
-
-    # Ordenar por posición
-    vehicles_to_monitor.sort(key=lambda x: x[1])
-
-    # GENERAR RECOMENDACIONES ML POR VEHÍCULO (si hay Yellow Flag)
-    ml_recommendations_by_vehicle = {}
-
-    if in_yellow and current_yellow and ml_model is not None:
-        yf_start = pd.to_datetime(current_yellow['start'])
-        yf_end = pd.to_datetime(current_yellow['end'])
-
-        for vehicle_id in df['vehicle_id'].unique():
-            yf_data = df[(df['timestamp'] >= yf_start) & (df['timestamp'] <= yf_end) & (df['vehicle_id'] == vehicle_id)]
-            speed_data = yf_data[yf_data['telemetry_name'] == 'speed']['telemetry_value']
-
-            if len(speed_data) > 0:
-                prediction_data = {
-                    'duration': current_yellow['duration'],
-                    'min_speed': speed_data.min(),
-                    'avg_speed': speed_data.mean()
-                }
-
-                prediction = predict_pit_decision(prediction_data, circuit='indianapolis')
-
-                if prediction:
-                    # Calcular métricas adicionales
-                    vehicle_data_so_far = df[(df['vehicle_id'] == vehicle_id) & (df.index <= current_index)]
-                    brake_data = vehicle_data_so_far[vehicle_data_so_far['telemetry_name'] == 'brake_front']['telemetry_value']
-                    acc_data = vehicle_data_so_far[vehicle_data_so_far['telemetry_name'] == 'acc_x']['telemetry_value']
-
-                    time_factor = (elapsed / total_duration) * 100
-                    brake_factor = (brake_data.mean() / 100) * 30 if len(brake_data) > 0 else 0
-                    acc_factor = (abs(acc_data).mean() / 10) * 20 if len(acc_data) > 0 else 0
-                    tire_wear = min(100, time_factor + brake_factor + acc_factor)
-
-                    # Guardar recomendación para este vehículo
-                    ml_recommendations_by_vehicle[vehicle_id] = {
-                        'decision': prediction['decision'],
-                        'confidence': prediction['confidence'],
-                        'pit_probability': prediction['pit_probability'],
-                        'tire_wear': tire_wear,
-                        'duration': current_yellow['duration']
-                    }
-
-    # Crear tarjetas profesionales por vehículo
-    vehicle_cards = []
-
-    for vehicle_id, position in vehicles_to_monitor:
-        vehicle_data = current_data[current_data['vehicle_id'] == vehicle_id]
-
-        if len(vehicle_data) > 0:
-            # Crear diccionario pivotado
-            telemetry_dict = vehicle_data.set_index('telemetry_name')['telemetry_value'].to_dict()
-
-            # ========== VALORES BÁSICOS ==========
-            lap_distance = float(telemetry_dict.get('lap_distance', 0))
-            speed = float(telemetry_dict.get('speed', 0))
-            gear = int(telemetry_dict.get('gear', 0))
-            rpm = float(telemetry_dict.get('rpm', 0))
-            brake_front = float(telemetry_dict.get('brake_front', 0))
-            brake_rear = float(telemetry_dict.get('brake_rear', 0))
-            brake_avg = (brake_front + brake_rear) / 2
-            steering = float(telemetry_dict.get('steering', 0))
-            acc_x = float(telemetry_dict.get('acc_x', 0))
-            acc_y = float(telemetry_dict.get('acc_y', 0))
-            throttle = float(telemetry_dict.get('aps', 0))
-
-            # ========== CALCULAR SECTOR ==========
-            sector_1_limit = track_length / 3
-            sector_2_limit = (track_length * 2) / 3
-
-            if lap_distance < sector_1_limit:
-                sector = "S1"
-            elif lap_distance < sector_2_limit:
-                sector = "S2"
-            else:
-                sector = "S3"
-
-            # ========== DETECTAR CURVA/RECTA ==========
-            if abs(steering) > 20 or abs(acc_x) > 0.4:
-                track_section = "CURVE"
-            else:
-                track_section = "STRAIGHT"
-
-            # ========== TOP SPEED ==========
-            vehicle_history = df[(df.index <= current_index) & (df['vehicle_id'] == vehicle_id)]
-            speed_history = vehicle_history[vehicle_history['telemetry_name'] == 'speed']['telemetry_value']
-            top_speed = speed_history.max() if len(speed_history) > 0 else 0
-
-            # ========== DELTA CON LÍDER ==========
-            if leader_id and leader_id != vehicle_id:
-                leader_data_current = current_data[current_data['vehicle_id'] == leader_id]
-                if len(leader_data_current) > 0:
-                    leader_telemetry = leader_data_current.set_index('telemetry_name')['telemetry_value'].to_dict()
-                    leader_lap_dist = float(leader_telemetry.get('lap_distance', 0))
-                    # Delta aproximado basado en distancia (cada 100m ≈ 3-4 segundos en promedio)
-                    distance_diff = leader_lap_dist - lap_distance
-                    if distance_diff < 0:  # El vehículo está en vuelta siguiente
-                        distance_diff += track_length
-                    # Estimación: 1 segundo cada 80 metros a velocidad promedio
-                    delta_leader = distance_diff / 80.0
-                else:
-                    delta_leader = 0
-            else:
-                delta_leader = 0
-
-            # ========== GAP CON SIGUIENTE ==========
-            # Encontrar el vehículo inmediatamente adelante
-            next_position = position - 1
-            gap_next = 0
-            if next_position >= 1:
-                next_vehicle_id = None
-                for vid, pos in vehicle_positions.items():
-                    if pos == next_position:
-                        next_vehicle_id = vid
-                        break
-
-                if next_vehicle_id:
-                    next_vehicle_data = current_data[current_data['vehicle_id'] == next_vehicle_id]
-                    if len(next_vehicle_data) > 0:
-                        next_telemetry = next_vehicle_data.set_index('telemetry_name')['telemetry_value'].to_dict()
-                        next_lap_dist = float(next_telemetry.get('lap_distance', 0))
-                        distance_diff = next_lap_dist - lap_distance
-                        if distance_diff < 0:
-                            distance_diff += track_length
-                        gap_next = distance_diff / 80.0
-
-            # ========== TEMPERATURA FRENOS (Estimada) ==========
-            # Basado en uso de frenos en los últimos segundos
-            recent_brakes = vehicle_history[vehicle_history['telemetry_name'] == 'brake_front']['telemetry_value'].tail(100)
-            if len(recent_brakes) > 0:
-                brake_usage = recent_brakes.mean()
-                # Temperatura base 100°C + incremento por uso (hasta 600°C en frenado intenso)
-                temp_frenos = 100 + (brake_usage / 100) * 500
-            else:
-                temp_frenos = 100
-
-            # ========== TEMPERATURA MOTOR (Estimada) ==========
-            # Basado en RPM promedio reciente
-            recent_rpm = vehicle_history[vehicle_history['telemetry_name'] == 'rpm']['telemetry_value'].tail(100)
-            if len(recent_rpm) > 0:
-                avg_rpm = recent_rpm.mean()
-                # Temperatura base 80°C + incremento por RPM (hasta 110°C a RPM alto)
-                temp_motor = 80 + (avg_rpm / 8000) * 30
-            else:
-                temp_motor = 80
-
-            # ========== INTENSIDAD DE CONDUCCIÓN ==========
-            # Score 0-100 basado en G-forces, frenado, aceleración
-            recent_acc_x = vehicle_history[vehicle_history['telemetry_name'] == 'acc_x']['telemetry_value'].tail(50)
-            recent_acc_y = vehicle_history[vehicle_history['telemetry_name'] == 'acc_y']['telemetry_value'].tail(50)
-
-            if len(recent_acc_x) > 0 and len(recent_acc_y) > 0:
-                avg_acc_x = abs(recent_acc_x).mean()
-                avg_acc_y = abs(recent_acc_y).mean()
-                avg_brake = recent_brakes.mean() if len(recent_brakes) > 0 else 0
-
-                # Score combinado
-                intensidad = min(100, (avg_acc_x * 20) + (avg_acc_y * 20) + (avg_brake / 2))
-            else:
-                intensidad = 0
-
-            # ========== TRAIL BRAKING ==========
-            # Detectar si frena mientras gira
-            if brake_avg > 20 and abs(steering) > 15:
-                trail_braking = "SÍ"
-                trail_braking_color = "#ff9800"  # Naranja
-            else:
-                trail_braking = "NO"
-                trail_braking_color = "#4caf50"  # Verde
-
-            # ========== APEX SPEED ==========
-            # Velocidad mínima en la curva actual (si está en curva)
-            if track_section == "CURVA":
-                # Buscar velocidades recientes en curva
-                recent_speeds_in_curve = []
-                recent_data = vehicle_history.tail(20)
-                for idx_row in recent_data.index:
-                    row = recent_data.loc[idx_row]
-                    if row['telemetry_name'] == 'steering':
-                        if abs(row['telemetry_value']) > 20:  # En curva
-                            # Buscar speed correspondiente
-                            speed_at_moment = recent_data[(recent_data.index == idx_row) & (recent_data['telemetry_name'] == 'speed')]
-                            if len(speed_at_moment) > 0:
-                                recent_speeds_in_curve.append(speed_at_moment.iloc[0]['telemetry_value'])
-
-                if len(recent_speeds_in_curve) > 0:
-                    apex_speed = min(recent_speeds_in_curve)
-                else:
-                    apex_speed = speed
-            else:
-                apex_speed = 0  # No aplicable en recta
-
-            # ========== CREAR TARJETA PROFESIONAL ==========
-            vehicle_card = dbc.Card([
-                # Header con identificación del vehículo
-                dbc.CardHeader([
-                    dbc.Row([
-                        dbc.Col([
-                            html.H3(f"🏎️ {vehicle_id}", className='mb-0',
-                                   style={'color': '#00d4ff', 'fontWeight': 'bold'})
-                        ], width=6),
-                        dbc.Col([
-                            html.H2(f"P{position}", className='mb-0 text-end',
-                                   style={'color': '#ffd700', 'fontWeight': 'bold'})
-                        ], width=6)
-                    ])
-                ], style={'backgroundColor': '#1a1a2e', 'padding': '12px'}),
-
-                # Body con métricas organizadas
-                dbc.CardBody([
-                    # ========== SECCIÓN YELLOW FLAG + ML (ARRIBA) ==========
-                    # Si hay Yellow Flag activo, mostrar información completa
-                    (dbc.Alert([
-                        dbc.Row([
-                            dbc.Col([
-                                html.H5("🚩 YELLOW FLAG", className='mb-1', style={'fontWeight': 'bold'}),
-                                html.P(f"Duration: {current_yellow['duration']:.0f}s", className='mb-0', style={'fontSize': '12px'})
-                            ], width=4),
-                            dbc.Col([
-                                html.Small("YF Start: " + pd.to_datetime(current_yellow['start']).strftime('%H:%M:%S'), className='d-block', style={'fontSize': '11px'}),
-                                html.Small("YF End: " + pd.to_datetime(current_yellow['end']).strftime('%H:%M:%S'), className='d-block', style={'fontSize': '11px'}),
-                            ], width=4),
-                            dbc.Col([
-                                html.Div([
-                                    html.Strong("Time Remaining:", style={'fontSize': '11px'}),
-                                    html.H6(f"{max(0, (pd.to_datetime(current_yellow['end']) - current_time).total_seconds()):.0f}s",
-                                           className='mb-0', style={'color': '#ff6b6b'})
-                                ])
-                            ], width=4)
-                        ])
-                    ], color='warning', className='mb-2', style={'padding': '10px'}) if in_yellow else html.Div()),
-
-                    # ML RECOMMENDATIONS (solo si hay Yellow Flag Y hay recomendación para este vehículo)
-                    (dbc.Alert([
-                        dbc.Row([
-                            dbc.Col([
-                                html.H6(f"🎯 {ml_recommendations_by_vehicle[vehicle_id]['decision']}",
-                                       className='mb-0',
-                                       style={'color': '#ff4444' if ml_recommendations_by_vehicle[vehicle_id]['decision'] == 'PIT' else '#44ff44',
-                                              'fontWeight': 'bold'})
-                            ], width=3),
-                            dbc.Col([
-                                html.Small(f"Confidence: {ml_recommendations_by_vehicle[vehicle_id]['confidence']:.0f}%", className='d-block', style={'fontSize': '11px'}),
-                                html.Small(f"PIT Prob: {ml_recommendations_by_vehicle[vehicle_id]['pit_probability']:.0f}%", className='d-block', style={'fontSize': '11px'}),
-                            ], width=3),
-                            dbc.Col([
-                                html.Small(f"Tire Wear: {ml_recommendations_by_vehicle[vehicle_id]['tire_wear']:.0f}%", className='d-block', style={'fontSize': '11px'}),
-                                dbc.Progress(
-                                    value=ml_recommendations_by_vehicle[vehicle_id]['tire_wear'],
-                                    color='danger' if ml_recommendations_by_vehicle[vehicle_id]['tire_wear'] > 70 else 'warning',
-                                    style={'height': '8px'},
-                                    className='mt-1'
-                                )
-                            ], width=6),
-                        ])
-                    ], color='info', className='mb-3', style={'padding': '10px'}) if vehicle_id in ml_recommendations_by_vehicle else html.Div()),
-
-                    # SECCIÓN TIEMPO/VUELTA/TRANSCURRIDO (siempre visible)
-                    dbc.Row([
-                        dbc.Col([
-                            html.Div([
-                                html.Small("TIME", style={'color': '#888', 'fontSize': '10px', 'display': 'block'}),
-                                html.H5(current_time.strftime('%H:%M:%S'), style={'color': '#00d4ff', 'fontWeight': 'bold', 'margin': '0'})
-                            ], style={'padding': '5px', 'backgroundColor': '#1a2a3a', 'borderRadius': '5px', 'textAlign': 'left'})
-                        ], width=3),
-                        dbc.Col([
-                            html.Div([
-                                html.Small("LAP", style={'color': '#888', 'fontSize': '10px', 'display': 'block'}),
-                                html.H5(f"{current_lap}", style={'color': '#ffd700', 'fontWeight': 'bold', 'margin': '0'})
-                            ], style={'padding': '5px', 'backgroundColor': '#2a2a1a', 'borderRadius': '5px', 'textAlign': 'left'})
-                        ], width=3),
-                        dbc.Col([
-                            html.Div([
-                                html.Small("PLAYBACK", style={'color': '#888', 'fontSize': '10px', 'display': 'block'}),
-                                html.H6(f"{elapsed:.1f}s / {total_duration:.1f}s", style={'color': '#95e1d3', 'fontWeight': 'bold', 'margin': '0', 'fontSize': '14px'}),
-                                html.Small(f"Record: {current_index:,} / {total_records:,}", style={'color': '#888', 'fontSize': '9px'})
-                            ], style={'padding': '5px', 'backgroundColor': '#1a2a2a', 'borderRadius': '5px', 'textAlign': 'left'})
-                        ], width=6),
-                    ], className='mb-2'),
-
-                    # SECCIÓN 0: UBICACIÓN (compacto)
-                    dbc.Row([
-                        dbc.Col([
-                            html.Div([
-                                html.Small("SECTOR", style={'color': '#888', 'fontSize': '11px', 'display': 'block', 'textAlign': 'center'}),
-                                html.H4(sector, style={'color': '#95e1d3', 'fontWeight': 'bold', 'margin': '0', 'textAlign': 'center'})
-                            ], style={'padding': '8px', 'backgroundColor': '#2a4a3a', 'borderRadius': '5px'})
-                        ], width=6),
-                        dbc.Col([
-                            html.Div([
-                                html.Small("SECTION", style={'color': '#888', 'fontSize': '11px', 'display': 'block', 'textAlign': 'center'}),
-                                html.H4(track_section, style={
-                                    'color': '#ff9800' if track_section == "CURVE" else '#4caf50',
-                                    'fontWeight': 'bold',
-                                    'margin': '0',
-                                    'textAlign': 'center'
-                                })
-                            ], style={
-                                'padding': '8px',
-                                'backgroundColor': '#3a2a1a' if track_section == "CURVE" else '#1a3a2a',
-                                'borderRadius': '5px'
-                            })
-                        ], width=6),
-                    ], className='mb-2'),
-
-                    # SECCIÓN 2: VELOCIDAD Y GAPS
-                    html.Hr(style={'borderColor': '#444', 'margin': '5px 0'}),
-                    html.H6("⚡ SPEED AND POSITION", style={'color': '#00d4ff', 'marginBottom': '5px', 'fontSize': '14px'}),
-                    dbc.Row([
-                        dbc.Col([
-                            html.Div([
-                                html.Small("Speed", style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left'}),
-                                html.H3(f"{speed:.0f}", style={'color': '#4ecdc4', 'fontWeight': 'bold', 'margin': '0', 'textAlign': 'left'}),
-                                html.Small("km/h", style={'color': '#666', 'fontSize': '9px', 'textAlign': 'left'})
-                            ], style={'padding': '5px'})
-                        ], width=3),
-                        dbc.Col([
-                            html.Div([
-                                html.Small("Top Speed", style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left'}),
-                                html.H3(f"{top_speed:.0f}", style={'color': '#51cf66', 'fontWeight': 'bold', 'margin': '0', 'textAlign': 'left'}),
-                                html.Small("km/h", style={'color': '#666', 'fontSize': '9px', 'textAlign': 'left'})
-                            ], style={'padding': '5px'})
-                        ], width=3),
-                        dbc.Col([
-                            html.Div([
-                                html.Small("Δ Leader", style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left'}),
-                                html.H3(f"+{delta_leader:.1f}", style={'color': '#ff6b6b', 'fontWeight': 'bold', 'margin': '0', 'textAlign': 'left'}),
-                                html.Small("sec", style={'color': '#666', 'fontSize': '9px', 'textAlign': 'left'})
-                            ], style={'padding': '5px'})
-                        ], width=3),
-                        dbc.Col([
-                            html.Div([
-                                html.Small("Gap Next", style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left'}),
-                                html.H3(f"{gap_next:.1f}", style={'color': '#ffa94d', 'fontWeight': 'bold', 'margin': '0', 'textAlign': 'left'}),
-                                html.Small("sec", style={'color': '#666', 'fontSize': '9px', 'textAlign': 'left'})
-                            ], style={'padding': '5px'})
-                        ], width=3),
-                    ], className='mb-3'),
-
-                    # SECCIÓN 3: MOTOR
-                    html.Hr(style={'borderColor': '#444', 'margin': '5px 0'}),
-                    html.H6("🔧 ENGINE AND TRANSMISSION", style={'color': '#00d4ff', 'marginBottom': '5px', 'fontSize': '14px'}),
-                    dbc.Row([
-                        dbc.Col([
-                            html.Div([
-                                html.Small("Gear", style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left'}),
-                                html.H3(f"{gear}", style={'color': '#ffd43b', 'fontWeight': 'bold', 'margin': '0', 'textAlign': 'left'}),
-                            ], style={'padding': '5px'})
-                        ], width=3),
-                        dbc.Col([
-                            html.Div([
-                                html.Small("RPM", style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left'}),
-                                html.H3(f"{rpm:.0f}", style={'color': '#ff6b6b', 'fontWeight': 'bold', 'margin': '0', 'textAlign': 'left'}),
-                            ], style={'padding': '5px'})
-                        ], width=3),
-                        dbc.Col([
-                            html.Div([
-                                html.Small("Engine Temp", style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left'}),
-                                html.H3(f"{temp_motor:.0f}°", style={'color': '#ff8787', 'fontWeight': 'bold', 'margin': '0', 'textAlign': 'left'}),
-                            ], style={'padding': '5px'})
-                        ], width=3),
-                        dbc.Col([
-                            html.Div([
-                                html.Small("", style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left', 'visibility': 'hidden'}),
-                                html.H3("", style={'margin': '0', 'visibility': 'hidden'}),
-                            ], style={'padding': '5px'})
-                        ], width=3),
-                    ], className='mb-3'),
-
-                    # SECCIÓN 4: FRENOS
-                    html.Hr(style={'borderColor': '#444', 'margin': '5px 0'}),
-                    html.H6("🛑 BRAKING SYSTEM", style={'color': '#00d4ff', 'marginBottom': '5px', 'fontSize': '14px'}),
-                    dbc.Row([
-                        dbc.Col([
-                            html.Div([
-                                html.Small("Brake", style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left'}),
-                                html.H3(f"{brake_avg:.0f}%", style={'color': '#ff6b6b', 'fontWeight': 'bold', 'margin': '0', 'textAlign': 'left'}),
-                            ], style={'padding': '5px'})
-                        ], width=3),
-                        dbc.Col([
-                            html.Div([
-                                html.Small("Brake Temp", style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left'}),
-                                html.H3(f"{temp_frenos:.0f}°", style={'color': '#fa5252', 'fontWeight': 'bold', 'margin': '0', 'textAlign': 'left'}),
-                            ], style={'padding': '5px'})
-                        ], width=3),
-                        dbc.Col([
-                            html.Div([
-                                html.Small("Trail Braking", style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left'}),
-                                html.H3(trail_braking, style={'color': trail_braking_color, 'fontWeight': 'bold', 'margin': '0', 'textAlign': 'left'}),
-                            ], style={'padding': '5px'})
-                        ], width=3),
-                        dbc.Col([
-                            html.Div([
-                                html.Small("", style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left', 'visibility': 'hidden'}),
-                                html.H3("", style={'margin': '0', 'visibility': 'hidden'}),
-                            ], style={'padding': '5px'})
-                        ], width=3),
-                    ], className='mb-3'),
-
-                    # SECCIÓN 5: CONDUCCIÓN
-                    html.Hr(style={'borderColor': '#444', 'margin': '5px 0'}),
-                    html.H6("🎯 DRIVING ANALYSIS", style={'color': '#00d4ff', 'marginBottom': '5px', 'fontSize': '14px'}),
-                    dbc.Row([
-                        dbc.Col([
-                            html.Div([
-                                html.Small("Intensity", style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left'}),
-                                html.H3(f"{intensidad:.0f}", style={'color': '#da77f2', 'fontWeight': 'bold', 'margin': '0', 'textAlign': 'left'}),
-                                html.Small("/100", style={'color': '#666', 'fontSize': '9px', 'textAlign': 'left'})
-                            ], style={'padding': '5px'})
-                        ], width=3),
-                        dbc.Col([
-                            html.Div([
-                                html.Small("Apex Speed", style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left'}),
-                                html.H3(f"{apex_speed:.0f}" if apex_speed > 0 else "N/A",
-                                       style={'color': '#74c0fc', 'fontWeight': 'bold', 'margin': '0', 'textAlign': 'left'}),
-                                html.Small("km/h" if apex_speed > 0 else "", style={'color': '#666', 'fontSize': '9px', 'textAlign': 'left'})
-                            ], style={'padding': '5px'})
-                        ], width=3),
-                        dbc.Col([
-                            html.Div([
-                                html.Small("", style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left', 'visibility': 'hidden'}),
-                                html.H3("", style={'margin': '0', 'visibility': 'hidden'}),
-                            ], style={'padding': '5px'})
-                        ], width=3),
-                        dbc.Col([
-                            html.Div([
-                                html.Small("", style={'color': '#888', 'fontSize': '10px', 'textAlign': 'left', 'visibility': 'hidden'}),
-                                html.H3("", style={'margin': '0', 'visibility': 'hidden'}),
-                            ], style={'padding': '5px'})
-                        ], width=3),
-                    ]),
-                ], style={'backgroundColor': '#0f1419', 'padding': '12px'}),
-            ], className='mb-3', style={'border': '2px solid #00d4ff', 'borderRadius': '10px'})
-
-            vehicle_cards.append(vehicle_card)
-
-    # Layout final con tarjetas
-    if len(vehicle_cards) > 0:
-        tables_layout = html.Div(vehicle_cards)
-    else:
-        tables_layout = dbc.Alert([
-            html.H5("⏳ Esperando datos de telemetría", className='mb-2'),
-            html.P("Cargue un archivo parquet y presione Play para comenzar el monitoreo.", className='mb-0')
-        ], color="info")
+        if rendered is None or rendered.get('skeleton') != skeleton['gen']:
+            # Primer tick de esta generación: tarjetas completas (mismo orden que las posiciones)
+            card_update = card_layout(vehicles, cards)
+        else:
+            # Valores ya mostrados (último render de esta sesión). Si no están en este
+            # worker se envían todos: recalcular el tick anterior movería el motor hacia atrás
+            previous = None
+            cached = session.card_values
+            if cached is not None and cached[:2] == (skeleton['gen'], rendered['index']):
+                previous = cached[2]
+            card_update = card_patch(vehicles, cards, previous)
+        session.card_values = (skeleton['gen'], current_index, cards)
+
+        # Sin tarjetas visibles: mensaje de espera
+        waiting_style = {'display': 'none'} if cards else {}
+        rendered = {'skeleton': skeleton['gen'], 'index': current_index}
 
     # Yellow Flag status (ahora integrado en cada tarjeta de vehículo)
     yellow_status = html.Div()  # Vacío, ya está en las tarjetas
 
     # ML Predictions - GENERAR UNA RECOMENDACIÓN POR VEHÍCULO
-    global last_ml_recommendation
-
-    if in_yellow and current_yellow and ml_model is not None:
-        yf_start = pd.to_datetime(current_yellow['start'])
-        yf_end = pd.to_datetime(current_yellow['end'])
-
+    if in_yellow and current_yellow and pit_model is not None:
         ml_recommendations = []
 
-        # Generar recomendación para CADA vehículo
-        for vehicle_id in sorted(df['vehicle_id'].unique()):
-            # Obtener datos de este vehículo durante Yellow Flag
-            yf_data = df[(df['timestamp'] >= yf_start) & (df['timestamp'] <= yf_end) & (df['vehicle_id'] == vehicle_id)]
-            speed_data = yf_data[yf_data['telemetry_name'] == 'speed']['telemetry_value']
+        # Generar recomendación para CADA vehículo (predicciones ya calculadas arriba)
+        for vehicle_id, prediction_data in yellow_inputs.items():
+            prediction = yellow_predictions[vehicle_id]
+
+            if prediction:
+                # Color según decisión
+                alert_color = 'danger' if prediction['decision'] == 'PIT' else 'info'
+
+                # Análisis contextual
+                is_long = prediction_data['duration'] > 300
+                is_short = prediction_data['duration'] < 60
+                is_very_slow = prediction_data['avg_speed'] < 10
+
+                # Determinar motivo principal
+                if is_long:
+                    motivo = "Long Yellow Flag (>5 min) - Optimal window"
+                elif is_very_slow:
+                    motivo = "Very low speed - High safety probability"
+                elif is_short:
+                    motivo = "Short Yellow Flag - Risk of losing time"
+                else:
+                    motivo = f"Average speed: {prediction_data['avg_speed']:.1f} km/h"
+
+                # DESGASTE INDIVIDUAL POR VEHÍCULO basado en su telemetría
+                # (mismo valor que en la tarjeta: sumas acumuladas de freno y aceleración)
+                tire_wear = estimate_tire_wear(race.rolling_stats, vehicle_id, current_index, elapsed, total_duration)
+
+                # DISTANCIA A PITS usando lap_distance
+                # Indianapolis: Pits en posición ~0 (inicio/fin de vuelta)
+                # Longitud total vuelta: ~4000m
+                lap_dist_data = store.series(vehicle_id, 'lap_distance').upto(current_index).values
+
+                if len(lap_dist_data) > 0:
+                    current_lap_position = float(lap_dist_data[-1])
+                    # Distancia a pits (asumiendo pits en posición 0 o ~4000)
+                    # Si estás cerca del inicio (< 2000m), distancia directa
+                    # Si estás lejos (> 2000m), distancia a completar la vuelta
+                    if current_lap_position < 2000:
+                        distance_to_pits_m = current_lap_position
+                    else:
+                        distance_to_pits_m = 4000 - current_lap_position
+                    distance_to_pits_km = distance_to_pits_m / 1000
+                else:
+                    distance_to_pits_km = None
 
-            if len(speed_data) > 0:
-                prediction_data = {
-                    'duration': current_yellow['duration'],
-                    'min_speed': speed_data.min(),
-                    'avg_speed': speed_data.mean()
-                }
+                # Ventana de tiempo
+                time_remaining = yf_remaining
 
-                prediction = predict_pit_decision(prediction_data, circuit='indianapolis')
+                # Crear recomendación para este vehículo
+                vehicle_recommendation = dbc.Card([
+                    dbc.CardHeader([
+                        html.Strong(f"🏎️ Vehicle: {vehicle_id}", style={'fontSize': '12px', 'color': '#00d4ff'})
+                    ], style={'padding': '4px 8px', 'backgroundColor': '#1a3a4a'}),
+                    dbc.CardBody([
+                        html.Div([
+                            html.H6(f"🎯 {prediction['decision']}", className='mb-1',
+                                   style={'color': '#ff4444' if prediction['decision'] == 'PIT' else '#44ff44'}),
+
+                            # Métricas principales
+                            html.Small([
+                                f"Confidence: {prediction['confidence']:.1f}% | ",
+                                f"Prob PIT: {prediction['pit_probability']:.1f}%"
+                            ], className='mb-1 d-block'),
+
+                            dbc.Progress(
+                                value=prediction['pit_probability'],
+                                color='danger' if prediction['pit_probability'] > 50 else 'success',
+                                className='mb-2',
+                                style={'height': '6px'}
+                            ),
 
-                if prediction:
-                    # Color según decisión
-                    alert_color = 'danger' if prediction['decision'] == 'PIT' else 'info'
+                            # Motivo
+                            html.Div([
+                                html.Strong("📋 ", style={'fontSize': '10px'}),
+                                html.Small(motivo, className='text-muted', style={'fontSize': '10px'})
+                            ], className='mb-1'),
 
-                    # Análisis contextual
-                    is_long = prediction_data['duration'] > 300
-                    is_short = prediction_data['duration'] < 60
-                    is_very_slow = prediction_data['avg_speed'] < 10
+                            # Distancia a pits
+                            html.Div([
+                                html.Strong("📍 Distance to Pits: ", style={'fontSize': '10px'}),
+                                html.Small(
+                                    f"{distance_to_pits_km:.2f} km" if distance_to_pits_km is not None else "N/A",
+                                    className='text-info',
+                                    style={'fontSize': '10px', 'fontWeight': 'bold'}
+                                )
+                            ], className='mb-1'),
 
-                    # Determinar motivo principal
-                    if is_long:
-                        motivo = "Long Yellow Flag (>5 min) - Optimal window"
-                    elif is_very_slow:
-                        motivo = "Very low speed - High safety probability"
-                    elif is_short:
-                        motivo = "Short Yellow Flag - Risk of losing time"
-                    else:
-                        motivo = f"Average speed: {prediction_data['avg_speed']:.1f} km/h"
-
-                    # DESGASTE INDIVIDUAL POR VEHÍCULO basado en su telemetría
-                    vehicle_data_so_far = df[(df['vehicle_id'] == vehicle_id) & (df.index <= current_index)]
-
-                    # Calcular desgaste basado en uso de frenos y aceleraciones
-                    brake_data = vehicle_data_so_far[vehicle_data_so_far['telemetry_name'] == 'brake_front']['telemetry_value']
-                    acc_data = vehicle_data_so_far[vehicle_data_so_far['telemetry_name'] == 'acc_x']['telemetry_value']
-
-                    # Fórmula de desgaste: tiempo + intensidad de frenado + aceleraciones laterales
-                    time_factor = (elapsed / total_duration) * 100
-                    brake_factor = (brake_data.mean() / 100) * 30 if len(brake_data) > 0 else 0
-                    acc_factor = (abs(acc_data).mean() / 10) * 20 if len(acc_data) > 0 else 0
-
-                    tire_wear = min(100, time_factor + brake_factor + acc_factor)
-
-                    # DISTANCIA A PITS usando lap_distance
-                    # Indianapolis: Pits en posición ~0 (inicio/fin de vuelta)
-                    # Longitud total vuelta: ~4000m
-                    lap_dist_data = vehicle_data_so_far[vehicle_data_so_far['telemetry_name'] == 'lap_distance']
-
-                    if len(lap_dist_data) > 0:
-                        current_lap_position = float(lap_dist_data.iloc[-1]['telemetry_value'])
-                        # Distancia a pits (asumiendo pits en posición 0 o ~4000)
-                        # Si estás cerca del inicio (< 2000m), distancia directa
-                        # Si estás lejos (> 2000m), distancia a completar la vuelta
-                        if current_lap_position < 2000:
-                            distance_to_pits_m = current_lap_position
-                        else:
-                            distance_to_pits_m = 4000 - current_lap_position
-                        distance_to_pits_km = distance_to_pits_m / 1000
-                    else:
-                        distance_to_pits_km = None
-
-                    # Ventana de tiempo
-                    time_in_yellow = (current_time - pd.to_datetime(current_yellow['start'])).total_seconds()
-                    time_remaining = current_yellow['duration'] - time_in_yellow
-
-                    # Crear recomendación para este vehículo
-                    vehicle_recommendation = dbc.Card([
-                        dbc.CardHeader([
-                            html.Strong(f"🏎️ Vehicle: {vehicle_id}", style={'fontSize': '12px', 'color': '#00d4ff'})
-                        ], style={'padding': '4px 8px', 'backgroundColor': '#1a3a4a'}),
-                        dbc.CardBody([
+                            # Desgaste llantas individual
                             html.Div([
-                                html.H6(f"🎯 {prediction['decision']}", className='mb-1',
-                                       style={'color': '#ff4444' if prediction['decision'] == 'PIT' else '#44ff44'}),
+                                html.Strong("🔧 Wear: ", style={'fontSize': '10px'}),
+                                dbc.Progress(
+                                    value=tire_wear,
+                                    label=f"{tire_wear:.0f}%",
+                                    color='danger' if tire_wear > 70 else 'warning' if tire_wear > 40 else 'success',
+                                    style={'height': '12px', 'fontSize': '9px'}
+                                )
+                            ], className='mb-1'),
 
-                                # Métricas principales
-                                html.Small([
-                                    f"Confidence: {prediction['confidence']:.1f}% | ",
-                                    f"Prob PIT: {prediction['pit_probability']:.1f}%"
-                                ], className='mb-1 d-block'),
+                            # Yellow Flag timing
+                            html.Small([
+                                f"⏱️ Remaining: {max(0, time_remaining):.0f}s"
+                            ], className='text-muted', style={'fontSize': '9px'})
+                        ])
+                    ], style={'padding': '6px'})
+                ], className='mb-2', style={'border': '1px solid #333'})
 
-                                dbc.Progress(
-                                    value=prediction['pit_probability'],
-                                    color='danger' if prediction['pit_probability'] > 50 else 'success',
-                                    className='mb-2',
-                                    style={'height': '6px'}
-                                ),
-
-                                # Motivo
-                                html.Div([
-                                    html.Strong("📋 ", style={'fontSize': '10px'}),
-                                    html.Small(motivo, className='text-muted', style={'fontSize': '10px'})
-                                ], className='mb-1'),
-
-                                # Distancia a pits
-                                html.Div([
-                                    html.Strong("📍 Distance to Pits: ", style={'fontSize': '10px'}),
-                                    html.Small(
-                                        f"{distance_to_pits_km:.2f} km" if distance_to_pits_km is not None else "N/A",
-                                        className='text-info',
-                                        style={'fontSize': '10px', 'fontWeight': 'bold'}
-                                    )
-                                ], className='mb-1'),
-
-                                # Desgaste llantas individual
-                                html.Div([
-                                    html.Strong("🔧 Wear: ", style={'fontSize': '10px'}),
-                                    dbc.Progress(
-                                        value=tire_wear,
-                                        label=f"{tire_wear:.0f}%",
-                                        color='danger' if tire_wear > 70 else 'warning' if tire_wear > 40 else 'success',
-                                        style={'height': '12px', 'fontSize': '9px'}
-                                    )
-                                ], className='mb-1'),
-
-                                # Yellow Flag timing
-                                html.Small([
-                                    f"⏱️ Remaining: {max(0, time_remaining):.0f}s"
-                                ], className='text-muted', style={'fontSize': '9px'})
-                            ])
-                        ], style={'padding': '6px'})
-                    ], className='mb-2', style={'border': '1px solid #333'})
-
-                    ml_recommendations.append(vehicle_recommendation)
+                ml_recommendations.append(vehicle_recommendation)
 
         if ml_recommendations:
             ml_content = html.Div(ml_recommendations)
             # GUARDAR la última recomendación para mostrarla después del Yellow Flag
-            last_ml_recommendation = ml_content
+            session.last_ml_recommendation = ml_content
         else:
             ml_content = html.Small("Esperando datos...", className='text-muted')
     else:
@@ -1165,9 +1335,9 @@ def update_displays(state, race_data_json):
             ml_content = dbc.Alert([
                 html.Small("Modelos ML no disponibles", className='mb-0')
             ], color='secondary', className='mb-0')
-        elif last_ml_recommendation is not None:
+        elif session.last_ml_recommendation is not None:
             # MOSTRAR la última recomendación hasta que haya un nuevo Yellow Flag
-            ml_content = last_ml_recommendation
+            ml_content = session.last_ml_recommendation
         else:
             ml_content = dbc.Alert([
                 html.Small("Esperando Yellow Flag...", className='mb-0')
@@ -1176,7 +1346,7 @@ def update_displays(state, race_data_json):
     # RESUMEN DE YELLOW FLAGS (al finalizar la simulación)
     yf_summary = ""
     if current_index >= total_records - 1:  # Simulación terminada
-        yellow_flags = race_data_json['yellow_flags']
+        yellow_flags = race.yellow_index.flags
 
         if len(yellow_flags) > 0:
             # Calcular estadísticas
@@ -1190,8 +1360,8 @@ def update_displays(state, race_data_json):
             for i, yf in enumerate(yellow_flags, 1):
                 yf_table_data.append({
                     '#': i,
-                    'Inicio': pd.to_datetime(yf['start']).strftime('%H:%M:%S'),
-                    'Fin': pd.to_datetime(yf['end']).strftime('%H:%M:%S'),
+                    'Inicio': yf['start'].strftime('%H:%M:%S'),
+                    'Fin': yf['end'].strftime('%H:%M:%S'),
                     'Duración (s)': f"{yf['duration']:.0f}",
                     'Duración (min)': f"{yf['duration']/60:.1f}"
                 })
@@ -1276,20 +1446,21 @@ def update_displays(state, race_data_json):
                         dbc.Col([
                             html.Strong("🔴 Longest Yellow Flag: ", style={'fontSize': '11px'}),
                             html.Br(),
-                            html.Small(f"{max_yf['duration']/60:.1f} min ({pd.to_datetime(max_yf['start']).strftime('%H:%M:%S')})",
+                            html.Small(f"{max_yf['duration']/60:.1f} min ({max_yf['start'].strftime('%H:%M:%S')})",
                                       className='text-danger')
                         ], width=6),
                         dbc.Col([
                             html.Strong("🟢 Shortest Yellow Flag: ", style={'fontSize': '11px'}),
                             html.Br(),
-                            html.Small(f"{min_yf['duration']:.0f}s ({pd.to_datetime(min_yf['start']).strftime('%H:%M:%S')})",
+                            html.Small(f"{min_yf['duration']:.0f}s ({min_yf['start'].strftime('%H:%M:%S')})",
                                       className='text-success')
                         ], width=6),
                     ])
                 ])
             ], className='mb-3', style={'border': '2px solid #ffc107'})
 
-    return tables_layout, playback_info, progress, yellow_status, ml_content, yf_summary
+    return (card_update, waiting_style, rendered,
+            playback_info, progress, yellow_status, ml_content, yf_summary, new_state)
 
 
 # ============================================================================
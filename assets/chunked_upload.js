@@ -0,0 +1,163 @@
+/*
+ * Subida de telemetría por bloques (reanudable)
+ * =============================================
+ *
+ * Envía el archivo seleccionado en la zona .chunked-upload-zone en bloques
+ * binarios de 4 MB a los endpoints de upload_stream.py (sin base64). Si la
+ * conexión falla, consulta cuántos bytes recibió el servidor y continúa
+ * desde ahí. El progreso (subida + procesamiento) se muestra en
+ * 'chunked-upload-progress' y el resultado se escribe en el Store
+ * 'chunked-upload-result' para que el callback de Dash cargue la carrera.
+ */
+(function () {
+    'use strict';
+
+    var CHUNK_SIZE = 4 * 1024 * 1024;
+    var MAX_RETRIES = 5;
+    var POLL_MS = 500;
+
+    function setProps(id, props) {
+        if (window.dash_clientside && window.dash_clientside.set_props) {
+            window.dash_clientside.set_props(id, props);
+        }
+    }
+
+    function report(percent, label, color) {
+        setProps('chunked-upload-progress', {
+            value: percent,
+            label: label,
+            color: color || 'info',
+            style: {display: 'flex', height: '18px'}
+        });
+    }
+
+    function sleep(ms) {
+        return new Promise(function (resolve) { setTimeout(resolve, ms); });
+    }
+
+    function newUploadId() {
+        var bytes = new Uint8Array(16);
+        window.crypto.getRandomValues(bytes);
+        return Array.prototype.map.call(bytes, function (b) {
+            return ('0' + b.toString(16)).slice(-2);
+        }).join('');
+    }
+
+    async function fetchJson(url, options) {
+        var response = await fetch(url, options);
+        var body = await response.json().catch(function () { return {}; });
+        if (!response.ok) {
+            var error = new Error(body.error || response.statusText);
+            error.status = response.status;
+            error.body = body;
+            throw error;
+        }
+        return body;
+    }
+
+    async function uploadFile(file, baseUrl) {
+        // Mismo archivo (nombre, tamaño, fecha) => mismo upload_id => se reanuda
+        var key = 'chunked-upload:' + file.name + ':' + file.size + ':' + file.lastModified;
+        var uploadId = window.localStorage.getItem(key) || newUploadId();
+        window.localStorage.setItem(key, uploadId);
+
+        var query = '&filename=' + encodeURIComponent(file.name) + '&size=' + file.size;
+        var status = await fetchJson(baseUrl + '/status/' + uploadId);
+        var offset = status.stage === 'new' || status.stage === 'uploading' ? status.received : 0;
+        var retries = 0;
+
+        while (offset < file.size || file.size === 0) {
+            try {
+                var result = await fetchJson(baseUrl + '/chunk/' + uploadId + '?offset=' + offset + query, {
+                    method: 'POST',
+                    headers: {'Content-Type': 'application/octet-stream'},
+                    body: file.slice(offset, offset + CHUNK_SIZE)
+                });
+                offset = result.received;
+                retries = 0;
+            } catch (error) {
+                if (error.status === 409 && error.body && error.body.received !== undefined) {
+                    offset = error.body.received;  // desfase: continuar desde lo recibido
+                } else if (error.status && error.status < 500) {
+                    throw error;
+                } else if (++retries > MAX_RETRIES) {
+                    throw error;
+                } else {
+                    await sleep(1000 * retries);
+                    status = await fetchJson(baseUrl + '/status/' + uploadId);
+                    offset = status.received;
+                }
+            }
+
+            var uploaded = file.size ? offset / file.size : 1;
+            report(Math.floor(uploaded * 50), 'Uploading ' + Math.floor(uploaded * 100) + '%');
+            if (file.size === 0) {
+                break;
+            }
+        }
+
+        await fetchJson(baseUrl + '/complete/' + uploadId, {method: 'POST'});
+
+        // Procesamiento en el servidor (row groups / chunks)
+        while (true) {
+            status = await fetchJson(baseUrl + '/status/' + uploadId);
+            if (status.stage === 'ready' || status.stage === 'error') {
+                break;
+            }
+            report(50 + Math.floor(status.progress * 50),
+                   'Processing ' + Number(status.rows || 0).toLocaleString() + ' records');
+            await sleep(POLL_MS);
+        }
+
+        window.localStorage.removeItem(key);
+
+        if (status.stage === 'error') {
+            report(100, 'Error: ' + status.error, 'danger');
+        } else {
+            report(100, Number(status.rows).toLocaleString() + ' records', 'success');
+        }
+
+        setProps('chunked-upload-result', {
+            data: {upload_id: uploadId, filename: file.name, timestamp: Date.now()}
+        });
+    }
+
+    function start(file, zone) {
+        report(0, 'Uploading 0%');
+        uploadFile(file, zone.dataset.uploadUrl).catch(function (error) {
+            report(100, 'Error: ' + error.message, 'danger');
+        });
+    }
+
+    // Click: abrir selector de archivo
+    document.addEventListener('click', function (event) {
+        var zone = event.target.closest && event.target.closest('.chunked-upload-zone');
+        if (!zone) {
+            return;
+        }
+        var input = document.createElement('input');
+        input.type = 'file';
+        input.accept = zone.dataset.accept || '';
+        input.addEventListener('change', function () {
+            if (input.files.length) {
+                start(input.files[0], zone);
+            }
+        });
+        input.click();
+    });
+
+    // Drag & drop
+    document.addEventListener('dragover', function (event) {
+        if (event.target.closest && event.target.closest('.chunked-upload-zone')) {
+            event.preventDefault();
+        }
+    });
+
+    document.addEventListener('drop', function (event) {
+        var zone = event.target.closest && event.target.closest('.chunked-upload-zone');
+        if (zone && event.dataTransfer.files.length) {
+            event.preventDefault();
+            start(event.dataTransfer.files[0], zone);
+        }
+    });
+})();
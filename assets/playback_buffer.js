@@ -0,0 +1,219 @@
+/*
+ * Buffer de reproducción en el navegador
+ * ======================================
+ *
+ * En modo 'buffer', Play descarga de playback_buffer.py un chunk columnar con
+ * los próximos segundos de reproducción y el reloj corre en el navegador
+ * (requestAnimationFrame). El chunk siguiente se pide cuando al actual le
+ * quedan menos de PREFETCH_SECONDS. Los valores se escriben directo en los
+ * elementos data-live="<vehicle_id>|<canal>" (o "time").
+ *
+ * Solo se vuelve al servidor (actualizando 'playback-state') cuando cambia el
+ * estado de Yellow Flag y al final de la carrera. La posición del reloj se
+ * publica en 'buffer-playhead' para que Pause la conserve.
+ */
+(function () {
+    'use strict';
+
+    var PREFETCH_SECONDS = 5;
+    var PLAYHEAD_HZ = 4;
+
+    var player = null;  // {session, speed, chunks, frame, since, yellow, pending, raf, published}
+
+    function setProps(id, props) {
+        if (window.dash_clientside && window.dash_clientside.set_props) {
+            window.dash_clientside.set_props(id, props);
+        }
+    }
+
+    function statusElement() {
+        return document.getElementById('client-buffer-status');
+    }
+
+    // Canales a pedir: los que las tarjetas muestran en vivo
+    function liveChannels() {
+        var channels = {};
+        var elements = document.querySelectorAll('[data-live]');
+        for (var k = 0; k < elements.length; k++) {
+            var parts = elements[k].getAttribute('data-live').split('|');
+            if (parts.length === 2) {
+                channels[parts[1]] = true;
+            }
+        }
+        return Object.keys(channels).join(',');
+    }
+
+    function fetchChunk(start) {
+        var status = statusElement();
+        var url = ((status && status.dataset.chunkUrl) || '/playback/chunk') +
+            '?session=' + player.session + '&start=' + start + '&speed=' + player.speed +
+            '&seconds=' + ((status && status.dataset.chunkSeconds) || 10) +
+            '&channels=' + encodeURIComponent(liveChannels());
+        var owner = player;
+        owner.pending = true;
+        return fetch(url).then(function (response) {
+            if (!response.ok) {
+                throw new Error(response.status);
+            }
+            return response.json();
+        }).then(function (chunk) {
+            if (player === owner) {
+                owner.chunks.push(chunk);
+                owner.pending = false;
+            }
+        }).catch(function () {
+            if (player === owner) {
+                stop(owner.lastIndex, 'Client buffer: chunk request failed');
+            }
+        });
+    }
+
+    function render(chunk, frame) {
+        var elements = document.querySelectorAll('[data-live]');
+        for (var k = 0; k < elements.length; k++) {
+            var element = elements[k];
+            var key = element.getAttribute('data-live');
+            var text;
+            if (key === 'time') {
+                text = chunk.time[frame];
+            } else {
+                var parts = key.split('|');
+                var columns = chunk.v[parts[0]];
+                var value = columns && columns[parts[1]] ? columns[parts[1]][frame] : null;
+                if (value === undefined || value === null) {
+                    continue;
+                }
+                text = value.toFixed(Number(element.getAttribute('data-digits') || 0)) +
+                    (element.getAttribute('data-suffix') || '');
+            }
+            if (element.textContent !== text) {
+                element.textContent = text;
+            }
+        }
+    }
+
+    function stop(index, message) {
+        if (!player) {
+            return;
+        }
+        window.cancelAnimationFrame(player.raf);
+        player = null;
+        setProps('buffer-playhead', {data: index});
+        setProps('client-buffer-status', {children: message});
+        setProps('playback-state', {data: {is_playing: false, current_index: index}});
+    }
+
+    function tick(now) {
+        if (!player) {
+            return;
+        }
+        player.raf = window.requestAnimationFrame(tick);
+
+        var chunk = player.chunks[0];
+        if (!chunk) {
+            return;  // esperando el primer chunk
+        }
+        var frame = Math.floor((now - player.since) / 1000 * chunk.hz);
+
+        // Pasar al chunk siguiente (si ya llegó) al agotar el actual
+        while (frame >= chunk.index.length) {
+            if (chunk.end) {
+                stop(chunk.index[chunk.index.length - 1], 'Client buffer: finished');
+                return;
+            }
+            if (player.chunks.length < 2) {
+                // Buffer vacío: congelar el reloj en el último frame hasta que llegue
+                player.since = now - (chunk.index.length - 1) / chunk.hz * 1000;
+                setProps('client-buffer-status', {children: 'Client buffer: buffering...'});
+                return;
+            }
+            player.since += chunk.index.length / chunk.hz * 1000;
+            player.chunks.shift();
+            chunk = player.chunks[0];
+            frame = Math.floor((now - player.since) / 1000 * chunk.hz);
+        }
+        if (frame === player.frame && chunk === player.rendered) {
+            return;
+        }
+        player.frame = frame;
+        player.rendered = chunk;
+        player.lastIndex = chunk.index[frame];
+        render(chunk, frame);
+
+        // Prefetch: pedir el próximo chunk antes de agotar el actual
+        var remaining = (chunk.index.length - frame) / chunk.hz;
+        if (!chunk.end && !player.pending && player.chunks.length < 2 && remaining < PREFETCH_SECONDS) {
+            fetchChunk(chunk.next);
+        }
+
+        // Cambio de Yellow Flag: pedir al servidor el render completo (tarjetas + ML)
+        var yellow = chunk.yellow[frame];
+        if (yellow !== player.yellow) {
+            var first = player.yellow === undefined;
+            player.yellow = yellow;
+            if (!first) {
+                setProps('playback-state', {data: {is_playing: true, current_index: player.lastIndex}});
+            }
+        }
+
+        if (now - player.published >= 1000 / PLAYHEAD_HZ) {
+            player.published = now;
+            setProps('buffer-playhead', {data: player.lastIndex});
+            setProps('client-buffer-status', {
+                children: 'Client buffer: ' + (player.chunks.length * (chunk.index.length / chunk.hz)).toFixed(0) + 's buffered'
+            });
+        }
+    }
+
+    function start(index, speed, session) {
+        player = {
+            session: session,
+            speed: speed,
+            chunks: [],
+            frame: -1,
+            rendered: null,
+            lastIndex: index,
+            yellow: undefined,
+            pending: false,
+            published: 0,
+            since: 0,
+            raf: 0
+        };
+        var owner = player;
+        fetchChunk(index).then(function () {
+            if (player === owner) {
+                owner.since = window.performance.now();
+                owner.raf = window.requestAnimationFrame(tick);
+            }
+        });
+    }
+
+    function close() {
+        if (player) {
+            window.cancelAnimationFrame(player.raf);
+            player = null;
+        }
+    }
+
+    window.dash_clientside = window.dash_clientside || {};
+    window.dash_clientside.playback_buffer = {
+        // Arranca/detiene el reloj local según playback-state, velocidad y modo
+        sync: function (state, speed, mode, session) {
+            var enabled = mode === 'buffer';
+            var playing = Boolean(state && state.is_playing);
+            if (!enabled || !playing) {
+                close();
+                return enabled ? 'Client buffer: paused' : '';
+            }
+            if (player && player.speed === speed) {
+                return window.dash_clientside.no_update;  // eco de un evento de Yellow Flag
+            }
+
+            // Nuevo buffer (o cambio de velocidad: descartar y seguir desde el último frame)
+            var index = player ? player.lastIndex : (state.current_index || 0);
+            close();
+            start(index, speed, session);
+            return 'Client buffer: loading...';
+        }
+    };
+})();
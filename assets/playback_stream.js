@@ -0,0 +1,157 @@
+/*
+ * Reproducción con push del servidor (SSE)
+ * ========================================
+ *
+ * En modo 'push' (selector 'playback-mode'), Play abre un EventSource contra
+ * playback_stream.py y el reloj corre en el servidor. Cada frame trae solo
+ * los canales que cambiaron; se aplican directo a los elementos con
+ * data-live="<vehicle_id>|<canal>" (o "time"). Los frames sync actualizan
+ * 'playback-state' para que update_displays renderice las tarjetas completas.
+ */
+(function () {
+    'use strict';
+
+    var stream = null;  // {id, source, speed, lastIndex, live, time, frames, since, received}
+
+    function setProps(id, props) {
+        if (window.dash_clientside && window.dash_clientside.set_props) {
+            window.dash_clientside.set_props(id, props);
+        }
+    }
+
+    function newStreamId() {
+        var bytes = new Uint8Array(16);
+        window.crypto.getRandomValues(bytes);
+        return Array.prototype.map.call(bytes, function (b) {
+            return ('0' + b.toString(16)).slice(-2);
+        }).join('');
+    }
+
+    function streamUrl() {
+        var status = document.getElementById('server-push-status');
+        return (status && status.dataset.streamUrl) || '/playback/stream';
+    }
+
+    // Escribe los últimos valores conocidos en todos los elementos data-live
+    function render() {
+        var elements = document.querySelectorAll('[data-live]');
+        for (var k = 0; k < elements.length; k++) {
+            var element = elements[k];
+            var key = element.getAttribute('data-live');
+            var text;
+            if (key === 'time') {
+                text = stream.time;
+            } else {
+                var parts = key.split('|');
+                var values = stream.live[parts[0]];
+                var value = values ? values[parts[1]] : undefined;
+                if (value === undefined || value === null) {
+                    continue;
+                }
+                text = value.toFixed(Number(element.getAttribute('data-digits') || 0)) +
+                    (element.getAttribute('data-suffix') || '');
+            }
+            if (text !== undefined && element.textContent !== text) {
+                element.textContent = text;
+            }
+        }
+    }
+
+    function close() {
+        if (stream) {
+            stream.source.close();
+            stream = null;
+        }
+    }
+
+    function onFrame(event) {
+        var frame = JSON.parse(event.data);
+        if (!stream) {
+            return;
+        }
+        stream.received = true;
+        if (frame.end === 'stopped') {
+            close();  // pausa/reset: el callback de Dash ya fijó playback-state
+            return;
+        }
+
+        for (var vehicle in frame.v) {
+            var values = stream.live[vehicle] || (stream.live[vehicle] = {});
+            for (var channel in frame.v[vehicle]) {
+                values[channel] = frame.v[vehicle][channel];
+            }
+        }
+        stream.time = frame.t;
+        stream.lastIndex = frame.i;
+        stream.frames += 1;
+        render();
+
+        if (frame.sync || frame.end) {
+            var seconds = (Date.now() - stream.since) / 1000;
+            var fps = seconds > 0 ? stream.frames / seconds : 0;
+            setProps('server-push-status', {children: 'Server push: ' + fps.toFixed(1) + ' fps'});
+            setProps('playback-state', {
+                data: {is_playing: !frame.end, current_index: frame.i, stream_id: stream.id}
+            });
+            stream.frames = 0;
+            stream.since = Date.now();
+        }
+        if (frame.end) {
+            close();
+        }
+    }
+
+    function open(start, speed, session) {
+        var id = newStreamId();
+        var url = streamUrl() + '/' + id + '?session=' + session + '&start=' + start + '&speed=' + speed;
+        stream = {
+            id: id,
+            source: new EventSource(url),
+            speed: speed,
+            lastIndex: start,
+            live: {},
+            time: undefined,
+            frames: 0,
+            since: Date.now(),
+            received: false
+        };
+        stream.source.onmessage = onFrame;
+        stream.source.onerror = function () {
+            // Sin reconexión automática (la URL tiene el índice inicial)
+            var index = stream ? stream.lastIndex : start;
+            var rejected = stream && !stream.received;
+            close();
+            if (rejected) {
+                // Rechazado antes del primer frame (503: servidor sin threads libres): seguir con ticks del servidor
+                setProps('server-push-status', {children: 'Server push: busy, using server ticks'});
+                setProps('playback-mode', {value: 'interval'});
+                setProps('playback-state', {data: {is_playing: true, current_index: index}});
+                return;
+            }
+            setProps('server-push-status', {children: 'Server push: connection lost'});
+            setProps('playback-state', {data: {is_playing: false, current_index: index}});
+        };
+    }
+
+    window.dash_clientside = window.dash_clientside || {};
+    window.dash_clientside.playback_stream = {
+        // Abre/cierra el stream según playback-state, velocidad y modo
+        sync: function (state, speed, mode, session) {
+            var pushEnabled = mode === 'push';
+            var playing = Boolean(state && state.is_playing);
+            if (!pushEnabled || !playing) {
+                close();
+                return pushEnabled ? 'Server push: paused' : '';
+            }
+            if (stream && stream.speed === speed) {
+                return window.dash_clientside.no_update;  // eco de un frame sync
+            }
+
+            // Nuevo stream (o cambio de velocidad: continuar desde el último frame)
+            var start = stream ? stream.lastIndex : (state.current_index || 0);
+            close();
+            open(start, speed, session);
+            return 'Server push: connecting...';
+        }
+    };
+})();
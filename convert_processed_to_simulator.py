@@ -1,10 +1,14 @@
 """
 Convertir archivos procesados (wide format) a formato simulador (long format)
+
+La conversión la hace wide_to_long (vectorizada, por batches); este script
+solo fija las rutas y los parámetros de la carrera de Barber R2.
 """
 
-import pandas as pd
 from pathlib import Path
 
+from wide_to_long import DEFAULT_CHANNELS, convert
+
 SCRIPT_PATH = Path(__file__).resolve()
 PROJECT_ROOT = SCRIPT_PATH.parent.parent  # toyota-gr-racing-analytics
 INPUT_FILE = PROJECT_ROOT / "data" / "processed" / "telemetry_with_corners_R2.parquet"
@@ -18,67 +22,31 @@ print("\n" + "="*70)
 print("Convirtiendo archivo procesado a formato simulador")
 print("="*70)
 
-# Cargar datos
-print(f"\nCargando: {INPUT_FILE.name}")
-df = pd.read_parquet(INPUT_FILE)
-print(f"Registros originales: {len(df):,}")
-
 # NO limitar - usar todos los datos disponibles para generar archivo más grande
-# df = df.head(10000)
-print(f"Usando todos los registros: {len(df):,}")
+# Downsample: tomar 1 de cada 3 registros para reducir tamaño
+# GPS: VBOX_Lat_Min y VBOX_Long_Minutes se convierten de minutos a grados
+print(f"\nConvirtiendo: {INPUT_FILE.name} (downsample 1/3)")
+print(f"Canales: {DEFAULT_CHANNELS}")
 
-# Convertir VBOX_Lat_Min y VBOX_Long_Minutes a grados decimales
-df['latitude'] = df['VBOX_Lat_Min'] / 60  # Convertir minutos a grados
-df['longitude'] = df['VBOX_Long_Minutes'] / 60
 
-# Downsample: tomar 1 de cada 3 registros para reducir tamaño
-df = df.iloc[::3].copy()
-print(f"Después de downsample (1/3): {len(df):,} registros")
-
-# Seleccionar columnas esenciales con más telemetría
-essential_cols = {
-    'latitude': 'latitude',
-    'longitude': 'longitude',
-    'speed': 'speed',
-    'gear': 'gear',
-    'nmot': 'nmot',
-    'Steering_Angle': 'throttle',  # Usar steering como proxy de throttle
-    'pbrake_f': 'brake'  # Usar freno delantero
-}
-
-# Convertir a formato long
-records = []
-vehicle_id = "GR86-FASTEST"
-
-for idx, row in df.iterrows():
-    timestamp = row['timestamp']
-
-    for col_name, tel_name in essential_cols.items():
-        if col_name in df.columns and pd.notna(row[col_name]):
-            records.append({
-                'timestamp': timestamp,
-                'vehicle_id': vehicle_id,
-                'telemetry_name': tel_name,
-                'telemetry_value': float(row[col_name])
-            })
-
-# Crear DataFrame long
-df_long = pd.DataFrame(records)
-print(f"\nRegistros en formato long: {len(df_long):,}")
-print(f"Telemetry types: {df_long['telemetry_name'].unique()}")
+def progress(rows_in, rows_out):
+    print(f"  {rows_in:,} registros originales -> {rows_out:,} registros long", end='\r')
 
-# Verificar GPS
-gps_count = len(df_long[df_long['telemetry_name'].isin(['latitude', 'longitude'])])
-print(f"Registros GPS: {gps_count} ({gps_count/len(df_long)*100:.1f}%)")
 
-# Guardar
-OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-df_long.to_parquet(OUTPUT_FILE, index=False, compression='snappy')
+summary = convert(INPUT_FILE, OUTPUT_FILE, DEFAULT_CHANNELS, vehicle_id="GR86-FASTEST", every=3, progress=progress)
+
+print(f"\nRegistros originales: {summary['rows_in']:,}")
+print(f"Registros en formato long: {summary['rows_out']:,}")
+print(f"Telemetry types: {list(summary['channels'])}")
+
+# Verificar GPS
+gps_count = summary['channels'].get('latitude', 0) + summary['channels'].get('longitude', 0)
+print(f"Registros GPS: {gps_count} ({gps_count/max(summary['rows_out'], 1)*100:.1f}%)")
 
 file_size_mb = OUTPUT_FILE.stat().st_size / (1024 * 1024)
 print(f"\n[OK] Guardado: {OUTPUT_FILE.name} ({file_size_mb:.1f} MB)")
 
-duration = (df_long['timestamp'].max() - df_long['timestamp'].min()).total_seconds()
+duration = (summary['end'] - summary['start']).total_seconds() if summary['rows_out'] else 0
 print(f"     Duración: {duration:.0f}s ({duration/60:.1f} min)")
 
 print("="*70)
@@ -0,0 +1,167 @@
+"""
+Decimación de Series para Gráficas
+==================================
+
+Una gráfica no puede mostrar más puntos que píxeles: a velocidades altas o en
+ventanas largas, enviar todas las muestras solo agranda el JSON y el trabajo
+del navegador. Aquí cada serie se reduce a un presupuesto de puntos
+(PIXEL_BUDGET) conservando su forma visual:
+
+    lttb     Largest-Triangle-Three-Buckets: un punto por bucket, el que forma
+             el triángulo más grande con el punto anterior y el promedio del
+             bucket siguiente (buena forma general)
+    minmax   Mínimo y máximo de cada bucket de tiempo (conserva picos; es
+             totalmente vectorizado y sirve para los chunks del streaming)
+
+DecimationCache guarda las ventanas ya decimadas de una carrera por
+(vehículo, canal, ventana, presupuesto, método).
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Puntos por trace: del orden del ancho en píxeles de una gráfica
+PIXEL_BUDGET = 800
+
+# Ventanas decimadas guardadas por carrera
+CACHE_SIZE = 256
+
+
+def lttb(x, y, budget):
+    """
+    Índices elegidos por Largest-Triangle-Three-Buckets.
+
+    El primer y el último punto siempre se conservan; el resto se divide en
+    budget - 2 buckets de igual cantidad de muestras. Los promedios de los
+    buckets y las áreas dentro de cada bucket se calculan con NumPy.
+    """
+    n = len(x)
+    if budget >= n or budget < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Buckets de los puntos interiores [1, n-1)
+    edges = np.linspace(1, n - 1, budget - 1).astype(np.intp)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+
+    # Ancla de cada bucket: promedio del siguiente (el último usa el punto final)
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(budget, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for b in range(budget - 2):
+        lo, hi = edges[b], edges[b + 1]
+        area = np.abs((x[a] - next_x[b]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[b] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[b + 1] = a
+
+    return selected
+
+
+def minmax(x, y, budget):
+    """
+    Índices del mínimo y del máximo de cada bucket de tiempo.
+
+    Usa budget // 2 buckets de igual duración; los buckets vacíos no aportan
+    puntos. Resultado ordenado y sin repetidos.
+    """
+    n = len(x)
+    if budget >= n or budget < 2:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    buckets = budget // 2
+    bounds = np.linspace(x[0], x[-1], buckets + 1)[1:-1]
+    starts = np.unique(np.concatenate(([0], np.searchsorted(x, bounds, side='left'))))
+    starts = starts[starts < n]
+
+    counts = np.diff(np.append(starts, n))
+    bucket = np.repeat(np.arange(len(starts)), counts)
+
+    low = np.repeat(np.minimum.reduceat(y, starts), counts)
+    high = np.repeat(np.maximum.reduceat(y, starts), counts)
+
+    # Primera muestra que alcanza el mínimo/máximo de su bucket (los buckets están ordenados)
+    def first_per_bucket(hits):
+        hit_bucket = bucket[hits]
+        first = np.ones(len(hits), dtype=bool)
+        first[1:] = hit_bucket[1:] != hit_bucket[:-1]
+        return hits[first]
+
+    first_low = first_per_bucket(np.flatnonzero(y == low))
+    first_high = first_per_bucket(np.flatnonzero(y == high))
+
+    return np.union1d(first_low, first_high)
+
+
+METHODS = {'lttb': lttb, 'minmax': minmax}
+
+
+def decimate(x, y, budget=PIXEL_BUDGET, method='lttb'):
+    """
+    Reduce una serie a lo sumo a ~budget puntos.
+
+    Args:
+        x: Tiempos ordenados (p.ej. int64 ns)
+        y: Valores (las muestras NaN se descartan)
+        budget: Puntos máximos
+        method: 'lttb' o 'minmax'
+
+    Returns:
+        (x, y) decimados
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(y) <= budget:
+        return x, y
+
+    valid = ~np.isnan(y)
+    if not valid.all():
+        x, y = x[valid], y[valid]
+
+    keep = METHODS[method](x, y, budget)
+    return x[keep], y[keep]
+
+
+class DecimationCache:
+    """Ventanas decimadas de una carrera (LRU por vehículo, canal, ventana y presupuesto)"""
+
+    def __init__(self, store, maxsize=CACHE_SIZE):
+        self.store = store
+        self.maxsize = maxsize
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def window(self, vehicle_id, channel, start_ns, end_ns, budget=PIXEL_BUDGET, method='lttb'):
+        """
+        Muestras del canal con start_ns <= timestamp <= end_ns, decimadas.
+
+        Returns:
+            (timestamps int64 ns, valores)
+        """
+        key = (vehicle_id, channel, int(start_ns), int(end_ns), budget, method)
+        with self._lock:
+            if key in self._windows:
+                self._windows.move_to_end(key)
+                return self._windows[key]
+
+        window = self.store.series(vehicle_id, channel).between(start_ns, end_ns)
+        result = decimate(window.timestamps, window.values, budget, method)
+
+        with self._lock:
+            self._windows[key] = result
+            if len(self._windows) > self.maxsize:
+                self._windows.popitem(last=False)
+        return result
@@ -0,0 +1,72 @@
+"""
+Índice de Vueltas
+=================
+
+Límites de vuelta por vehículo detectados una sola vez al cargar la carrera:
+una vuelta nueva empieza cuando lap_distance cae más de LAP_RESET_DROP
+metros respecto a la muestra anterior (cruce de meta). Con los límites
+ordenados, "vuelta en el instante t" y "inicio de la vuelta n" son una
+búsqueda binaria, y los tiempos por vuelta salen directo del índice.
+"""
+
+import numpy as np
+
+# Caída mínima de lap_distance (metros) que cuenta como vuelta nueva
+LAP_RESET_DROP = 1000
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+class LapIndex:
+    """Límites de vuelta por vehículo (fila y timestamp de cada reset de lap_distance)"""
+
+    def __init__(self, store, drop=LAP_RESET_DROP):
+        self._reset_rows = {}
+        self._reset_ns = {}
+        self._first_ns = {}
+
+        for vehicle_id in store.vehicles:
+            series = store.series(vehicle_id, 'lap_distance')
+            if len(series) == 0:
+                continue
+
+            resets = np.flatnonzero(series.values[1:] < series.values[:-1] - drop) + 1
+            self._reset_rows[vehicle_id] = series.rows[resets].astype(np.int64)
+            self._reset_ns[vehicle_id] = series.timestamps[resets]
+            self._first_ns[vehicle_id] = int(series.timestamps[0])
+
+    def lap_at_index(self, vehicle_id, index):
+        """Vuelta del vehículo considerando las filas 0..index de la carrera"""
+        rows = self._reset_rows.get(vehicle_id, _EMPTY)
+        return 1 + int(np.searchsorted(rows, index, side='right'))
+
+    def lap_at(self, vehicle_id, ns):
+        """Vuelta del vehículo en el instante ns"""
+        reset_ns = self._reset_ns.get(vehicle_id, _EMPTY)
+        return 1 + int(np.searchsorted(reset_ns, ns, side='right'))
+
+    def lap_start(self, vehicle_id, lap):
+        """Timestamp (ns) de inicio de la vuelta `lap` (None si no existe)"""
+        if vehicle_id not in self._first_ns or lap < 1:
+            return None
+        if lap == 1:
+            return self._first_ns[vehicle_id]
+
+        reset_ns = self._reset_ns[vehicle_id]
+        return int(reset_ns[lap - 2]) if lap - 2 < len(reset_ns) else None
+
+    def lap_times(self, vehicle_id):
+        """Duración (s) de cada vuelta completa del vehículo"""
+        reset_ns = self._reset_ns.get(vehicle_id, _EMPTY)
+        if vehicle_id not in self._first_ns or len(reset_ns) == 0:
+            return np.empty(0)
+
+        starts = np.concatenate([[self._first_ns[vehicle_id]], reset_ns])
+        return np.diff(starts) / 1e9
+
+    def last_lap_time(self, vehicle_id, ns):
+        """Duración (s) de la última vuelta completada antes de ns (None si aún no hay)"""
+        lap = self.lap_at(vehicle_id, ns)
+        if lap < 2:
+            return None
+        return (self.lap_start(vehicle_id, lap) - self.lap_start(vehicle_id, lap - 1)) / 1e9
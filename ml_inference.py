@@ -0,0 +1,104 @@
+"""
+Inferencia ML de Decisión de Pit
+================================
+
+Predicción por lotes: una sola matriz de features para todos los vehículos
+y una sola llamada a predict_proba (la decisión se deriva de las
+probabilidades, sin un predict aparte).
+
+Las features de un vehículo dependen solo de la Yellow Flag (duración y
+velocidades durante todo el período), así que el resultado se cachea por
+(yellow flag, vehículo) y se reutiliza en cada tick mientras dure la bandera.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def build_features(inputs, circuit_encoded, race_encoded=0):
+    """
+    Matriz de features del modelo (una fila por entrada).
+
+    Args:
+        inputs: Lista de dicts {'duration', 'min_speed', 'avg_speed'}
+        circuit_encoded: Circuito codificado con label_encoders['circuit']
+        race_encoded: Carrera codificada (0 por defecto)
+    """
+    duration = np.array([data['duration'] for data in inputs], dtype=np.float64)
+    min_speed = np.array([data['min_speed'] for data in inputs], dtype=np.float64)
+    avg_speed = np.array([data['avg_speed'] for data in inputs], dtype=np.float64)
+    n = len(inputs)
+
+    return [
+        duration,
+        min_speed,
+        avg_speed,
+        avg_speed - min_speed,                 # speed_variance
+        (duration > 300).astype(np.int64),     # is_long_yellow
+        (duration < 60).astype(np.int64),      # is_short_yellow
+        (avg_speed < 10).astype(np.int64),     # very_low_speed
+        np.full(n, circuit_encoded),
+        np.full(n, race_encoded)
+    ]
+
+
+class PitDecisionModel:
+    """Modelo de pit con predict_proba por lotes y caché por (yellow flag, vehículo)"""
+
+    def __init__(self, model, label_encoders, feature_columns, circuit):
+        self.model = model
+        self.label_encoders = label_encoders
+        self.feature_columns = feature_columns
+        self.circuit = circuit
+        self._cache = {}
+
+    def clear(self):
+        """Vaciar la caché (al cargar otra carrera)"""
+        self._cache.clear()
+
+    def fork(self):
+        """Mismo modelo con caché propia (una por carrera cargada)"""
+        return PitDecisionModel(self.model, self.label_encoders, self.feature_columns, self.circuit)
+
+    def _predict(self, inputs):
+        circuit_encoded = self.label_encoders['circuit'].transform([self.circuit])[0]
+        columns = build_features(inputs, circuit_encoded)
+        X = pd.DataFrame(dict(zip(self.feature_columns, columns)), columns=self.feature_columns)
+
+        proba = self.model.predict_proba(X)
+        classes = getattr(self.model, 'classes_', np.arange(proba.shape[1]))
+        predicted = classes[np.argmax(proba, axis=1)]
+
+        return [
+            {
+                'decision': 'PIT' if predicted[i] == 1 else 'NO PIT',
+                'confidence': proba[i].max() * 100,
+                'pit_probability': proba[i][1] * 100 if proba.shape[1] > 1 else 0
+            }
+            for i in range(len(inputs))
+        ]
+
+    def predict_batch(self, flag_key, inputs):
+        """
+        Decisión de pit para varios vehículos durante una Yellow Flag.
+
+        Args:
+            flag_key: Identificador de la Yellow Flag (p. ej. inicio en ns)
+            inputs: {vehicle_id: {'duration', 'min_speed', 'avg_speed'}}
+
+        Returns:
+            {vehicle_id: {'decision', 'confidence', 'pit_probability'} o None si falla}
+        """
+        missing = [vehicle_id for vehicle_id in inputs if (flag_key, vehicle_id) not in self._cache]
+
+        if missing:
+            try:
+                predictions = self._predict([inputs[vehicle_id] for vehicle_id in missing])
+            except Exception as e:
+                # No se guarda en caché: el próximo tick vuelve a intentar
+                print(f"Error predicting: {e}")
+            else:
+                for vehicle_id, prediction in zip(missing, predictions):
+                    self._cache[(flag_key, vehicle_id)] = prediction
+
+        return {vehicle_id: self._cache.get((flag_key, vehicle_id)) for vehicle_id in inputs}
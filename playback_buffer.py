@@ -0,0 +1,124 @@
+"""
+Buffer de Reproducción en el Navegador
+======================================
+
+Modo de reproducción en el que el navegador anima la carrera por su cuenta:
+pide al servidor un chunk columnar con los próximos CHUNK_SECONDS de
+reproducción (a la velocidad elegida) muestreados a FRAME_HZ (la fila de
+cada frame sale del RaceClock, como en playback_clock), y avanza el
+reloj localmente con requestAnimationFrame (assets/playback_buffer.js).
+
+El servidor solo interviene para entregar el siguiente chunk (se pide por
+adelantado, antes de agotar el actual) y cuando cambia el estado de Yellow
+Flag, que es cuando update_displays recalcula las tarjetas y el modelo ML.
+
+Endpoint (CHUNK_URL = '/playback/chunk'):
+    GET /playback/chunk?session=&start=&speed=&seconds=&channels=speed,gear,rpm
+
+Formato del chunk (una lista por frame, columnar por vehículo y canal):
+    {'hz', 'index': [...], 'time': [...], 'yellow': [...],
+     'v': {vehicle_id: {canal: [...]}}, 'next': fila del próximo chunk, 'end': bool}
+"""
+
+import numpy as np
+from flask import jsonify, request
+
+CHUNK_URL = '/playback/chunk'
+CHUNK_SECONDS = 10
+FRAME_HZ = 20
+
+# Límite de frames por chunk (protege al servidor de pedidos enormes)
+MAX_CHUNK_SECONDS = 60
+
+# Canales por defecto (los que las tarjetas muestran en vivo)
+BUFFER_CHANNELS = ('speed', 'gear', 'rpm')
+
+
+def _column(series, frame_index):
+    """Último valor de la serie en cada frame (None antes de la primera muestra)"""
+    positions = np.searchsorted(series.rows, frame_index, side='right') - 1
+    values = np.round(series.values[np.maximum(positions, 0)], 2).tolist()
+    if len(positions) > 0 and positions[0] < 0:
+        values = [value if position >= 0 else None for value, position in zip(values, positions)]
+    return values
+
+
+def build_chunk(store, yellow_index, clock, start, speed, seconds=CHUNK_SECONDS, channels=BUFFER_CHANNELS):
+    """
+    Chunk columnar de reproducción desde la fila start.
+
+    Args:
+        store: TelemetryStore de la carrera
+        yellow_index: YellowFlagIndex de la carrera
+        clock: RaceClock de la carrera
+        start: Fila inicial (primer frame)
+        speed: Velocidad de reproducción (1x = tiempo real)
+        seconds: Segundos de reproducción cubiertos por el chunk
+        channels: Canales a incluir
+
+    Returns:
+        dict serializable a JSON (ver docstring del módulo)
+    """
+    total_records = len(store.values)
+    last = total_records - 1
+    step_ns = speed * 1e9 / FRAME_HZ
+
+    # Tiempo de carrera de cada frame (y del primero del próximo chunk) -> fila
+    frames = max(1, int(seconds * FRAME_HZ))
+    offsets = np.round(np.arange(frames + 1) * step_ns).astype(np.int64)
+    boundary_index = clock.index_at(clock.time_at(start) + offsets)
+    frame_index = boundary_index[:-1]
+
+    # Recortar en el final de la carrera (el último frame es la última fila)
+    finished = frame_index[-1] >= last
+    if finished:
+        frame_index = frame_index[:int(np.argmax(frame_index >= last)) + 1]
+
+    frame_ns = store.timestamps[frame_index]
+
+    values = {}
+    for vehicle_id in store.vehicles:
+        columns = {}
+        for channel in channels:
+            series = store.series(vehicle_id, channel)
+            if len(series) > 0 and series.rows[0] <= frame_index[-1]:
+                columns[channel] = _column(series, frame_index)
+        if columns:
+            values[vehicle_id] = columns
+
+    return {
+        'hz': FRAME_HZ,
+        'index': frame_index.tolist(),
+        'time': store.to_datetime(frame_ns).strftime('%H:%M:%S').tolist(),
+        'yellow': yellow_index.active_positions(frame_ns).tolist(),
+        'v': values,
+        'next': int(boundary_index[-1]),
+        'end': bool(finished)
+    }
+
+
+def register_playback_buffer(server, current_race):
+    """
+    Registra el endpoint de chunks en el servidor Flask de Dash.
+
+    Args:
+        server: Servidor Flask (app.server)
+        current_race: Función (session_id) que devuelve (PlaybackEngine,
+            TelemetryStore, YellowFlagIndex, RaceClock) de la carrera de la sesión, o None
+    """
+    @server.route(CHUNK_URL, methods=['GET'])
+    def playback_chunk():
+        race = current_race(request.args.get('session'))
+        if race is None:
+            return jsonify(error="no race loaded"), 404
+        _, store, yellow_index, clock = race
+
+        start = request.args.get('start', 0, type=int)
+        if not 0 <= start < len(store.values):
+            return jsonify(error="start out of range"), 400
+
+        speed = max(0.1, request.args.get('speed', 1, type=float))
+        seconds = min(max(1, request.args.get('seconds', CHUNK_SECONDS, type=int)), MAX_CHUNK_SECONDS)
+        channels = [c for c in request.args.get('channels', '').split(',') if c] or BUFFER_CHANNELS
+
+        return jsonify(build_chunk(store, yellow_index, clock, start, speed, seconds, channels))
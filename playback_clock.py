@@ -0,0 +1,116 @@
+"""
+Reloj de Reproducción
+=====================
+
+La reproducción avanza por tiempo de carrera, no por filas: cada tick
+calcula el tiempo de carrera que corresponde al tiempo real transcurrido
+(× velocidad) desde que empezó a reproducir y busca la fila con
+`searchsorted`. Si un tick llega tarde (el callback anterior tardó más que
+el intervalo), el reloj igual está donde debe y los frames intermedios se
+descartan, así 25x es 25x aunque el archivo tenga 10M filas.
+
+Las filas están ordenadas por timestamp (telemetry_io.finalize_telemetry
+ordena en todas las cargas), así que el tiempo de una fila es su timestamp
+y la búsqueda es un searchsorted directo sobre store.timestamps.
+"""
+
+import time
+
+import numpy as np
+
+
+class RaceClock:
+    """Fila <-> tiempo de carrera (int64 ns, timestamps ordenados)"""
+
+    def __init__(self, timestamps):
+        self.timestamps = timestamps
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def time_at(self, index):
+        """Tiempo de carrera (int64 ns) de la fila index"""
+        return int(self.timestamps[index])
+
+    def index_at(self, ns):
+        """
+        Última fila cuyo tiempo de carrera es <= ns (0 antes de la primera).
+
+        Acepta un escalar o un array de tiempos (p.ej. los frames de un chunk).
+        """
+        index = np.searchsorted(self.timestamps, ns, side='right') - 1
+        index = np.clip(index, 0, len(self.timestamps) - 1)
+        return int(index) if np.ndim(index) == 0 else index
+
+
+def advance(state, clock, speed, interval_ms, now=None):
+    """
+    Avanza playback-state según el tiempo real transcurrido.
+
+    El ancla (tiempo real, tiempo de carrera, velocidad) se guarda en
+    state['clock'] y se rehace al empezar, al cambiar la velocidad o si la
+    fila cambió por fuera del reloj (reset, pausa en otro modo). Además deja
+    en state la velocidad lograda entre los dos últimos ticks y los frames
+    descartados por ticks atrasados.
+
+    Args:
+        state: playback-state ({'is_playing', 'current_index', ...})
+        clock: RaceClock de la carrera
+        speed: Velocidad pedida (1x = tiempo real)
+        interval_ms: Período del dcc.Interval (presupuesto de un tick)
+        now: Tiempo real (time.time(), compartido entre workers)
+
+    Returns:
+        state actualizado
+    """
+    now = time.time() if now is None else now
+    current_index = state.get('current_index', 0)
+    anchor = state.get('clock')
+
+    if anchor is None or anchor['index'] != current_index:
+        # El primer tick llega un intervalo después de Play
+        anchor = {'wall': now - interval_ms / 1000, 'ns': clock.time_at(current_index), 'speed': speed}
+        anchor['last_wall'] = anchor['wall']
+        state['dropped_frames'] = 0
+
+    target_ns = anchor['ns'] + int((now - anchor['wall']) * anchor['speed'] * 1e9)
+    if anchor['speed'] != speed:
+        anchor.update(wall=now, ns=target_ns, speed=speed)
+
+    new_index = clock.index_at(target_ns)
+    finished = new_index >= len(clock) - 1
+
+    # Velocidad lograda: tiempo de carrera mostrado por segundo real entre ticks
+    wall_delta = now - anchor['last_wall']
+    if wall_delta > 0:
+        race_delta = (clock.time_at(new_index) - clock.time_at(current_index)) / 1e9
+        state['achieved_speed'] = round(race_delta / wall_delta, 2)
+    late_ticks = int(wall_delta * 1000 / interval_ms + 0.5) - 1
+    state['dropped_frames'] = state.get('dropped_frames', 0) + max(0, late_ticks)
+    state['requested_speed'] = speed
+
+    anchor.update(index=new_index, last_wall=now)
+    state['current_index'] = new_index
+    if finished:
+        state['is_playing'] = False
+        state.pop('clock', None)
+    else:
+        state['clock'] = anchor
+    return state
+
+
+def stop_clock(state):
+    """Quita el ancla y las métricas del reloj (Play/Pausa/Reset)"""
+    for key in ('clock', 'achieved_speed', 'requested_speed', 'dropped_frames'):
+        state.pop(key, None)
+    return state
+
+
+def speed_label(state):
+    """Texto 'velocidad lograda / pedida' del último tick ('' sin reloj)"""
+    if 'achieved_speed' not in state:
+        return ''
+    label = f"Speed: {state['achieved_speed']:.1f}x / {state['requested_speed']:g}x"
+    if state.get('dropped_frames'):
+        label += f" | Dropped frames: {state['dropped_frames']}"
+    return label
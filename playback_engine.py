@@ -0,0 +1,155 @@
+"""
+Motor de Reproducción Incremental
+=================================
+
+Mantiene el último valor conocido de cada canal de telemetría por vehículo
+en una matriz densa (vehículo × canal) y la avanza solo sobre las filas
+nuevas entre la posición anterior y la nueva posición de reproducción.
+
+Los saltos hacia atrás (o a cualquier punto de la carrera) restauran el
+estado desde checkpoints periódicos construidos al cargar el archivo, en
+lugar de volver a recorrer la carrera desde la fila 0.
+"""
+
+import copy
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Filas entre checkpoints (~10 KB por checkpoint con 20 vehículos × 12 canales)
+CHECKPOINT_EVERY = 100_000
+
+# Marca de "vehículo todavía sin datos"
+_NO_TIMESTAMP = np.iinfo(np.int64).min
+
+
+class PlaybackEngine:
+    """Estado "último valor por vehículo y canal" avanzado incrementalmente"""
+
+    def __init__(self, store, checkpoint_every=CHECKPOINT_EVERY):
+        # Reutiliza los códigos categóricos del TelemetryStore
+        self.vehicles = store.vehicles
+        self.channels = store.channels
+
+        self._n_rows = len(store.values)
+        self._n_vehicles = len(self.vehicles)
+        self._n_channels = len(self.channels)
+        self._every = max(1, int(checkpoint_every))
+
+        self._vehicle_codes = store.vehicle_codes
+        self._cell_codes = self._vehicle_codes * self._n_channels + store.channel_codes
+        self._values = store.values
+        self._timestamps = store.timestamps
+
+        self._lock = threading.Lock()
+
+        # Construir checkpoints en una sola pasada vectorizada
+        self._checkpoints = []
+        self._reset()
+        for start in range(0, max(self._n_rows, 1), self._every):
+            self._checkpoints.append(self._save_state())
+            self._apply(start, min(start + self._every, self._n_rows))
+
+    # ------------------------------------------------------------------
+    # Estado interno
+    # ------------------------------------------------------------------
+
+    def _reset(self):
+        """Estado vacío (ninguna fila aplicada)"""
+        n_cells = self._n_vehicles * self._n_channels
+        self._latest = np.full(n_cells, np.nan)
+        self._seen = np.zeros(n_cells, dtype=bool)
+        self._last_ts = np.full(self._n_vehicles, _NO_TIMESTAMP, dtype=np.int64)
+        self._position = -1
+
+    def _save_state(self):
+        return (self._latest.copy(), self._seen.copy(), self._last_ts.copy(), self._position)
+
+    def _restore(self, checkpoint):
+        latest, seen, last_ts, position = self._checkpoints[checkpoint]
+        self._latest = latest.copy()
+        self._seen = seen.copy()
+        self._last_ts = last_ts.copy()
+        self._position = position
+
+    def _apply(self, start, stop):
+        """Aplica las filas [start, stop) sobre el estado actual"""
+        if stop <= start:
+            return
+
+        cells = self._cell_codes[start:stop]
+        last = stop - start - 1
+
+        # Última ocurrencia de cada celda (vehículo, canal) dentro del bloque
+        unique_cells, from_end = np.unique(cells[::-1], return_index=True)
+        self._latest[unique_cells] = self._values[start:stop][last - from_end]
+        self._seen[unique_cells] = True
+
+        # Último timestamp de cada vehículo (los datos vienen ordenados por tiempo)
+        unique_vehicles, from_end = np.unique(self._vehicle_codes[start:stop][::-1], return_index=True)
+        self._last_ts[unique_vehicles] = self._timestamps[start:stop][last - from_end]
+
+        self._position = stop - 1
+
+    def _seek(self, index):
+        """Mueve el estado hasta incluir la fila index"""
+        index = min(max(int(index), -1), self._n_rows - 1)
+        if index == self._position:
+            return
+
+        checkpoint = min((index + 1) // self._every, len(self._checkpoints) - 1)
+        checkpoint_position = checkpoint * self._every - 1
+
+        # Retroceso o salto más allá del siguiente checkpoint: restaurar
+        if index < self._position or checkpoint_position > self._position:
+            self._restore(checkpoint)
+
+        self._apply(self._position + 1, index + 1)
+
+    def __getstate__(self):
+        # El lock no se serializa (carreras compartidas entre workers)
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        # El estado llega de solo lectura (mmap): arrancar con arrays propios
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._reset()
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def fork(self):
+        """Motor independiente (propio estado y lock) que comparte datos y checkpoints"""
+        engine = copy.copy(self)
+        engine._lock = threading.Lock()
+        engine._reset()
+        return engine
+
+    def snapshot(self, index):
+        """
+        Estado de la carrera con las filas 0..index (inclusive).
+
+        Returns:
+            current_data: {vehicle_id: {telemetry_name: último valor}}
+            vehicle_progress: Serie con el último timestamp (int64 ns) por vehículo
+        """
+        with self._lock:
+            self._seek(index)
+
+            latest = self._latest.reshape(self._n_vehicles, self._n_channels)
+            seen = self._seen.reshape(self._n_vehicles, self._n_channels)
+            active = np.flatnonzero(self._last_ts != _NO_TIMESTAMP)
+
+            current_data = {}
+            for v in active:
+                channels = np.flatnonzero(seen[v])
+                current_data[self.vehicles[v]] = dict(zip(self.channels[channels], latest[v, channels].tolist()))
+
+            vehicle_progress = pd.Series(self._last_ts[active], index=self.vehicles[active], name='timestamp')
+
+        return current_data, vehicle_progress
@@ -0,0 +1,257 @@
+"""
+Reproducción con Push del Servidor (SSE)
+========================================
+
+Modo de reproducción en el que el reloj vive en el servidor: el navegador
+abre un único EventSource y recibe frames compactos a STREAM_HZ con solo
+los canales que cambiaron desde el frame anterior. No hay un round trip
+por tick de dcc.Interval.
+
+El reloj es el mismo de playback_clock: el tiempo real transcurrido ×
+velocidad da el tiempo de carrera y RaceClock la fila (1x = tiempo real).
+
+Cada SYNC_SECONDS (y cuando empieza o termina una Yellow Flag) el frame
+va marcado como sync y el navegador actualiza 'playback-state', que
+dispara el render completo de las tarjetas. El resto de los frames solo
+actualizan los valores en vivo (elementos con data-live) en el navegador.
+
+Endpoint (STREAM_URL = '/playback/stream'):
+    GET /playback/stream/<stream_id>?session=&start=&speed=   text/event-stream de frames
+
+Pausa y reset detienen el stream desde el callback de Dash con stop_stream(),
+que devuelve la posición del reloj del servidor. Con varios workers de
+gunicorn ese callback puede caer en otro proceso: la posición
+(<stream_id>.index) y el pedido de stop (<stream_id>.stop) viven en disco,
+en el directorio compartido, y el loop del stream los escribe/revisa en los
+frames sync.
+
+Cada stream ocupa un thread del worker durante toda la reproducción: por
+proceso se aceptan MAX_STREAMS (debe quedar por debajo de --threads de
+gunicorn para que los callbacks de Dash, incluido el de pausa, tengan
+threads libres). Por encima se responde 503 y el navegador vuelve al modo
+de ticks del servidor.
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+from flask import Response, jsonify, request
+
+STREAM_URL = '/playback/stream'
+STREAM_HZ = 10
+SYNC_SECONDS = 1.0
+
+# Streams abiertos por proceso (gunicorn gthread: dejar threads para los callbacks)
+MAX_STREAMS = int(os.environ.get('PLAYBACK_MAX_STREAMS', 4))
+
+# Máximo del speed-slider
+MAX_SPEED = 25
+
+# Archivos de estado sin escrituras por más de este tiempo son de streams ya cerrados
+STREAM_MAX_AGE_SECONDS = 3600
+
+_STREAM_ID = re.compile(r'^[0-9a-f]{32}$')
+
+# Streams abiertos en este proceso: stream_id -> dict(index, stop)
+_streams = {}
+_streams_lock = threading.Lock()
+_stream_dir = None
+
+
+def _index_path(stream_id):
+    return _stream_dir / f"{stream_id}.index"
+
+
+def _stop_path(stream_id):
+    return _stream_dir / f"{stream_id}.stop"
+
+
+def _write_index(stream_id, index):
+    """Escritura atómica: stop_stream en otro worker lee la posición completa o la anterior"""
+    path = _index_path(stream_id)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(str(index), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def _stop_requested(stream_id):
+    return _stream_dir is not None and _stop_path(stream_id).exists()
+
+
+def sweep_streams(max_age=STREAM_MAX_AGE_SECONDS, now=None):
+    """Borra los archivos de estado de streams cerrados (el stream activo escribe su índice en cada sync)"""
+    if _stream_dir is None:
+        return
+    now = time.time() if now is None else now
+    for path in _stream_dir.iterdir():
+        try:
+            if now - path.stat().st_mtime > max_age:
+                path.unlink()
+        except FileNotFoundError:
+            pass  # otro worker lo borró
+
+
+def _compact(value):
+    """Valor JSON compacto (NaN -> null)"""
+    if value is None or math.isnan(value):
+        return None
+    return round(value, 2)
+
+
+def _frames(stream_id, stream, race, start, speed):
+    """Genera los frames del stream hasta el final de la carrera o hasta stop (de cualquier worker)"""
+    engine, store, yellow_index, clock = race
+    engine = engine.fork()
+    total_records = len(store.values)
+    period = 1.0 / STREAM_HZ
+    start_ns = clock.time_at(min(start, total_records - 1))
+
+    sent = {}
+    in_yellow = None
+    last_sync = None
+    t0 = time.monotonic()
+    frame_time = t0
+
+    while not stream['stop']:
+        now = time.monotonic()
+        index = clock.index_at(start_ns + int((now - t0) * speed * 1e9))
+        finished = index >= total_records - 1
+
+        current_data, _ = engine.snapshot(index)
+
+        # Solo canales que cambiaron desde el frame anterior
+        changes = {}
+        for vehicle_id, values in current_data.items():
+            previous = sent.setdefault(vehicle_id, {})
+            changed = {}
+            for channel, value in values.items():
+                value = _compact(value)
+                if channel not in previous or previous[channel] != value:
+                    changed[channel] = previous[channel] = value
+            if changed:
+                changes[vehicle_id] = changed
+
+        ns = store.timestamp_at(index)
+        current_yellow, _, _ = yellow_index.active(ns)
+        yellow = current_yellow is not None
+
+        sync = finished or yellow != in_yellow or last_sync is None or now - last_sync >= SYNC_SECONDS
+        if sync:
+            last_sync = now
+            # Estado compartido solo en los sync (no un archivo por frame)
+            if _stream_dir is not None:
+                if _stop_requested(stream_id):
+                    break
+                _write_index(stream_id, index)
+        in_yellow = yellow
+
+        frame = {
+            'i': index,
+            't': store.to_datetime([ns])[0].strftime('%H:%M:%S'),
+            'p': round(index / total_records * 100, 2) if total_records > 0 else 0,
+            'y': yellow,
+            'v': changes
+        }
+        if sync:
+            frame['sync'] = True
+        if finished:
+            frame['end'] = 'finished'
+
+        stream['index'] = index
+        yield f"data: {json.dumps(frame, separators=(',', ':'))}\n\n"
+
+        if finished:
+            return
+
+        # Ritmo fijo: si un frame se atrasa, el siguiente salta al índice que corresponde
+        frame_time = max(frame_time + period, time.monotonic())
+        time.sleep(max(0.0, frame_time - time.monotonic()))
+
+    yield f"data: {json.dumps({'i': stream['index'], 'end': 'stopped'})}\n\n"
+
+
+def register_playback_stream(server, current_race, stream_dir=None):
+    """
+    Registra los endpoints del stream en el servidor Flask de Dash.
+
+    Args:
+        server: Servidor Flask (app.server)
+        current_race: Función (session_id) que devuelve (PlaybackEngine,
+            TelemetryStore, YellowFlagIndex, RaceClock) de la carrera de la sesión, o None
+        stream_dir: Directorio compartido por los workers para posición y stop
+            (None = solo este proceso)
+    """
+    global _stream_dir
+    if stream_dir is not None:
+        _stream_dir = Path(stream_dir)
+        _stream_dir.mkdir(parents=True, exist_ok=True)
+        sweep_streams()
+
+    @server.route(f"{STREAM_URL}/<stream_id>", methods=['GET'])
+    def playback_stream(stream_id):
+        if not _STREAM_ID.match(stream_id):
+            return jsonify(error="invalid stream id"), 400
+
+        race = current_race(request.args.get('session'))
+        if race is None:
+            return jsonify(error="no race loaded"), 404
+
+        start = max(0, request.args.get('start', 0, type=int))
+        speed = min(MAX_SPEED, max(0.1, request.args.get('speed', 1, type=float)))
+
+        stream = {'index': start, 'stop': False}
+        with _streams_lock:
+            previous = _streams.get(stream_id)
+            if previous is not None:
+                previous['stop'] = True
+            elif len(_streams) >= MAX_STREAMS:
+                return jsonify(error="too many streams"), 503
+            _streams[stream_id] = stream
+        if _stream_dir is not None:
+            sweep_streams()
+            _stop_path(stream_id).unlink(missing_ok=True)
+            _write_index(stream_id, start)
+
+        def generate():
+            try:
+                yield from _frames(stream_id, stream, race, start, speed)
+            finally:
+                with _streams_lock:
+                    if _streams.get(stream_id) is stream:
+                        del _streams[stream_id]
+                if _stream_dir is not None:
+                    _index_path(stream_id).unlink(missing_ok=True)
+                    _stop_path(stream_id).unlink(missing_ok=True)
+
+        return Response(generate(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+
+
+def stop_stream(stream_id):
+    """
+    Detiene un stream abierto (en este o en otro worker).
+
+    Returns:
+        Último índice enviado al navegador, o None si el stream no existe
+    """
+    with _streams_lock:
+        stream = _streams.get(stream_id)
+        if stream is not None:
+            stream['stop'] = True
+            return stream['index']
+
+    if _stream_dir is None or not _STREAM_ID.match(stream_id or ''):
+        return None
+    try:
+        index = int(_index_path(stream_id).read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return None
+    _stop_path(stream_id).touch()
+    return index
@@ -0,0 +1,263 @@
+"""
+Dataset Parquet Particionado por Vehículo
+=========================================
+
+Formato de sample_data para carreras grandes: un directorio por carrera con
+una partición Hive por vehículo (`vehicle_id=<id>/part-0.parquet`). Dentro
+de cada archivo las filas están ordenadas por (telemetry_name, timestamp) y
+cada canal empieza su propio row group de a lo sumo ROW_GROUP_ROWS filas,
+así las estadísticas min/max de cada row group cubren un solo canal y un
+tramo corto de tiempo.
+
+Al leer, los filtros de vehículo, canal y tiempo se pasan a
+`pyarrow.dataset`: el de vehículo descarta directorios enteros y los de
+canal y tiempo descartan row groups por sus estadísticas, así abrir un solo
+auto de una carrera de 20 lee solo los bytes de ese auto. race_library usa
+solo el de vehículo; canal y tiempo son para lecturas parciales fuera de la app.
+
+telemetry_name se guarda como texto plano (las páginas Parquet igual van con
+diccionario): Arrow no poda row groups por las estadísticas de una columna
+guardada con tipo diccionario.
+
+Uso (convertir un Parquet/CSV plano existente):
+    python race_dataset.py sample_data/sebring_r1_telemetry.parquet sample_data/sebring_r1_telemetry
+"""
+
+import argparse
+import os
+import shutil
+import sys
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from telemetry_io import REQUIRED_COLUMNS, read_telemetry_file
+
+# Filas máximas por row group (un canal de un auto son decenas de miles)
+ROW_GROUP_ROWS = 16_384
+
+PARTITION_FIELD = 'vehicle_id'
+PARTITIONING = ds.partitioning(pa.schema([(PARTITION_FIELD, pa.string())]), flavor='hive')
+DATA_FILE = 'part-0.parquet'
+
+# Columnas crecientes dentro de cada canal: delta en lugar de diccionario
+# (ordenado por canal, cada timestamp es distinto del anterior y el
+# diccionario no comprime)
+DELTA_ENCODING = {'timestamp': 'DELTA_BINARY_PACKED', 'meta_time': 'DELTA_BYTE_ARRAY'}
+
+
+def partition_dirs(path):
+    """Directorios vehicle_id=... del dataset (ordenados)"""
+    path = Path(path)
+    if not path.is_dir():
+        return []
+    return sorted(p for p in path.iterdir() if p.is_dir() and p.name.startswith(f"{PARTITION_FIELD}="))
+
+
+def is_race_dataset(path):
+    """True si path es un directorio de carrera particionado por vehículo"""
+    return len(partition_dirs(path)) > 0
+
+
+def race_vehicles(path):
+    """Vehículos del dataset (sin leer datos: salen de los nombres de directorio)"""
+    return [unquote(p.name.split('=', 1)[1]) for p in partition_dirs(path)]
+
+
+def dataset_nbytes(path):
+    """Bytes en disco del dataset"""
+    return sum(f.stat().st_size for d in partition_dirs(path) for f in d.glob('*.parquet'))
+
+
+def sorted_codes(column):
+    """
+    Códigos de una columna de texto en orden alfabético.
+
+    Returns:
+        (códigos int64 por fila, -1 = nulo; valores distintos ordenados)
+    """
+    array = column.combine_chunks() if isinstance(column, pa.ChunkedArray) else column
+    if not pa.types.is_dictionary(array.type):
+        array = array.dictionary_encode()
+
+    values = array.dictionary.to_pylist()
+    order = sorted(range(len(values)), key=values.__getitem__)
+    rank = np.empty(len(values) + 1, dtype=np.int64)
+    rank[order] = np.arange(len(values))
+    rank[-1] = -1
+    return rank[array.indices.fill_null(len(values)).to_numpy()], [values[i] for i in order]
+
+
+def write_race_dataset(table, path, row_group_rows=ROW_GROUP_ROWS):
+    """
+    Escribe una carrera como dataset particionado por vehículo.
+
+    El directorio se arma aparte y se reemplaza al final (los lectores ven
+    el dataset anterior o el nuevo completo). Las filas sin vehicle_id se
+    descartan.
+
+    Args:
+        table: pyarrow Table con al menos REQUIRED_COLUMNS
+        path: Directorio de salida
+        row_group_rows: Filas máximas por row group
+
+    Returns:
+        Bytes escritos
+    """
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    vehicle_codes, vehicles = sorted_codes(table.column('vehicle_id'))
+    channel_codes, _ = sorted_codes(table.column('telemetry_name'))
+    timestamps = table.column('timestamp').cast(pa.int64()).fill_null(np.iinfo(np.int64).max).to_numpy()
+
+    # Orden (vehículo, canal, tiempo); estable para conservar el orden del archivo en empates
+    order = np.lexsort((timestamps, channel_codes, vehicle_codes))
+    order = order[vehicle_codes[order] >= 0]
+    vehicle_codes = vehicle_codes[order]
+    channel_codes = channel_codes[order]
+
+    table = table.drop_columns(['vehicle_id']).take(pa.array(order))
+    i = table.schema.get_field_index('telemetry_name')
+    table = table.set_column(i, 'telemetry_name', table.column('telemetry_name').cast(pa.string()))
+
+    sorting = [pq.SortingColumn(table.schema.get_field_index(col)) for col in ('telemetry_name', 'timestamp')]
+    encoding = {col: e for col, e in DELTA_ENCODING.items() if col in table.column_names}
+    dictionary = [col for col in table.column_names if col not in encoding]
+    vehicle_starts = np.flatnonzero(np.diff(vehicle_codes, prepend=-2))
+    vehicle_ends = np.append(vehicle_starts[1:], len(order))
+
+    tmp.mkdir(parents=True)
+    for start, end in zip(vehicle_starts, vehicle_ends):
+        directory = tmp / f"{PARTITION_FIELD}={quote(vehicles[vehicle_codes[start]], safe='')}"
+        directory.mkdir()
+
+        # Un row group nuevo por cada canal
+        runs = start + np.flatnonzero(np.diff(channel_codes[start:end], prepend=-2))
+        with pq.ParquetWriter(directory / DATA_FILE, table.schema, compression='snappy', write_statistics=True,
+                              use_dictionary=dictionary, column_encoding=encoding, sorting_columns=sorting) as writer:
+            for run_start, run_end in zip(runs, np.append(runs[1:], end)):
+                writer.write_table(table.slice(run_start, run_end - run_start), row_group_size=row_group_rows)
+
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+    os.replace(tmp, path)
+    return dataset_nbytes(path)
+
+
+def open_race_dataset(path):
+    """pyarrow Dataset de la carrera (vehicle_id sale de la partición)"""
+    return ds.dataset(path, format='parquet', partitioning=PARTITIONING)
+
+
+# Nanosegundos por unidad de una columna timestamp de Arrow
+UNIT_NS = {'s': 1_000_000_000, 'ms': 1_000_000, 'us': 1_000, 'ns': 1}
+
+
+def timestamp_scalar(value, type, round_up=False):
+    """
+    Timestamp/datetime/string/int ns -> escalar Arrow del tipo de la columna (naive = UTC).
+
+    Los ns se pasan a la unidad de la columna antes del cast (el cast de
+    int64 a timestamp interpreta el entero en esa unidad); round_up redondea
+    hacia arriba, para que `>= start` no incluya la fila anterior.
+    """
+    ns = pd.Timestamp(value).value
+    per_unit = UNIT_NS[type.unit] if pa.types.is_timestamp(type) else 1
+    count = -(-ns // per_unit) if round_up else ns // per_unit
+    return pa.scalar(count, type=pa.int64()).cast(type)
+
+
+def race_filter(dataset, vehicles=None, channels=None, start=None, end=None):
+    """Expresión de filtro de pyarrow.dataset (None = sin filtro)"""
+    conditions = []
+    if vehicles:
+        conditions.append(ds.field('vehicle_id').isin(list(vehicles)))
+    if channels:
+        conditions.append(ds.field('telemetry_name').isin(list(channels)))
+
+    timestamp_type = dataset.schema.field('timestamp').type
+    if start is not None:
+        conditions.append(ds.field('timestamp') >= timestamp_scalar(start, timestamp_type, round_up=True))
+    if end is not None:
+        conditions.append(ds.field('timestamp') <= timestamp_scalar(end, timestamp_type))
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def read_race_dataset(path, vehicles=None, channels=None, start=None, end=None,
+                      columns=REQUIRED_COLUMNS, progress=None):
+    """
+    Lee una carrera particionada con los filtros empujados al dataset.
+
+    Args:
+        path: Directorio del dataset
+        vehicles: vehicle_id a leer (None = todos)
+        channels: telemetry_name a leer (None = todos)
+        start, end: Rango de tiempo inclusivo (None = sin límite)
+        columns: Columnas a leer
+        progress: Callback opcional progress(fraction, rows)
+
+    Returns:
+        DataFrame (sin ordenar por timestamp; ver telemetry_io.finalize_telemetry)
+    """
+    dataset = open_race_dataset(path)
+    expression = race_filter(dataset, vehicles, channels, start, end)
+
+    # El filtro de vehículo descarta particiones antes de abrir archivos
+    fragments = list(dataset.get_fragments(filter=expression))
+    tables = []
+    rows = 0
+    for i, fragment in enumerate(fragments):
+        table = fragment.to_table(schema=dataset.schema, columns=columns, filter=expression)
+        if 'telemetry_name' in table.column_names:
+            # Texto plano en disco (para podar); diccionario en memoria
+            name_col = table.schema.get_field_index('telemetry_name')
+            table = table.set_column(name_col, 'telemetry_name', table.column(name_col).dictionary_encode())
+        tables.append(table)
+        rows += table.num_rows
+        if progress:
+            progress((i + 1) / len(fragments), rows)
+
+    if len(tables) == 0:
+        return dataset.schema.empty_table().select(columns).to_pandas()
+
+    table = pa.concat_tables(tables)
+    del tables
+    return table.to_pandas(self_destruct=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convierte un Parquet/CSV de telemetría plano a dataset particionado por vehículo")
+    parser.add_argument('input', help="Parquet o CSV plano (formato long)")
+    parser.add_argument('output', help="Directorio del dataset")
+    parser.add_argument('--row-group-rows', type=int, default=ROW_GROUP_ROWS, help="Filas máximas por row group")
+    args = parser.parse_args(argv)
+
+    if args.input.lower().endswith('.parquet'):
+        table = pq.read_table(args.input)
+    else:
+        df = read_telemetry_file(args.input)
+        if df is None:
+            parser.error(f"{args.input}: formato inválido")
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+    nbytes = write_race_dataset(table, args.output, args.row_group_rows)
+    vehicles = race_vehicles(args.output)
+    print(f"[OK] {args.output}: {table.num_rows:,} registros, {len(vehicles)} vehículos, {nbytes / (1024**2):.2f} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,456 @@
+"""
+Ingesta de Telemetría Cruda (CSV → Dataset Parquet)
+===================================================
+
+Los CSV crudos de cada carrera (varios GB, formato long) se convierten a las
+carreras de sample_data con un solo pipeline; cada carrera de salida es una
+entrada de TRACKS (CSV de origen, canales y su nombre final, downsample,
+límite de registros, vehículos y Yellow Flags). Los scripts create_* solo
+eligen su entrada.
+
+- Lector CSV en streaming de Arrow: los bloques se parsean y convierten en
+  paralelo (use_threads) y solo se leen las columnas pedidas
+- Tipos fijos para las columnas conocidas del CSV crudo (el lector en
+  streaming infiere el resto del primer bloque)
+- vehicle_id, telemetry_name y meta_* como diccionario: el filtro de canales
+  y el renombre se resuelven sobre el diccionario de cada bloque y se aplican
+  a las filas como una búsqueda de códigos en NumPy, antes de tocar el resto
+  de las columnas
+- Salida como dataset particionado por vehículo y ordenado por canal y
+  tiempo (ver race_dataset)
+- Varias carreras a la vez en un pool de procesos (una carrera por proceso,
+  los hilos de Arrow repartidos entre procesos)
+
+Uso:
+    python race_ingest.py                                  # todas las entradas
+    python race_ingest.py sebring_r1 road_america_r1 --workers 2
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+from race_dataset import write_race_dataset
+from telemetry_io import REQUIRED_COLUMNS, parse_timestamps
+from yellow_flags import detect_yellow_flags
+
+SCRIPT_PATH = Path(__file__).resolve()
+PROJECT_ROOT = SCRIPT_PATH.parent.parent
+TOYOTA_PROJECT = PROJECT_ROOT.parent
+CODE_ROOT = TOYOTA_PROJECT / "Code"
+OUTPUT_DIR = PROJECT_ROOT / "simulator" / "sample_data"
+
+# Bytes por bloque del lector CSV (unidad de trabajo de cada hilo)
+BLOCK_SIZE = 16 << 20
+
+# Columnas de texto con pocos valores distintos
+DICTIONARY_COLUMNS = ('vehicle_id', 'original_vehicle_id', 'telemetry_name', 'meta_event', 'meta_session', 'meta_source')
+
+# Tipos del CSV crudo (timestamp se parsea después de filtrar)
+RAW_COLUMN_TYPES = {
+    'timestamp': pa.string(),
+    'telemetry_value': pa.float64(),
+    'expire_at': pa.float64(),
+    'lap': pa.int64(),
+    'outing': pa.int64(),
+    'vehicle_number': pa.int64(),
+    'meta_time': pa.string(),
+    **{col: pa.dictionary(pa.int32(), pa.string()) for col in DICTIONARY_COLUMNS}
+}
+
+# Canal crudo -> telemetry_name de salida
+FULL_TELEMETRY = {
+    'VBOX_Lat_Min': 'latitude',
+    'VBOX_Long_Minutes': 'longitude',
+    'speed': 'speed',
+    'gear': 'gear',
+    'Steering_Angle': 'steering',
+    'pbrake_f': 'brake_front',
+    'pbrake_r': 'brake_rear',
+    'aps': 'throttle_pos',
+    'nmot': 'rpm',
+    'accx_can': 'acc_x',
+    'accy_can': 'acc_y',
+    'Laptrigger_lapdist_dls': 'lap_distance'
+}
+
+ESSENTIAL_TELEMETRY = {
+    'VBOX_Lat_Min': 'latitude',
+    'VBOX_Long_Minutes': 'longitude',
+    'speed': 'speed',
+    'gear': 'gear',
+    'Steering_Angle': 'throttle',  # Steering como proxy de throttle
+    'pbrake_f': 'brake'
+}
+
+# Canales GPS en minutos (se convierten a grados)
+MINUTE_CHANNELS = ('VBOX_Lat_Min', 'VBOX_Long_Minutes')
+
+INDIANAPOLIS_R1 = CODE_ROOT / "indianapolis" / "indianapolis" / "R1_indianapolis_motor_speedway_telemetry.csv"
+
+# Valores por defecto de una entrada de TRACKS
+DEFAULT_SPEC = {
+    'columns': None,        # None = todas las columnas del CSV
+    'every': 1,             # Downsample: 1 de cada every registros filtrados
+    'max_records': None,    # Registros filtrados a conservar (corte exacto)
+    'max_raw_rows': None,   # Filas crudas a leer como máximo
+    'vehicles': 1,          # Primeros N vehículos (orden alfabético) o 'first' (primero del archivo)
+    'yellow_flags': None    # None, 'field' o 'by_vehicle'
+}
+
+TRACKS = {
+    'indianapolis_r1_mega': {
+        'title': "Indianapolis R1 MEGA con TODA la telemetría",
+        'input': INDIANAPOLIS_R1,
+        'output': OUTPUT_DIR / "indianapolis_r1_mega_telemetry",
+        'channels': FULL_TELEMETRY,
+        'max_records': 10_000_000,
+        'yellow_flags': 'by_vehicle'
+    },
+    'indianapolis_r1_full': {
+        'title': "Indianapolis R1 con TODA la telemetría",
+        'input': INDIANAPOLIS_R1,
+        'output': OUTPUT_DIR / "indianapolis_r1_full_telemetry",
+        'channels': FULL_TELEMETRY,
+        'max_records': 3_000_000,
+        'vehicles': 2,
+        'yellow_flags': 'by_vehicle'
+    },
+    'indianapolis_r1_with_yellow_flags': {
+        'title': "Indianapolis R1 con Yellow Flags y GPS",
+        'input': INDIANAPOLIS_R1,
+        'output': OUTPUT_DIR / "indianapolis_r1_with_yellow_flags",
+        'channels': {**ESSENTIAL_TELEMETRY, 'aps': 'aps'},
+        'columns': REQUIRED_COLUMNS,
+        'every': 2,
+        'max_records': 5_000_000,
+        'vehicles': 5,
+        'yellow_flags': 'field'
+    },
+    'sebring_r1': {
+        'title': "Sebring R1 con telemetría completa",
+        'input': CODE_ROOT / "sebring" / "sebring" / "Sebring" / "Race 1" / "sebring_telemetry_R1.csv",
+        'output': OUTPUT_DIR / "sebring_r1_telemetry",
+        'channels': FULL_TELEMETRY,
+        'max_records': 10_000_000,
+        'yellow_flags': 'by_vehicle'
+    },
+    'road_america_r1': {
+        'title': "Road America R1 con telemetría completa",
+        'input': CODE_ROOT / "road-america" / "road-america" / "Road America" / "Race 1" / "R1_road_america_telemetry_data.csv",
+        'output': OUTPUT_DIR / "road_america_r1_telemetry",
+        'channels': FULL_TELEMETRY,
+        'max_records': 10_000_000,
+        'yellow_flags': 'by_vehicle'
+    },
+    'barber_r2_large': {
+        'title': "Barber R2 muestra GRANDE con GPS",
+        'input': CODE_ROOT / "barber-motorsports-park" / "barber" / "R2_barber_telemetry_data.csv",
+        'output': OUTPUT_DIR / "barber_r2_large",
+        'channels': ESSENTIAL_TELEMETRY,
+        'columns': REQUIRED_COLUMNS,
+        'every': 15,
+        'max_raw_rows': 15_000_000,
+        'vehicles': 'first'
+    }
+}
+
+
+def track_spec(track):
+    """Entrada de TRACKS (nombre o dict) completada con DEFAULT_SPEC"""
+    spec = TRACKS[track] if isinstance(track, str) else track
+    return {**DEFAULT_SPEC, 'name': track if isinstance(track, str) else spec.get('name', 'track'), **spec}
+
+
+def read_header(path):
+    """Nombres de columna del CSV"""
+    with open(path, newline='') as handle:
+        return next(csv.reader(handle))
+
+
+def channel_lookup(dictionary, channels, names):
+    """
+    Código de salida de cada entrada del diccionario de un bloque.
+
+    Returns:
+        Array int32 (índice en names, -1 = canal descartado); la última
+        posición corresponde a las filas sin telemetry_name
+    """
+    positions = {name: i for i, name in enumerate(names)}
+    codes = [positions.get(channels.get(value), -1) for value in dictionary.to_pylist()]
+    return np.array(codes + [-1], dtype=np.int32)
+
+
+def parse_timestamp_column(values):
+    """Strings ISO -> timestamp[ns, UTC] (respaldo con pandas si el formato no es uniforme)"""
+    try:
+        return values.cast(pa.timestamp('ns', tz='UTC'))
+    except pa.ArrowInvalid:
+        return pa.array(parse_timestamps(values.to_pandas()))
+
+
+def filter_block(batch, channels, names, minute_codes, every=1, seen=0):
+    """
+    Filtra, renombra y convierte un bloque del CSV.
+
+    Args:
+        batch: RecordBatch crudo (telemetry_name como diccionario)
+        channels: dict canal crudo -> telemetry_name
+        names: telemetry_name de salida ordenados (diccionario de salida)
+        minute_codes: Códigos de salida de los canales GPS en minutos
+        every: Downsample, 1 de cada every registros filtrados
+        seen: Registros filtrados en los bloques anteriores (para every)
+
+    Returns:
+        (Table filtrada, registros que pasaron el filtro de canal)
+    """
+    column = batch.column('telemetry_name')
+    lookup = channel_lookup(column.dictionary, channels, names)
+    codes = lookup[column.indices.fill_null(len(column.dictionary)).to_numpy()]
+
+    rows = np.flatnonzero(codes >= 0)
+    matched = len(rows)
+    if every > 1:
+        rows = rows[-seen % every::every]
+    codes = codes[rows]
+
+    table = pa.Table.from_batches([batch]).take(pa.array(rows))
+
+    values = table.column('telemetry_value')
+    minutes = np.isin(codes, minute_codes)
+    if minutes.any():
+        values = pc.if_else(pa.array(minutes), pc.divide(values, 60.0), values)
+
+    updates = {
+        'telemetry_name': pa.DictionaryArray.from_arrays(pa.array(codes, type=pa.int32()), pa.array(names, type=pa.string())),
+        'telemetry_value': values,
+        'timestamp': parse_timestamp_column(table.column('timestamp'))
+    }
+    for col, array in updates.items():
+        i = table.schema.get_field_index(col)
+        table = table.set_column(i, col, array)
+    return table, matched
+
+
+def read_race(spec, progress=None):
+    """
+    Lee el CSV crudo de una entrada con el lector en streaming de Arrow.
+
+    Args:
+        spec: Entrada de TRACKS completa (track_spec)
+        progress: Callback opcional progress(filas crudas, registros incluidos)
+
+    Returns:
+        (Table con los registros incluidos, filas crudas leídas)
+    """
+    header = read_header(spec['input'])
+    columns = [col for col in (spec['columns'] or header) if col in header]
+    missing = [col for col in REQUIRED_COLUMNS if col not in columns]
+    if missing:
+        raise ValueError(f"{spec['input']}: faltan columnas {missing}")
+
+    channels = spec['channels']
+    names = sorted(set(channels.values()))
+    minute_codes = [names.index(channels[c]) for c in MINUTE_CHANNELS if c in channels]
+
+    read_options = pacsv.ReadOptions(use_threads=True, block_size=BLOCK_SIZE)
+    convert_options = pacsv.ConvertOptions(
+        include_columns=columns,
+        column_types={col: t for col, t in RAW_COLUMN_TYPES.items() if col in columns}
+    )
+
+    tables = []
+    raw_rows = 0
+    matched = 0
+    included = 0
+
+    with pacsv.open_csv(spec['input'], read_options=read_options, convert_options=convert_options) as reader:
+        for batch in reader:
+            if spec['max_raw_rows'] is not None:
+                batch = batch.slice(0, spec['max_raw_rows'] - raw_rows)
+            raw_rows += batch.num_rows
+
+            table, block_matched = filter_block(batch, channels, names, minute_codes, spec['every'], matched)
+            matched += block_matched
+            if spec['max_records'] is not None:
+                table = table.slice(0, spec['max_records'] - included)
+            tables.append(table)
+            included += table.num_rows
+
+            if progress:
+                progress(raw_rows, included)
+
+            if (spec['max_records'] is not None and included >= spec['max_records']) or \
+                    (spec['max_raw_rows'] is not None and raw_rows >= spec['max_raw_rows']):
+                break
+
+    if len(tables) == 0:
+        raise ValueError(f"{spec['input']}: sin filas de datos")
+
+    # Un diccionario por columna para todos los bloques
+    return pa.concat_tables(tables).unify_dictionaries(), raw_rows
+
+
+def select_vehicles(table, vehicles):
+    """Filtra los primeros N vehículos (orden alfabético) o el primero del archivo ('first')"""
+    column = table.column('vehicle_id')
+    if len(column) == 0:
+        return table, []
+
+    if vehicles == 'first':
+        selected = [column[0].as_py()]
+    else:
+        present = pc.unique(column)
+        if pa.types.is_dictionary(present.type):
+            present = present.dictionary.take(present.indices)
+        selected = sorted(v for v in present.to_pylist() if v is not None)[:vehicles]
+
+    return table.filter(pc.is_in(column, value_set=pa.array(selected, type=pa.string()))), selected
+
+
+def ingest_track(track, progress=True):
+    """
+    Pipeline completo de una entrada de TRACKS: CSV crudo -> dataset Parquet.
+
+    Args:
+        track: Nombre en TRACKS o dict con las mismas claves
+        progress: Mostrar el avance de la lectura
+
+    Returns:
+        dict resumen (registros, vehículos, canales, duración, Yellow Flags, tamaño)
+    """
+    spec = track_spec(track)
+    name = spec['name']
+    start = time.perf_counter()
+
+    print(f"[{name}] {spec['title']}")
+    print(f"[{name}] Input: {spec['input']} ({Path(spec['input']).stat().st_size / (1024**3):.2f} GB)")
+
+    def report_progress(raw_rows, included):
+        print(f"  [{name}] {raw_rows:,} filas leídas -> {included:,} incluidas", end='\r')
+
+    table, raw_rows = read_race(spec, report_progress if progress else None)
+    if progress:
+        print()
+    print(f"[{name}] {raw_rows:,} filas crudas -> {table.num_rows:,} registros")
+
+    table, vehicles = select_vehicles(table, spec['vehicles'])
+    print(f"[{name}] Vehículos seleccionados: {vehicles} ({table.num_rows:,} registros)")
+
+    yellow_flags = []
+    if spec['yellow_flags']:
+        df = table.select(REQUIRED_COLUMNS).to_pandas()
+        if spec['yellow_flags'] == 'by_vehicle':
+            # Ventanas de 5s desde la primera muestra de cada vehículo (como los scripts originales)
+            yellow_flags = detect_yellow_flags(df, by_vehicle=True, window_origin='start')
+        else:
+            yellow_flags = detect_yellow_flags(df)
+        del df
+
+    output = Path(spec['output'])
+    output.parent.mkdir(parents=True, exist_ok=True)
+    nbytes = write_race_dataset(table, output)
+
+    bounds = pc.min_max(table.column('timestamp')).as_py() if table.num_rows > 0 else {'min': None, 'max': None}
+    names = table.column('telemetry_name').unique()
+    if pa.types.is_dictionary(names.type):
+        names = names.dictionary.take(names.indices)
+
+    return {
+        'name': name,
+        'title': spec['title'],
+        'output': str(output),
+        'raw_rows': raw_rows,
+        'records': table.num_rows,
+        'vehicles': vehicles,
+        'channels': sorted(names.to_pylist()),
+        'start': bounds['min'],
+        'end': bounds['max'],
+        'yellow_flags': yellow_flags,
+        'size_mb': nbytes / (1024**2),
+        'seconds': time.perf_counter() - start
+    }
+
+
+def report(summary):
+    """Imprime el resumen de ingest_track"""
+    duration_minutes = (summary['end'] - summary['start']).total_seconds() / 60 if summary['start'] else 0.0
+
+    print("\n" + "="*70)
+    print(f"RESUMEN - {summary['title'].upper()}")
+    print("="*70)
+    print(f"Registros totales:    {summary['records']:,} (de {summary['raw_rows']:,} filas crudas)")
+    print(f"Vehiculos:            {len(summary['vehicles'])} {summary['vehicles']}")
+    print(f"Columnas telemetria:  {len(summary['channels'])} {summary['channels']}")
+    print(f"Duracion:             {duration_minutes:.1f} minutos ({duration_minutes/60:.1f} horas)")
+    print(f"Yellow Flags:         {len(summary['yellow_flags'])}")
+    for i, yf in enumerate(summary['yellow_flags'][:10], 1):
+        vehicle = f" | {yf['vehicle_id']}" if 'vehicle_id' in yf else ''
+        print(f"    {i}. Inicio: {yf['start'].isoformat()[:19]} | Duracion: {yf['duration']:.0f}s{vehicle}")
+    if len(summary['yellow_flags']) > 10:
+        print(f"    ... y {len(summary['yellow_flags']) - 10} mas")
+    print(f"Tamano archivo:       {summary['size_mb']:.2f} MB")
+    print(f"Tiempo:               {summary['seconds']:.1f}s")
+    print(f"Ubicacion:            {summary['output']}")
+    print("="*70)
+
+
+def _init_worker(threads):
+    """Reparte los hilos de Arrow entre los procesos del pool"""
+    pa.set_cpu_count(threads)
+
+
+def _ingest_quiet(track):
+    return ingest_track(track, progress=False)
+
+
+def ingest_tracks(tracks, workers=None):
+    """
+    Ingesta varias entradas de TRACKS en paralelo (una por proceso).
+
+    Args:
+        tracks: Nombres en TRACKS (o dicts con las mismas claves)
+        workers: Procesos del pool (por defecto min(entradas, CPUs))
+
+    Returns:
+        Lista de resúmenes en el orden de tracks
+    """
+    tracks = list(tracks)
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(workers or cpus, len(tracks)))
+
+    if workers == 1:
+        return [ingest_track(track) for track in tracks]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(max(1, cpus // workers),)) as pool:
+        return list(pool.map(_ingest_quiet, tracks))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convierte los CSV crudos de telemetría a las carreras de sample_data")
+    parser.add_argument('tracks', nargs='*', metavar='TRACK',
+                        help=f"Entradas a generar (por defecto todas): {', '.join(TRACKS)}")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos en paralelo (por defecto uno por CPU)")
+    args = parser.parse_args(argv)
+
+    unknown = [track for track in args.tracks if track not in TRACKS]
+    if unknown:
+        parser.error(f"entradas desconocidas: {', '.join(unknown)}")
+
+    for summary in ingest_tracks(args.tracks or list(TRACKS), args.workers):
+        report(summary)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Biblioteca de Carreras del Servidor
+===================================
+
+Catálogo de los archivos de `sample_data/` que se pueden abrir sin
+subirlos desde el navegador. La primera vez que se abre una carrera se
+convierte al formato interno (ordenada por timestamp, vehicle_id y
+telemetry_name categóricos) y se guarda como caché Arrow IPC/Feather sin
+comprimir. Las siguientes cargas hacen memory-map de esa caché: abrir la
+carrera cuesta milisegundos y las páginas del archivo se comparten entre
+los workers de gunicorn a través del page cache del sistema.
+
+Las carreras guardadas como dataset particionado por vehículo (directorio,
+ver race_dataset) se pueden abrir para algunos vehículos: solo se leen sus
+particiones y cada selección tiene su propia caché. La biblioteca poda solo
+por vehículo: las tarjetas, yellow flags y estadísticas usan todos los
+canales y toda la carrera, así que los filtros de canal y tiempo de
+read_race_dataset quedan para quien lea el dataset directamente.
+"""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from race_dataset import dataset_nbytes, is_race_dataset, race_vehicles, read_race_dataset
+from telemetry_io import finalize_telemetry, read_telemetry_file
+
+# Versión del formato de caché (cambiarla invalida las cachés existentes)
+CACHE_VERSION = 1
+RACE_EXTENSIONS = ('.parquet', '.csv')
+
+
+class RaceLibrary:
+    """Carreras disponibles en el servidor con caché Arrow memory-mapped"""
+
+    def __init__(self, sample_dir, cache_dir):
+        self.sample_dir = Path(sample_dir)
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._build_lock = threading.Lock()
+
+    def _source_path(self, race_id):
+        # race_id viene del navegador: solo nombres directos de sample_dir (sin '..' ni separadores)
+        if not isinstance(race_id, str) or race_id in ('', '.', '..') or Path(race_id).name != race_id:
+            return None
+        # El dataset particionado tiene prioridad sobre un archivo plano del mismo nombre
+        if is_race_dataset(self.sample_dir / race_id):
+            return self.sample_dir / race_id
+        for extension in RACE_EXTENSIONS:
+            path = self.sample_dir / f"{race_id}{extension}"
+            if path.exists():
+                return path
+        return None
+
+    def _cache_path(self, race_id, vehicles=None):
+        if not vehicles:
+            return self.cache_dir / f"{race_id}.v{CACHE_VERSION}.arrow"
+        selection = hashlib.sha1('\n'.join(sorted(vehicles)).encode()).hexdigest()[:12]
+        return self.cache_dir / f"{race_id}.{selection}.v{CACHE_VERSION}.arrow"
+
+    def _is_cached(self, race_id, source, vehicles=None):
+        cache = self._cache_path(race_id, vehicles)
+        return cache.exists() and cache.stat().st_mtime >= source.stat().st_mtime
+
+    def list_races(self):
+        """Lista de carreras: [{'race_id', 'filename', 'size_mb', 'cached'}]"""
+        races = []
+        if not self.sample_dir.exists():
+            return races
+
+        datasets = {path.name for path in self.sample_dir.iterdir() if is_race_dataset(path)}
+        for path in sorted(self.sample_dir.iterdir()):
+            if path.name in datasets:
+                size = dataset_nbytes(path)
+                race_id = path.name
+            elif path.suffix.lower() in RACE_EXTENSIONS and path.stem not in datasets:
+                size = path.stat().st_size
+                race_id = path.stem
+            else:
+                continue
+            races.append({
+                'race_id': race_id,
+                'filename': path.name,
+                'size_mb': size / (1024 * 1024),
+                'cached': self._is_cached(race_id, path)
+            })
+        return races
+
+    def vehicles(self, race_id):
+        """Vehículos que se pueden abrir por separado ([] si la carrera no está particionada)"""
+        source = self._source_path(race_id)
+        if source is None or not source.is_dir():
+            return []
+        return race_vehicles(source)
+
+    def dropdown_options(self):
+        """Opciones para dcc.Dropdown"""
+        return [
+            {'label': f"{race['filename']} ({race['size_mb']:.1f} MB)", 'value': race['race_id']}
+            for race in self.list_races()
+        ]
+
+    def _build_cache(self, race_id, source, vehicles=None):
+        """Convierte la fuente a Arrow IPC sin comprimir (escritura atómica)"""
+        if source.is_dir():
+            # Solo filtro de vehículo (ver docstring del módulo)
+            df = finalize_telemetry(read_race_dataset(source, vehicles=vehicles))
+        else:
+            df = read_telemetry_file(source)
+        if df is None or len(df) == 0:
+            return False
+
+        cache = self._cache_path(race_id, vehicles)
+        tmp = cache.with_name(f"{cache.name}.{os.getpid()}.tmp")
+        feather.write_feather(df, tmp, compression='uncompressed')
+        os.replace(tmp, cache)  # otros workers ven la caché completa o nada
+        return True
+
+    def load(self, race_id, vehicles=None):
+        """
+        Abre una carrera de la biblioteca.
+
+        Args:
+            race_id: Carrera de list_races()
+            vehicles: Vehículos a abrir (solo carreras particionadas; None = todos)
+
+        Returns:
+            (DataFrame respaldado por memory-map, filename) o (None, None) si
+            la carrera no existe o algún vehículo no es de la carrera
+        """
+        source = self._source_path(race_id)
+        if source is None:
+            return None, None
+        if not source.is_dir():
+            vehicles = None
+        elif vehicles and not set(vehicles) <= set(race_vehicles(source)):
+            return None, None
+
+        with self._build_lock:
+            if not self._is_cached(race_id, source, vehicles) and not self._build_cache(race_id, source, vehicles):
+                return None, source.name
+
+        # Memory-map: los buffers numéricos apuntan directo al archivo
+        with pa.memory_map(str(self._cache_path(race_id, vehicles)), 'r') as source_map:
+            table = pa.ipc.open_file(source_map).read_all()
+        df = table.to_pandas(split_blocks=True)
+
+        return df, source.name
@@ -0,0 +1,268 @@
+"""
+Carreras por Sesión
+===================
+
+Cada pestaña del navegador tiene un token de sesión (dcc.Store 'session-id')
+y los callbacks resuelven su carrera con él, en lugar de leer globals del
+módulo que otra sesión puede pisar al cargar otro archivo.
+
+Una misma carrera (p.ej. la misma carrera de la biblioteca) se construye una
+sola vez y la comparten todas las sesiones que la usan (conteo de
+referencias). Se mide la memoria de cada carrera y, si el total supera el
+presupuesto (RACE_MEMORY_BUDGET_MB), se desalojan las carreras usadas hace
+más tiempo (LRU), primero las que ninguna sesión referencia.
+
+Con un SharedRaceStore (shared_races.py) las carreras y la asignación
+sesión → carrera se publican en disco: los workers de gunicorn abren la
+misma copia memory-mapped y cualquiera puede atender a cualquier sesión.
+El modelo de pit no se publica: cada worker le asigna una copia del suyo
+al abrir la carrera.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from lap_index import LapIndex
+from playback_clock import RaceClock
+from playback_engine import PlaybackEngine
+from rolling_stats import RollingAggregates
+from telemetry_store import TelemetryStore
+from yellow_flags import YellowFlagIndex, detect_yellow_flags
+
+# Debe alcanzar al menos para la carrera más grande (la de Indianapolis completa mide ~257 MB):
+# una carrera sola por encima del presupuesto queda cargada pero desaloja todas las demás
+MEMORY_BUDGET_BYTES = int(float(os.environ.get('RACE_MEMORY_BUDGET_MB', 1024)) * 1024**2)
+
+# Sesiones sin actividad por más de este tiempo liberan su referencia
+SESSION_IDLE_SECONDS = 2 * 3600
+
+
+def measure_nbytes(*objects):
+    """
+    Bytes de los arrays NumPy y objetos pandas alcanzables desde objects.
+
+    Recorre dicts, listas, tuplas y atributos (__dict__ / __slots__); las
+    vistas cuentan una sola vez el buffer que las respalda.
+    """
+    seen = set()
+    owners = {}
+    total = 0
+    stack = list(objects)
+
+    while stack:
+        obj = stack.pop()
+        if obj is None or isinstance(obj, (str, bytes, int, float, bool)) or id(obj) in seen:
+            continue
+        seen.add(id(obj))
+
+        if isinstance(obj, np.ndarray):
+            owner = obj
+            while isinstance(owner.base, np.ndarray):
+                owner = owner.base
+            owners[id(owner)] = owner.nbytes
+        elif isinstance(obj, pd.DataFrame):
+            total += int(obj.memory_usage(index=True, deep=True).sum())
+        elif isinstance(obj, (pd.Series, pd.Index)):
+            total += int(obj.memory_usage(deep=True))
+        elif isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set)):
+            stack.extend(obj)
+        else:
+            stack.extend(getattr(obj, '__dict__', {}).values())
+            for slot in getattr(type(obj), '__slots__', ()):
+                stack.append(getattr(obj, slot, None))
+
+    return total + sum(owners.values())
+
+
+class LoadedRace:
+    """Estado derivado de una carrera cargada (store, motor, índices y resumen)"""
+
+    def __init__(self, df, filename, pit_model=None):
+        yellow_flags = detect_yellow_flags(df)
+
+        self.df = df
+        self.filename = filename
+        self.store = TelemetryStore(df)
+        self.engine = PlaybackEngine(self.store)
+        self.clock = RaceClock(self.store.timestamps)
+        self.yellow_index = YellowFlagIndex(yellow_flags, store=self.store)
+        self.lap_index = LapIndex(self.store)
+        self.rolling_stats = RollingAggregates(self.store)
+        self.pit_model = pit_model
+
+        # Metadatos de la carrera (el dcc.Store 'race-data-store' solo guarda la race_key)
+        self.summary = {
+            'yellow_flags': yellow_flags,
+            'total_records': len(df),
+            'vehicles': df['vehicle_id'].unique().tolist(),
+            'start_time': df['timestamp'].min().isoformat(),
+            'end_time': df['timestamp'].max().isoformat()
+        }
+
+        self.nbytes = measure_nbytes(self.df, self.store, self.engine, self.clock, self.yellow_index,
+                                     self.lap_index, self.rolling_stats)
+        self.refcount = 0
+
+    def __getstate__(self):
+        # El modelo sklearn no va en el archivo compartido (ver RaceRegistry._load)
+        state = self.__dict__.copy()
+        state['pit_model'] = None
+        return state
+
+
+class RaceSession:
+    """Carrera asignada a una sesión y su estado de interfaz"""
+
+    def __init__(self, race_key, race):
+        self.race_key = race_key
+        self.race = race
+        self.engine = race.engine.fork()  # Motor propio: otra sesión no lo mueve entre ticks
+        self.last_ml_recommendation = None
+        self.card_values = None  # (layout, índice, valores) de las últimas tarjetas enviadas
+        self.last_seen = time.monotonic()
+        self.last_touch = self.last_seen
+
+
+class RaceRegistry:
+    """Carreras cargadas (LRU con presupuesto de memoria) y sesiones que las usan"""
+
+    def __init__(self, budget_bytes=MEMORY_BUDGET_BYTES, idle_seconds=SESSION_IDLE_SECONDS, shared=None,
+                 pit_model=None):
+        self.budget_bytes = budget_bytes
+        self.idle_seconds = idle_seconds
+        self.shared = shared
+        self.pit_model = pit_model  # Modelo del proceso para las carreras abiertas del SharedRaceStore
+        self._races = OrderedDict()  # race_key -> LoadedRace (menos reciente primero)
+        self._sessions = {}          # session_id -> RaceSession
+        self._lock = threading.Lock()
+
+    def attach(self, session_id, race_key, build):
+        """
+        Asigna una carrera a la sesión, construyéndola solo si no está cargada.
+
+        Args:
+            session_id: Token de sesión del navegador
+            race_key: Identidad de la carrera (p.ej. 'library:<id>' o 'upload:<id>')
+            build: Función sin argumentos que devuelve LoadedRace (o None si falla);
+                None para solo abrir una carrera ya publicada por otro worker
+
+        Returns:
+            LoadedRace o None si build falló
+        """
+        with self._lock:
+            race = self._races.get(race_key)
+
+        if race is None:
+            # Construir/abrir fuera del lock (puede tardar segundos)
+            race = self._load(race_key, build)
+            if race is None:
+                return None
+
+        with self._lock:
+            # Otra sesión pudo construir la misma carrera mientras tanto
+            race = self._races.setdefault(race_key, race)
+            self._races.move_to_end(race_key)
+
+            self._release(session_id)
+            self._sessions[session_id] = RaceSession(race_key, race)
+            race.refcount += 1
+
+            self._expire_sessions()
+            self._evict(keep=race_key)
+
+        if self.shared is not None:
+            self.shared.bind(session_id, race_key)
+            self.shared.prune(self.idle_seconds, keep=race_key)
+
+        return race
+
+    def get(self, session_id):
+        """RaceSession de la sesión (None si no tiene carrera o fue desalojada)"""
+        # La asignación publicada manda: la sesión pudo cargar otra carrera en otro worker
+        race_key = self.shared.lookup(session_id) if self.shared is not None else None
+
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and (race_key is None or session.race_key == race_key):
+                session.last_seen = time.monotonic()
+                if session.race_key in self._races:
+                    self._races.move_to_end(session.race_key)
+                if self.shared is not None and session.last_seen - session.last_touch > 60:
+                    session.last_touch = session.last_seen
+                    self.shared.touch(session_id)
+                return session
+
+        if race_key is None or self.attach(session_id, race_key, None) is None:
+            return None
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def detach(self, session_id):
+        """Libera la carrera de la sesión"""
+        with self._lock:
+            self._release(session_id)
+        if self.shared is not None:
+            self.shared.unbind(session_id)
+
+    def memory_usage(self):
+        """Bytes medidos de todas las carreras cargadas"""
+        with self._lock:
+            return sum(race.nbytes for race in self._races.values())
+
+    def _load(self, race_key, build):
+        """Abre la carrera publicada o la construye (y publica) con build"""
+        if self.shared is None:
+            return build() if build is not None else None
+
+        race = self.shared.open(race_key)
+        if race is None and build is not None:
+            built = build()
+            if built is None:
+                return None
+            self.shared.publish(race_key, built)
+            self.shared.prune(self.idle_seconds, keep=race_key)
+            # Este worker también usa la copia compartida (libera la suya)
+            race = self.shared.open(race_key)
+        if race is not None:
+            race.refcount = 0
+            race.pit_model = self.pit_model.fork() if self.pit_model is not None else None
+        return race
+
+    def _release(self, session_id):
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.race.refcount -= 1
+
+    def _expire_sessions(self):
+        limit = time.monotonic() - self.idle_seconds
+        for session_id in [s for s, session in self._sessions.items() if session.last_seen < limit]:
+            self._release(session_id)
+
+    def _evict(self, keep):
+        """Desaloja carreras LRU hasta entrar en el presupuesto (sin referencias primero)"""
+        total = sum(race.nbytes for race in self._races.values())
+        if self._races[keep].nbytes > self.budget_bytes:
+            print(f"[RACES] {keep} ({self._races[keep].nbytes / 1024**2:.0f} MB) exceeds RACE_MEMORY_BUDGET_MB "
+                  f"({self.budget_bytes / 1024**2:.0f} MB)")
+
+        for only_unreferenced in (True, False):
+            for race_key in list(self._races):
+                if total <= self.budget_bytes:
+                    return
+                race = self._races[race_key]
+                if race_key == keep or (only_unreferenced and race.refcount > 0):
+                    continue
+
+                del self._races[race_key]
+                total -= race.nbytes
+                for session_id in [s for s, session in self._sessions.items() if session.race_key == race_key]:
+                    del self._sessions[session_id]
+                print(f"[RACES] Evicted {race_key} ({race.nbytes / 1024**2:.0f} MB, {race.refcount} sessions)")
@@ -0,0 +1,123 @@
+"""
+Agregados Móviles por Vehículo
+==============================
+
+Sumas prefijo (valor y valor absoluto) y máximo acumulado por vehículo ×
+canal, construidos una vez al cargar la carrera. Con ellos, la media de
+las últimas N muestras hasta una fila, la media desde el inicio de la
+carrera o el máximo acumulado cuestan una búsqueda binaria y una resta,
+sin importar el largo de la carrera. El mínimo de las últimas N muestras
+recorre solo esas N (ventanas cortas).
+
+El conteo acumulado es la propia posición en la serie: el store ya excluye
+las muestras NaN.
+"""
+
+import numpy as np
+
+# Canales usados por las tarjetas (temperaturas estimadas, intensidad, top speed)
+ROLLING_CHANNELS = ('speed', 'rpm', 'brake_front', 'acc_x', 'acc_y')
+
+
+class PrefixSeries:
+    """Sumas prefijo de un ChannelSeries (posición k = primeras k muestras)"""
+
+    __slots__ = ('rows', 'timestamps', 'values', 'csum', 'cabs', 'cmax')
+
+    def __init__(self, series):
+        values = series.values
+        self.rows = series.rows
+        self.values = values
+        self.timestamps = series.timestamps
+        self.csum = np.concatenate([[0.0], np.cumsum(values)])
+        self.cabs = np.concatenate([[0.0], np.cumsum(np.abs(values))])
+        self.cmax = np.maximum.accumulate(values)
+
+    def count_upto(self, index):
+        """Muestras con fila <= index"""
+        return int(np.searchsorted(self.rows, index, side='right'))
+
+    def count_until(self, ns):
+        """Muestras con timestamp <= ns"""
+        return int(np.searchsorted(self.timestamps, ns, side='right'))
+
+
+class RollingAggregates:
+    """Medias de ventana móvil y máximos acumulados por vehículo × canal"""
+
+    def __init__(self, store, channels=ROLLING_CHANNELS):
+        self._prefix = {}
+        for vehicle_id in store.vehicles:
+            for channel in channels:
+                series = store.series(vehicle_id, channel)
+                if len(series) > 0:
+                    self._prefix[(vehicle_id, channel)] = PrefixSeries(series)
+
+    def prefix(self, vehicle_id, channel):
+        """PrefixSeries del vehículo y canal (None si no hay datos)"""
+        return self._prefix.get((vehicle_id, channel))
+
+    def tail_mean(self, vehicle_id, channel, index, window, absolute=False):
+        """
+        Media de las últimas `window` muestras con fila <= index.
+
+        Returns:
+            float o None si no hay muestras
+        """
+        prefix = self.prefix(vehicle_id, channel)
+        if prefix is None:
+            return None
+
+        stop = prefix.count_upto(index)
+        start = max(0, stop - window)
+        if stop == start:
+            return None
+
+        sums = prefix.cabs if absolute else prefix.csum
+        return (sums[stop] - sums[start]) / (stop - start)
+
+    def tail_min(self, vehicle_id, channel, index, window):
+        """Mínimo de las últimas `window` muestras con fila <= index (None si no hay muestras)"""
+        prefix = self.prefix(vehicle_id, channel)
+        if prefix is None:
+            return None
+
+        stop = prefix.count_upto(index)
+        if stop == 0:
+            return None
+        return float(prefix.values[max(0, stop - window):stop].min())
+
+    def mean_upto(self, vehicle_id, channel, index, absolute=False):
+        """Media desde el inicio de la carrera hasta la fila index (None si no hay muestras)"""
+        prefix = self.prefix(vehicle_id, channel)
+        if prefix is None:
+            return None
+
+        stop = prefix.count_upto(index)
+        if stop == 0:
+            return None
+
+        sums = prefix.cabs if absolute else prefix.csum
+        return sums[stop] / stop
+
+    def mean_until(self, vehicle_id, channel, ns, absolute=False):
+        """Media desde el inicio de la carrera hasta el instante ns (None si no hay muestras)"""
+        prefix = self.prefix(vehicle_id, channel)
+        if prefix is None:
+            return None
+
+        stop = prefix.count_until(ns)
+        if stop == 0:
+            return None
+
+        sums = prefix.cabs if absolute else prefix.csum
+        return sums[stop] / stop
+
+    def max_upto(self, vehicle_id, channel, index):
+        """Máximo desde el inicio hasta la fila index (None si no hay muestras)"""
+        prefix = self.prefix(vehicle_id, channel)
+        if prefix is None:
+            return None
+
+        stop = prefix.count_upto(index)
+        return prefix.cmax[stop - 1] if stop > 0 else None
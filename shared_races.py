@@ -0,0 +1,225 @@
+"""
+Carreras Compartidas entre Workers
+==================================
+
+Con gunicorn y varios workers, cada proceso tenía su propia copia de la
+carrera (DataFrame, TelemetryStore, checkpoints del motor, sumas prefijo).
+Aquí la carrera construida (LoadedRace) se publica una sola vez en un
+archivo de TEMP_DIR: el pickle (protocolo 5) va en la cabecera y los
+buffers de todos los arrays NumPy van fuera de banda, alineados, en el
+resto del archivo. Cada worker abre el archivo con mmap y los arrays apuntan
+directo a esas páginas: una sola copia en memoria (page cache del sistema)
+sin importar la cantidad de workers.
+
+El registro es el propio directorio:
+    <dir>/<sha1(race_key)>.race     carrera publicada
+    <dir>/sessions/<session_id>     race_key asignada a la sesión
+
+Así cualquier worker puede atender cualquier tick de cualquier sesión.
+prune() (al publicar y al asignar) borra las sesiones inactivas, las
+carreras que ninguna sesión usa y, si los archivos superan el presupuesto
+de disco (RACE_DISK_BUDGET_MB), las carreras usadas hace más tiempo (los
+workers que aún las tengan mapeadas siguen leyendo el archivo borrado).
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import re
+import struct
+import time
+from pathlib import Path
+
+DISK_BUDGET_BYTES = int(float(os.environ.get('RACE_DISK_BUDGET_MB', 2048)) * 1024**2)
+
+# Una carrera recién publicada todavía no tiene sesión: no se borra por eso antes de este tiempo
+PUBLISH_GRACE_SECONDS = 60
+
+_MAGIC = b'GRRACE01'
+_ALIGN = 64
+_SESSION_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+def _aligned(offset):
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class SharedRaceStore:
+    """Carreras publicadas en archivos memory-mapped y sesiones que las usan"""
+
+    def __init__(self, directory, budget_bytes=DISK_BUDGET_BYTES):
+        self.directory = Path(directory)
+        self.budget_bytes = budget_bytes
+        self.sessions_dir = self.directory / "sessions"
+        self.sessions_dir.mkdir(parents=True, exist_ok=True)
+
+    def _race_path(self, race_key):
+        return self.directory / f"{hashlib.sha1(race_key.encode('utf-8')).hexdigest()}.race"
+
+    def _write_atomic(self, path, write):
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, 'wb') as f:
+            write(f)
+        os.replace(tmp, path)  # otros workers ven el archivo completo o nada
+
+    # ------------------------------------------------------------------
+    # Carreras
+    # ------------------------------------------------------------------
+
+    def publish(self, race_key, race):
+        """Escribe la carrera (reemplaza atómicamente una publicación anterior)"""
+        path = self._race_path(race_key)
+
+        buffers = []
+        data = pickle.dumps(race, protocol=5, buffer_callback=buffers.append)
+        raws = [buffer.raw() for buffer in buffers]
+
+        # Cabecera: [magic][largo del índice][índice JSON] y luego pickle + buffers alineados
+        offsets = []
+        offset = _aligned(len(data))
+        for raw in raws:
+            offsets.append([offset, raw.nbytes])
+            offset = _aligned(offset + raw.nbytes)
+        index = json.dumps({'pickle': len(data), 'buffers': offsets}).encode('utf-8')
+        base = _aligned(len(_MAGIC) + 8 + len(index))
+
+        def write(f):
+            f.write(_MAGIC)
+            f.write(struct.pack('<Q', len(index)))
+            f.write(index)
+            f.seek(base)
+            f.write(data)
+            for (start, _), raw in zip(offsets, raws):
+                f.seek(base + start)
+                f.write(raw)
+
+        self._write_atomic(path, write)
+
+    def open(self, race_key):
+        """
+        Abre una carrera publicada.
+
+        Returns:
+            LoadedRace con arrays de solo lectura sobre el mmap, o None si no
+            existe o no se puede leer (p.ej. publicada por otra versión del código)
+        """
+        path = self._race_path(race_key)
+        try:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None  # no existe, vacío o truncado (mmap de 0 bytes)
+        try:
+            os.utime(path)  # uso reciente (orden de prune por presupuesto)
+        except OSError:
+            pass
+
+        view = memoryview(mapped)
+        try:
+            if bytes(view[:len(_MAGIC)]) != _MAGIC:
+                raise ValueError("not a shared race file")
+            (index_length,) = struct.unpack('<Q', view[len(_MAGIC):len(_MAGIC) + 8])
+            index = json.loads(bytes(view[len(_MAGIC) + 8:len(_MAGIC) + 8 + index_length]))
+            base = _aligned(len(_MAGIC) + 8 + index_length)
+
+            buffers = [view[base + start:base + start + length] for start, length in index['buffers']]
+            return pickle.loads(view[base:base + index['pickle']], buffers=buffers)
+        except Exception as e:
+            print(f"[RACES] Could not open shared race {race_key}: {e}")
+            # Sin carrera no queda nada que use el mapeo: liberarlo ya (no esperar al GC)
+            buffers = None
+            try:
+                view.release()
+                mapped.close()
+            except BufferError:
+                pass  # quedan vistas vivas del pickle parcial: las libera el GC
+            return None
+
+    # ------------------------------------------------------------------
+    # Sesiones
+    # ------------------------------------------------------------------
+
+    def bind(self, session_id, race_key):
+        """Registra la carrera de la sesión (visible para todos los workers)"""
+        if _SESSION_ID.match(session_id or ''):
+            self._write_atomic(self.sessions_dir / session_id, lambda f: f.write(race_key.encode('utf-8')))
+
+    def lookup(self, session_id):
+        """race_key de la sesión (None si no tiene carrera)"""
+        if not _SESSION_ID.match(session_id or ''):
+            return None
+        try:
+            return (self.sessions_dir / session_id).read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return None
+
+    def touch(self, session_id):
+        """Marca la sesión como activa (para prune)"""
+        if _SESSION_ID.match(session_id or ''):
+            try:
+                os.utime(self.sessions_dir / session_id)
+            except FileNotFoundError:
+                pass
+
+    def unbind(self, session_id):
+        if _SESSION_ID.match(session_id or ''):
+            (self.sessions_dir / session_id).unlink(missing_ok=True)
+
+    def prune(self, max_age_seconds, keep=None):
+        """
+        Borra sesiones inactivas, carreras sin sesiones y, por encima del
+        presupuesto de disco, las carreras usadas hace más tiempo (sin
+        sesiones primero; las sesiones de una carrera borrada la pierden).
+
+        Args:
+            max_age_seconds: Sesiones sin actividad por más de este tiempo se borran
+            keep: race_key que no se borra (la recién publicada o asignada)
+        """
+        now = time.time()
+        limit = now - max_age_seconds
+        bindings = {}  # archivo .race -> sesiones que lo usan
+
+        for path in self.sessions_dir.iterdir():
+            try:
+                if path.stat().st_mtime < limit:
+                    path.unlink()
+                else:
+                    bindings.setdefault(self._race_path(path.read_text(encoding='utf-8')).name, []).append(path)
+            except FileNotFoundError:
+                pass  # otro worker la borró
+
+        keep_name = self._race_path(keep).name if keep is not None else None
+        races = []
+        total = 0
+        for path in self.directory.glob('*.race'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.name != keep_name and path.name not in bindings and stat.st_mtime < now - PUBLISH_GRACE_SECONDS:
+                self._unlink(path)
+                continue
+            total += stat.st_size
+            if path.name != keep_name:
+                races.append((path.name in bindings, stat.st_mtime, path, stat.st_size))
+
+        # Presupuesto de disco: LRU (por mtime, ver open) y sin sesiones primero
+        for _, _, path, size in sorted(races):
+            if total <= self.budget_bytes:
+                break
+            if self._unlink(path):
+                total -= size
+                for session in bindings.get(path.name, ()):
+                    session.unlink(missing_ok=True)
+                print(f"[RACES] Pruned shared race {path.name} ({size / 1024**2:.0f} MB, {len(bindings.get(path.name, ()))} sessions)")
+
+    def _unlink(self, path):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass  # otro worker la borró
+        except OSError:
+            return False  # mapeada (Windows)
+        return True
@@ -0,0 +1,145 @@
+"""
+Lectura de Archivos de Telemetría
+=================================
+
+Convierte archivos Parquet/CSV desde disco al formato interno del simulador
+(timestamp, vehicle_id, telemetry_name, telemetry_value):
+
+- Parquet: lectura por row group, solo las 4 columnas requeridas
+- CSV: lectura por chunks, solo las 4 columnas requeridas
+- vehicle_id / telemetry_name como categóricos (mucha menos memoria)
+
+El progreso se reporta con un callback `progress(fraction, rows)`.
+"""
+
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+REQUIRED_COLUMNS = ['timestamp', 'vehicle_id', 'telemetry_name', 'telemetry_value']
+CATEGORICAL_COLUMNS = ['vehicle_id', 'telemetry_name']
+
+# Filas por chunk al leer CSV
+CSV_CHUNK_ROWS = 500_000
+
+
+def parse_timestamps(values):
+    """pd.to_datetime con respaldo elemento a elemento si el formato no es uniforme"""
+    try:
+        return pd.to_datetime(values)
+    except (ValueError, TypeError):
+        return pd.to_datetime(values, format='mixed')
+
+
+def read_parquet_file(path, progress=None):
+    """Lee un Parquet row group a row group (None si faltan columnas)"""
+    schema = pq.read_schema(path)
+    if not all(col in schema.names for col in REQUIRED_COLUMNS):
+        return None
+
+    # Columnas de texto como diccionario (se convierten a categóricos)
+    string_columns = [
+        col for col in CATEGORICAL_COLUMNS
+        if pa.types.is_string(schema.field(col).type) or pa.types.is_large_string(schema.field(col).type)
+    ]
+    parquet_file = pq.ParquetFile(path, read_dictionary=string_columns)
+
+    n_groups = parquet_file.num_row_groups
+    tables = []
+    rows = 0
+    for i in range(n_groups):
+        table = parquet_file.read_row_group(i, columns=REQUIRED_COLUMNS)
+        tables.append(table)
+        rows += table.num_rows
+        if progress:
+            progress((i + 1) / n_groups, rows)
+
+    if len(tables) == 0:
+        return pd.DataFrame(columns=REQUIRED_COLUMNS)
+
+    table = pa.concat_tables(tables)
+    del tables
+    return table.to_pandas(self_destruct=True)
+
+
+def read_csv_file(path, progress=None):
+    """Lee un CSV por chunks (None si faltan columnas)"""
+    header = pd.read_csv(path, nrows=0).columns
+    if not all(col in header for col in REQUIRED_COLUMNS):
+        return None
+
+    total_bytes = max(os.path.getsize(path), 1)
+    chunks = []
+    rows = 0
+
+    with open(path, 'rb') as handle:
+        for chunk in pd.read_csv(handle, usecols=REQUIRED_COLUMNS, chunksize=CSV_CHUNK_ROWS):
+            # Liberar los strings de cada chunk lo antes posible
+            chunk['timestamp'] = parse_timestamps(chunk['timestamp'])
+            for col in CATEGORICAL_COLUMNS:
+                chunk[col] = chunk[col].astype('category')
+
+            chunks.append(chunk)
+            rows += len(chunk)
+            if progress:
+                progress(min(handle.tell() / total_bytes, 1.0), rows)
+
+    if len(chunks) == 0:
+        return pd.DataFrame(columns=REQUIRED_COLUMNS)
+
+    # Mismas categorías en todos los chunks para que concat conserve el tipo
+    for col in CATEGORICAL_COLUMNS:
+        categories = pd.Index([])
+        for chunk in chunks:
+            categories = categories.union(chunk[col].cat.categories)
+        for chunk in chunks:
+            chunk[col] = chunk[col].cat.set_categories(categories)
+
+    return pd.concat(chunks, ignore_index=True)
+
+
+def finalize_telemetry(df):
+    """Tipos y orden del formato interno: timestamp datetime y filas ordenadas por tiempo"""
+    df['timestamp'] = parse_timestamps(df['timestamp'])
+
+    # Categorías en orden alfabético (mismo orden que groupby sobre strings)
+    for col in CATEGORICAL_COLUMNS:
+        values = df[col].astype('category').cat.remove_unused_categories()
+        df[col] = values.cat.reorder_categories(sorted(values.cat.categories))
+
+    df = df.sort_values('timestamp').reset_index(drop=True)
+
+    return df
+
+
+def read_telemetry_file(path, filename=None, progress=None):
+    """
+    Lee un archivo de telemetría desde disco al formato interno.
+
+    Args:
+        path: Ruta del archivo
+        filename: Nombre original (define el formato si path no tiene extensión)
+        progress: Callback opcional progress(fraction, rows)
+
+    Returns:
+        DataFrame ordenado por timestamp, o None si el formato es inválido
+    """
+    name = str(filename or path).lower()
+
+    try:
+        if name.endswith('.parquet'):
+            df = read_parquet_file(path, progress)
+        elif name.endswith('.csv'):
+            df = read_csv_file(path, progress)
+        else:
+            return None
+
+        if df is None:
+            return None
+
+        return finalize_telemetry(df)
+    except Exception as e:
+        print(f"Error parsing file: {e}")
+        return None
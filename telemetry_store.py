@@ -0,0 +1,146 @@
+"""
+Almacén Columnar de Telemetría
+==============================
+
+Pivota una sola vez (al cargar el archivo) el formato long
+(timestamp, vehicle_id, telemetry_name, telemetry_value) a arrays NumPy
+por vehículo y canal. Cada serie guarda sus timestamps ordenados (int64 ns),
+sus valores y la fila original del DataFrame, de modo que las gráficas, el
+mapa y las tarjetas obtienen ventanas con `searchsorted` en lugar de
+recorrer máscaras booleanas sobre millones de filas en cada callback.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def to_ns(timestamp):
+    """Convierte un timestamp (Timestamp, datetime o string ISO) a int64 ns"""
+    return pd.Timestamp(timestamp).value
+
+
+class ChannelSeries:
+    """Serie temporal de un canal para un vehículo"""
+
+    __slots__ = ('timestamps', 'values', 'rows')
+
+    def __init__(self, timestamps, values, rows):
+        self.timestamps = timestamps  # int64 ns, ordenados
+        self.values = values          # float64
+        self.rows = rows              # fila en el DataFrame original (ordenadas)
+
+    def __len__(self):
+        return len(self.values)
+
+    def upto(self, index):
+        """Muestras con fila <= index (equivale a df.index <= current_index)"""
+        stop = np.searchsorted(self.rows, index, side='right')
+        return ChannelSeries(self.timestamps[:stop], self.values[:stop], self.rows[:stop])
+
+    def between(self, start_ns, end_ns):
+        """Muestras con start_ns <= timestamp <= end_ns"""
+        start = np.searchsorted(self.timestamps, start_ns, side='left')
+        stop = np.searchsorted(self.timestamps, end_ns, side='right')
+        return ChannelSeries(self.timestamps[start:stop], self.values[start:stop], self.rows[start:stop])
+
+    def last_before(self, ns):
+        """Posición de la última muestra con timestamp <= ns (-1 si no hay)"""
+        return int(np.searchsorted(self.timestamps, ns, side='right')) - 1
+
+
+_EMPTY_SERIES = ChannelSeries(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype=np.int64))
+
+
+class TelemetryStore:
+    """Telemetría en formato ancho: un ChannelSeries por (vehículo, canal)"""
+
+    def __init__(self, df):
+        # Códigos categóricos de vehículo y canal (orden alfabético, igual que groupby)
+        vehicle_codes, vehicles = pd.factorize(df['vehicle_id'], sort=True)
+        channel_codes, channels = pd.factorize(df['telemetry_name'], sort=True)
+        self.vehicles = pd.Index(np.asarray(vehicles))
+        self.channels = pd.Index(np.asarray(channels))
+
+        self.vehicle_codes = vehicle_codes.astype(np.int32)
+        self.channel_codes = channel_codes.astype(np.int32)
+
+        # Columnas a nivel de fila (vistas sobre el DataFrame, sin copia)
+        self.timestamps = pd.DatetimeIndex(df['timestamp']).as_unit('ns').asi8
+        self.values = df['telemetry_value'].to_numpy(dtype=np.float64)
+        self.tz = getattr(df['timestamp'].dtype, 'tz', None)
+
+        self._vehicle_index = {vehicle_id: i for i, vehicle_id in enumerate(self.vehicles)}
+        self._channel_index = {channel: i for i, channel in enumerate(self.channels)}
+        self._aligned_cache = {}
+
+        # Agrupar filas por celda (vehículo, canal). El orden estable conserva
+        # el orden temporal dentro de cada celda. Las series excluyen valores
+        # NaN (igual que los agregados de pandas con skipna).
+        n_channels = len(self.channels)
+        n_cells = len(self.vehicles) * n_channels
+        cells = self.vehicle_codes.astype(np.int64) * n_channels + self.channel_codes
+        valid = np.flatnonzero(~np.isnan(self.values))
+        order = valid[np.argsort(cells[valid], kind='stable')]
+        bounds = np.searchsorted(cells[order], np.arange(n_cells + 1))
+
+        row_dtype = np.int32 if len(df) < np.iinfo(np.int32).max else np.int64
+        grouped_timestamps = self.timestamps[order]
+        grouped_values = self.values[order]
+        grouped_rows = order.astype(row_dtype)
+
+        self._series = {}
+        for cell in range(n_cells):
+            start, stop = bounds[cell], bounds[cell + 1]
+            if stop > start:
+                vehicle, channel = divmod(cell, n_channels)
+                self._series[(vehicle, channel)] = ChannelSeries(
+                    grouped_timestamps[start:stop],
+                    grouped_values[start:stop],
+                    grouped_rows[start:stop]
+                )
+
+        # Máximo por canal (p.ej. longitud de pista a partir de lap_distance)
+        self._channel_max = {}
+        for (vehicle, channel), series in self._series.items():
+            self._channel_max[channel] = max(self._channel_max.get(channel, -np.inf), series.values.max())
+
+    def series(self, vehicle_id, channel):
+        """Serie completa de un canal para un vehículo (vacía si no existe)"""
+        vehicle = self._vehicle_index.get(vehicle_id)
+        channel_code = self._channel_index.get(channel)
+        if vehicle is None or channel_code is None:
+            return _EMPTY_SERIES
+        return self._series.get((vehicle, channel_code), _EMPTY_SERIES)
+
+    def aligned(self, vehicle_id, channels):
+        """
+        Varios canales de un vehículo alineados por timestamp (int64 ns).
+        Equivale a pivot_table(index='timestamp', columns='telemetry_name')
+        para ese vehículo; el resultado se cachea porque los datos no cambian.
+        """
+        key = (vehicle_id, tuple(channels))
+        if key not in self._aligned_cache:
+            columns = {}
+            for channel in channels:
+                series = self.series(vehicle_id, channel)
+                columns[channel] = pd.Series(series.values, index=series.timestamps).groupby(level=0).mean()
+            self._aligned_cache[key] = pd.DataFrame(columns)
+        return self._aligned_cache[key]
+
+    def channel_max(self, channel, default=None):
+        """Valor máximo de un canal en toda la carrera"""
+        channel_max = self._channel_max.get(self._channel_index.get(channel))
+        if channel_max is None:
+            return default
+        return float(channel_max)
+
+    def timestamp_at(self, index):
+        """Timestamp (int64 ns) de la fila index"""
+        return int(self.timestamps[index])
+
+    def to_datetime(self, ns):
+        """Convierte int64 ns a DatetimeIndex con la zona horaria original"""
+        index = pd.DatetimeIndex(np.asarray(ns, dtype=np.int64).view('datetime64[ns]'))
+        if self.tz is not None:
+            index = index.tz_localize('UTC').tz_convert(self.tz)
+        return index
@@ -0,0 +1,131 @@
+"""
+Geometría del Circuito
+======================
+
+El mapa GPS se divide en una parte fija y una parte móvil. La fija es la línea
+de carrera de cada vehículo: se calcula una sola vez por carrera y se
+simplifica con Douglas–Peucker, con una tolerancia relativa al tamaño del
+circuito (las coordenadas de los archivos no siempre están en grados). La
+móvil es la posición de cada auto en el tick: un searchsorted sobre los
+timestamps GPS de cada vehículo.
+
+Así la figura base del mapa se envía una vez y cada tick solo mueve los
+marcadores.
+"""
+
+import numpy as np
+
+# Tolerancia de simplificación como fracción de la diagonal del circuito
+# (0.2% ≈ 3 m en un circuito de 1.5 km, por debajo del ancho de la pista)
+TOLERANCE = 0.002
+
+
+def douglas_peucker(x, y, tolerance):
+    """
+    Simplificación Douglas–Peucker de una polilínea.
+
+    Args:
+        x, y: Coordenadas (mismas unidades que tolerance)
+        tolerance: Distancia máxima de un punto descartado a la línea simplificada
+
+    Returns:
+        Máscara booleana de los puntos que se conservan (siempre el primero y el último)
+    """
+    n = len(x)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        px = x[first + 1:last] - x[first]
+        py = y[first + 1:last] - y[first]
+        dx = x[last] - x[first]
+        dy = y[last] - y[first]
+        length = np.hypot(dx, dy)
+
+        # Distancia a la recta (o al punto si el segmento es degenerado, p.ej. vuelta cerrada)
+        if length > 0:
+            distance = np.abs(px * dy - py * dx) / length
+        else:
+            distance = np.hypot(px, py)
+
+        farthest = int(np.argmax(distance))
+        if distance[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+
+    return keep
+
+
+class TrackGeometry:
+    """
+    Líneas de carrera simplificadas y posición GPS por vehículo.
+
+    Se construye una vez al cargar la carrera a partir del TelemetryStore
+    (lat/lon alineados por timestamp).
+    """
+
+    def __init__(self, store, tolerance=TOLERANCE):
+        self.vehicles = []
+        self.lines = {}        # vehicle_id -> (lat, lon) simplificados
+        self._timestamps = {}  # vehicle_id -> int64 ns de cada muestra GPS
+        self._positions = {}   # vehicle_id -> (lat, lon) de cada muestra GPS
+
+        if 'latitude' not in store.channels or 'longitude' not in store.channels:
+            return
+
+        for vehicle_id in store.vehicles:
+            vehicle_gps = store.aligned(vehicle_id, ['latitude', 'longitude'])
+            if len(vehicle_gps) == 0:
+                continue
+
+            lat = vehicle_gps['latitude'].to_numpy(dtype=np.float64)
+            lon = vehicle_gps['longitude'].to_numpy(dtype=np.float64)
+            self.vehicles.append(vehicle_id)
+            self._timestamps[vehicle_id] = vehicle_gps.index.to_numpy(dtype=np.int64)
+            self._positions[vehicle_id] = (lat, lon)
+
+            # La línea solo usa muestras con lat y lon
+            valid = ~(np.isnan(lat) | np.isnan(lon))
+            line_lat, line_lon = lat[valid], lon[valid]
+            if len(line_lat) > 0:
+                # Longitud escalada por cos(lat) para que ambos ejes midan lo mismo
+                y = line_lat
+                x = line_lon * np.cos(np.radians(np.mean(line_lat)))
+                extent = np.hypot(np.ptp(x), np.ptp(y))
+                keep = douglas_peucker(x, y, tolerance * extent)
+                line_lat, line_lon = line_lat[keep], line_lon[keep]
+            self.lines[vehicle_id] = (line_lat, line_lon)
+
+        if self.vehicles:
+            all_lat = np.concatenate([self._positions[v][0] for v in self.vehicles])
+            all_lon = np.concatenate([self._positions[v][1] for v in self.vehicles])
+            self.center = (float(np.nanmean(all_lat)), float(np.nanmean(all_lon)))
+        else:
+            self.center = None
+
+    def __len__(self):
+        return len(self.vehicles)
+
+    def positions(self, ns):
+        """
+        Última muestra GPS de cada vehículo con timestamp <= ns.
+
+        Returns:
+            {vehicle_id: (lat, lon)} de los vehículos que ya tienen muestra
+        """
+        positions = {}
+        for vehicle_id in self.vehicles:
+            i = int(np.searchsorted(self._timestamps[vehicle_id], ns, side='right')) - 1
+            if i >= 0:
+                lat, lon = self._positions[vehicle_id]
+                positions[vehicle_id] = (float(lat[i]), float(lon[i]))
+        return positions
@@ -0,0 +1,296 @@
+"""
+Subida de Telemetría por Bloques
+================================
+
+Endpoints Flask para subir archivos grandes por bloques (reanudables),
+escribiendo directo a disco en TEMP_DIR. Evita el camino de dcc.Upload
+(base64 → bytes → BytesIO → pandas), que mantenía el archivo ~4 veces en
+memoria. Al completar la subida, el archivo se procesa en segundo plano con
+telemetry_io (parquet por row group, CSV por chunks) y el progreso queda
+disponible para el navegador.
+
+El estado de cada subida vive en disco (<upload_id>.json junto al .part) y
+el resultado se guarda como Arrow IPC (<upload_id>.arrow), de modo que con
+varios workers de gunicorn cada bloque, el status y la carga final pueden
+caer en workers distintos. Las subidas abandonadas (sin bloques nuevos o con
+el resultado sin reclamar por más de UPLOAD_MAX_AGE_SECONDS) se borran al
+iniciar y al empezar cada subida nueva.
+
+Endpoints (UPLOAD_URL = '/upload'):
+    GET  /upload/status/<upload_id>    bytes recibidos, etapa y progreso
+    POST /upload/chunk/<upload_id>     bloque binario en ?offset=&size=&filename=
+    POST /upload/complete/<upload_id>  inicia el procesamiento del archivo
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+from dash import dcc, html
+import dash_bootstrap_components as dbc
+from flask import jsonify, request
+import pyarrow.feather as feather
+
+from telemetry_io import read_telemetry_file
+
+UPLOAD_URL = '/upload'
+ALLOWED_EXTENSIONS = ('.parquet', '.csv')
+MAX_UPLOAD_BYTES = 2 * 1024**3  # 2 GB
+
+# Edad (desde la última escritura) a partir de la cual una subida se considera abandonada
+UPLOAD_MAX_AGE_SECONDS = 6 * 3600
+
+# Bloque de copia request → disco
+_COPY_BLOCK = 1024 * 1024
+_UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+
+# Estado de una subida (<upload_id>.json): stage, filename, size, progress, rows, error
+_uploads_lock = threading.Lock()
+_upload_dir = None
+
+
+def _part_path(upload_id):
+    return _upload_dir / f"{upload_id}.part"
+
+
+def _state_path(upload_id):
+    return _upload_dir / f"{upload_id}.json"
+
+
+def _result_path(upload_id):
+    return _upload_dir / f"{upload_id}.arrow"
+
+
+def _received_bytes(upload_id):
+    path = _part_path(upload_id)
+    return path.stat().st_size if path.exists() else 0
+
+
+def _read_state(upload_id):
+    try:
+        return json.loads(_state_path(upload_id).read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return None
+
+
+def _write_state(upload_id, upload):
+    """Escritura atómica: los demás workers leen el estado completo o el anterior"""
+    path = _state_path(upload_id)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(upload), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def sweep_uploads(max_age=UPLOAD_MAX_AGE_SECONDS, now=None):
+    """
+    Borra las subidas abandonadas: todos los archivos de un upload_id
+    (.part, .json, .ingest, .arrow, temporales) cuando el más reciente tiene
+    más de max_age segundos.
+
+    Returns:
+        Cantidad de subidas borradas
+    """
+    if _upload_dir is None:
+        return 0
+    now = time.time() if now is None else now
+
+    latest = {}
+    files = {}
+    for path in _upload_dir.iterdir():
+        upload_id = path.name.split('.', 1)[0]
+        if not _UPLOAD_ID.match(upload_id):
+            continue
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        latest[upload_id] = max(latest.get(upload_id, 0), mtime)
+        files.setdefault(upload_id, []).append(path)
+
+    stale = [upload_id for upload_id, mtime in latest.items() if now - mtime > max_age]
+    for upload_id in stale:
+        for path in files[upload_id]:
+            path.unlink(missing_ok=True)
+    return len(stale)
+
+
+def _ingest(upload_id, upload, path):
+    """Procesa el archivo subido en segundo plano"""
+    def report(fraction, rows):
+        upload['progress'] = fraction
+        upload['rows'] = rows
+        _write_state(upload_id, upload)
+
+    try:
+        df = read_telemetry_file(path, upload['filename'], progress=report)
+        if df is None:
+            upload['error'] = "Formato inválido"
+            upload['stage'] = 'error'
+        else:
+            result = _result_path(upload_id)
+            tmp = result.with_name(f"{result.name}.{os.getpid()}.tmp")
+            feather.write_feather(df, tmp, compression='uncompressed')
+            os.replace(tmp, result)
+            upload['progress'] = 1.0
+            upload['rows'] = len(df)
+            upload['stage'] = 'ready'
+    except Exception as e:
+        upload['error'] = str(e)
+        upload['stage'] = 'error'
+    finally:
+        path.unlink(missing_ok=True)
+        _write_state(upload_id, upload)
+
+
+def register_upload_routes(server, temp_dir):
+    """Registra los endpoints de subida en el servidor Flask de Dash"""
+    global _upload_dir
+    _upload_dir = Path(temp_dir) / "uploads"
+    _upload_dir.mkdir(parents=True, exist_ok=True)
+    sweep_uploads()
+
+    @server.route(f"{UPLOAD_URL}/status/<upload_id>", methods=['GET'])
+    def upload_status(upload_id):
+        if not _UPLOAD_ID.match(upload_id):
+            return jsonify(error="invalid upload id"), 400
+
+        upload = _read_state(upload_id)
+
+        if upload is None:
+            # Subida desconocida: se reanuda desde el .part en disco si existe
+            return jsonify(stage='new', received=_received_bytes(upload_id))
+
+        return jsonify(
+            stage=upload['stage'],
+            received=_received_bytes(upload_id) if upload['stage'] == 'uploading' else upload['size'],
+            size=upload['size'],
+            progress=upload['progress'],
+            rows=upload['rows'],
+            error=upload['error']
+        )
+
+    @server.route(f"{UPLOAD_URL}/chunk/<upload_id>", methods=['POST'])
+    def upload_chunk(upload_id):
+        if not _UPLOAD_ID.match(upload_id):
+            return jsonify(error="invalid upload id"), 400
+
+        filename = request.args.get('filename', '')
+        offset = request.args.get('offset', type=int)
+        size = request.args.get('size', type=int)
+
+        if not filename.lower().endswith(ALLOWED_EXTENSIONS):
+            return jsonify(error="only .parquet or .csv files"), 400
+        if offset is None or size is None:
+            return jsonify(error="offset and size are required"), 400
+        if size > MAX_UPLOAD_BYTES:
+            return jsonify(error="file too large"), 413
+
+        with _uploads_lock:
+            upload = _read_state(upload_id)
+            if upload is None:
+                sweep_uploads()
+                upload = {
+                    'stage': 'uploading',
+                    'filename': Path(filename).name,
+                    'size': size,
+                    'progress': 0.0,
+                    'rows': 0,
+                    'error': None
+                }
+                _write_state(upload_id, upload)
+
+        if upload['stage'] != 'uploading':
+            return jsonify(error="upload already completed", stage=upload['stage']), 409
+
+        # Solo se acepta el bloque que continúa el archivo (reanudación por offset)
+        received = _received_bytes(upload_id)
+        if offset != received:
+            return jsonify(error="offset mismatch", received=received), 409
+
+        with open(_part_path(upload_id), 'ab') as f:
+            while True:
+                block = request.stream.read(_COPY_BLOCK)
+                if not block:
+                    break
+                f.write(block)
+                if f.tell() > upload['size']:
+                    f.truncate(received)
+                    return jsonify(error="chunk exceeds declared size", received=received), 413
+
+        return jsonify(received=_received_bytes(upload_id))
+
+    @server.route(f"{UPLOAD_URL}/complete/<upload_id>", methods=['POST'])
+    def upload_complete(upload_id):
+        if not _UPLOAD_ID.match(upload_id):
+            return jsonify(error="invalid upload id"), 400
+
+        upload = _read_state(upload_id)
+        if upload is None or upload['stage'] != 'uploading':
+            return jsonify(error="unknown upload"), 404
+
+        received = _received_bytes(upload_id)
+        if received != upload['size']:
+            return jsonify(error="upload incomplete", received=received), 409
+
+        # Reclamar el archivo con un rename atómico: un solo worker lo procesa
+        path = _part_path(upload_id).with_suffix('.ingest')
+        try:
+            os.replace(_part_path(upload_id), path)
+        except FileNotFoundError:
+            return jsonify(error="unknown upload"), 404
+
+        upload['stage'] = 'ingesting'
+        _write_state(upload_id, upload)
+
+        threading.Thread(target=_ingest, args=(upload_id, upload, path), daemon=True).start()
+
+        return jsonify(stage='ingesting')
+
+
+def take_ingested(upload_id):
+    """
+    Entrega y libera el DataFrame de una subida ya procesada.
+
+    Returns:
+        (df, filename) o (None, filename) si la subida no está lista
+    """
+    if _upload_dir is None or not _UPLOAD_ID.match(upload_id or ''):
+        return None, None
+
+    upload = _read_state(upload_id)
+    if upload is None:
+        return None, None
+    if upload['stage'] != 'ready':
+        return None, upload['filename']
+
+    result = _result_path(upload_id)
+    try:
+        df = feather.read_feather(result, memory_map=False)
+    except FileNotFoundError:
+        return None, upload['filename']  # ya entregada
+
+    result.unlink(missing_ok=True)
+    _state_path(upload_id).unlink(missing_ok=True)
+    return df, upload['filename']
+
+
+def upload_area(children, style):
+    """
+    Zona de subida (click o drag & drop) + barra de progreso.
+
+    El script assets/chunked_upload.js envía el archivo por bloques y, al
+    terminar, escribe {'upload_id', 'filename'} en el Store 'chunked-upload-result'.
+    """
+    return html.Div([
+        html.Div(
+            children,
+            className='chunked-upload-zone',
+            style={**style, 'cursor': 'pointer'},
+            **{'data-upload-url': UPLOAD_URL, 'data-accept': ','.join(ALLOWED_EXTENSIONS)}
+        ),
+        dbc.Progress(id='chunked-upload-progress', value=0, className='mt-2', style={'display': 'none'}),
+        dcc.Store(id='chunked-upload-result')
+    ])
@@ -0,0 +1,210 @@
+"""
+Conversión Wide → Long
+======================
+
+Los archivos procesados tienen una columna por canal (formato wide); el
+simulador usa una fila por (timestamp, vehículo, canal) en formato long:
+(timestamp, vehicle_id, telemetry_name, telemetry_value).
+
+La conversión es vectorizada por batch: los canales de un batch se apilan en
+una matriz NumPy (filas × canales), se aplanan fila por fila (mismo orden que
+recorrer fila a fila) y se descartan los NaN. vehicle_id y telemetry_name se
+escriben como diccionario. Cada batch se escribe como row group del Parquet de
+salida, así la memoria queda acotada por BATCH_ROWS sin importar el tamaño
+del archivo.
+
+Uso:
+    python wide_to_long.py entrada.parquet salida.parquet --vehicle GR86-FASTEST --every 3
+    python wide_to_long.py entrada.csv salida.parquet --channel Steering_Angle=throttle --minutes VBOX_Lat_Min
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+# Columna origen -> telemetry_name (en el orden de salida de cada fila)
+DEFAULT_CHANNELS = {
+    'VBOX_Lat_Min': 'latitude',
+    'VBOX_Long_Minutes': 'longitude',
+    'speed': 'speed',
+    'gear': 'gear',
+    'nmot': 'nmot',
+    'Steering_Angle': 'throttle',  # Steering como proxy de throttle
+    'pbrake_f': 'brake'  # Freno delantero
+}
+
+# Columnas GPS en minutos (se convierten a grados)
+MINUTE_COLUMNS = ('VBOX_Lat_Min', 'VBOX_Long_Minutes')
+
+DEFAULT_VEHICLE_ID = 'GR86-FASTEST'
+
+# Filas wide por batch (un row group de salida por batch)
+BATCH_ROWS = 1_000_000
+
+
+def melt_batch(batch, channels, vehicle_id, minute_columns=MINUTE_COLUMNS, timestamp_column='timestamp', first_row=0, every=1):
+    """
+    Convierte un batch wide a una tabla long.
+
+    Args:
+        batch: pyarrow RecordBatch/Table con timestamp y columnas de canales
+        channels: dict columna origen -> telemetry_name (las ausentes se ignoran)
+        vehicle_id: vehicle_id de todas las filas
+        minute_columns: Columnas en minutos que se dividen por 60
+        timestamp_column: Columna de tiempo
+        first_row: Índice global de la primera fila del batch (para every)
+        every: Conservar 1 de cada every filas (índice global)
+
+    Returns:
+        pyarrow Table (timestamp, vehicle_id, telemetry_name, telemetry_value)
+    """
+    present = [(source, name) for source, name in channels.items() if source in batch.column_names]
+    names = sorted({name for _, name in present})
+
+    keep = np.arange(-first_row % every, batch.num_rows, every) if every > 1 else None
+
+    timestamps = batch.column(timestamp_column)
+    if keep is not None:
+        timestamps = timestamps.take(pa.array(keep))
+
+    # Matriz filas × canales (NaN donde falta el valor)
+    values = np.empty((len(timestamps), len(present)), dtype=np.float64)
+    for j, (source, _) in enumerate(present):
+        column = batch.column(source).cast(pa.float64()).to_numpy(zero_copy_only=False)
+        if keep is not None:
+            column = column[keep]
+        values[:, j] = column / 60 if source in minute_columns else column
+
+    # Aplanar fila por fila y descartar NaN
+    flat = values.ravel()
+    valid = np.flatnonzero(~np.isnan(flat))
+    rows, cols = np.divmod(valid, max(len(present), 1))
+
+    codes = np.array([names.index(name) for _, name in present], dtype=np.int32)
+    telemetry_name = pa.DictionaryArray.from_arrays(pa.array(codes[cols], type=pa.int32()), pa.array(names, type=pa.string()))
+    vehicle = pa.DictionaryArray.from_arrays(pa.array(np.zeros(len(valid), dtype=np.int32)), pa.array([vehicle_id], type=pa.string()))
+
+    return pa.table({
+        'timestamp': timestamps.take(pa.array(rows)),
+        'vehicle_id': vehicle,
+        'telemetry_name': telemetry_name,
+        'telemetry_value': pa.array(flat[valid], type=pa.float64())
+    })
+
+
+def iter_batches(path, columns, batch_rows=BATCH_ROWS):
+    """Batches del archivo wide (Parquet o CSV) con solo las columnas pedidas"""
+    path = Path(path)
+    if path.suffix.lower() == '.csv':
+        header = pacsv.open_csv(path).schema.names
+        options = pacsv.ConvertOptions(include_columns=[c for c in columns if c in header])
+        reader = pacsv.open_csv(path, convert_options=options, read_options=pacsv.ReadOptions(block_size=64 << 20))
+        yield from reader
+    else:
+        parquet_file = pq.ParquetFile(path)
+        available = parquet_file.schema_arrow.names
+        yield from parquet_file.iter_batches(batch_size=batch_rows, columns=[c for c in columns if c in available])
+
+
+def convert(input_path, output_path, channels=None, vehicle_id=DEFAULT_VEHICLE_ID, every=1,
+            minute_columns=MINUTE_COLUMNS, timestamp_column='timestamp', batch_rows=BATCH_ROWS, progress=None):
+    """
+    Convierte un archivo wide a Parquet long, batch por batch.
+
+    Args:
+        input_path: Parquet o CSV wide
+        output_path: Parquet de salida (snappy, un row group por batch)
+        channels: dict columna origen -> telemetry_name (DEFAULT_CHANNELS si es None)
+        vehicle_id: vehicle_id de todas las filas
+        every: Downsample, 1 de cada every filas wide
+        minute_columns: Columnas GPS en minutos (se convierten a grados)
+        timestamp_column: Columna de tiempo
+        batch_rows: Filas wide por batch
+        progress: Callback opcional progress(rows_in, rows_out)
+
+    Returns:
+        dict con rows_in, rows_out, channels {telemetry_name: filas}, start y end
+    """
+    channels = DEFAULT_CHANNELS if channels is None else channels
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    summary = {'rows_in': 0, 'rows_out': 0, 'channels': {}, 'start': None, 'end': None}
+    writer = None
+    try:
+        for batch in iter_batches(input_path, [timestamp_column, *channels], batch_rows):
+            table = melt_batch(batch, channels, vehicle_id, minute_columns, timestamp_column,
+                               first_row=summary['rows_in'], every=every)
+            summary['rows_in'] += batch.num_rows
+
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, table.schema, compression='snappy')
+            writer.write_table(table, row_group_size=max(table.num_rows, 1))
+
+            summary['rows_out'] += table.num_rows
+            if table.num_rows > 0:
+                counts = table.column('telemetry_name').combine_chunks().value_counts()
+                for entry in counts.to_pylist():
+                    name = entry['values']
+                    summary['channels'][name] = summary['channels'].get(name, 0) + entry['counts']
+                bounds = pc.min_max(table.column('timestamp')).as_py()
+                summary['start'] = bounds['min'] if summary['start'] is None else min(summary['start'], bounds['min'])
+                summary['end'] = bounds['max'] if summary['end'] is None else max(summary['end'], bounds['max'])
+
+            if progress:
+                progress(summary['rows_in'], summary['rows_out'])
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return summary
+
+
+def parse_channels(values):
+    """['col=name', ...] -> dict (None si no se pasó ninguno)"""
+    if not values:
+        return None
+    channels = {}
+    for value in values:
+        source, _, name = value.partition('=')
+        channels[source] = name or source
+    return channels
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convierte telemetría wide (una columna por canal) al formato long del simulador")
+    parser.add_argument('input', help="Parquet o CSV wide")
+    parser.add_argument('output', help="Parquet long de salida")
+    parser.add_argument('--vehicle', default=DEFAULT_VEHICLE_ID, help="vehicle_id de las filas")
+    parser.add_argument('--channel', action='append', metavar='COLUMNA=NOMBRE',
+                        help="Canal a convertir (repetible; por defecto DEFAULT_CHANNELS)")
+    parser.add_argument('--minutes', action='append', metavar='COLUMNA',
+                        help=f"Columna GPS en minutos (repetible; por defecto {', '.join(MINUTE_COLUMNS)})")
+    parser.add_argument('--every', type=int, default=1, help="Conservar 1 de cada N filas")
+    parser.add_argument('--timestamp', default='timestamp', help="Columna de tiempo")
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS, help="Filas wide por batch / row group")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+
+    def progress(rows_in, rows_out):
+        print(f"  {rows_in:,} filas wide -> {rows_out:,} filas long", end='\r')
+
+    summary = convert(args.input, args.output, parse_channels(args.channel), args.vehicle, max(1, args.every),
+                      tuple(args.minutes) if args.minutes else MINUTE_COLUMNS, args.timestamp, args.batch_rows, progress)
+
+    print(f"\n[OK] {args.output}: {summary['rows_out']:,} registros en {time.perf_counter() - start:.1f}s")
+    for name, count in sorted(summary['channels'].items()):
+        print(f"     {name}: {count:,}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
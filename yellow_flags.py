@@ -0,0 +1,220 @@
+"""
+Detección de Yellow Flags
+=========================
+
+Detector vectorizado (NumPy) compartido por los simuladores y los scripts
+create_*. Promedia la velocidad en ventanas fijas de tiempo y busca rachas
+de ventanas por debajo del umbral; una racha cuenta como Yellow Flag si
+dura al menos `min_duration` segundos y termina antes del final de los
+datos (desde la primera ventana lenta hasta la primera ventana rápida).
+
+Ventanas sin velocidad válida (NaN) no cambian el estado de la racha.
+"""
+
+import numpy as np
+import pandas as pd
+
+SPEED_THRESHOLD = 50  # km/h
+WINDOW_SECONDS = 5
+MIN_DURATION = 30  # segundos
+
+
+def find_runs(groups, slow, fast):
+    """
+    Rachas lentas terminadas dentro de cada grupo.
+
+    Args:
+        groups: Código de grupo por ventana (ventanas ordenadas por grupo y tiempo)
+        slow: Ventana por debajo del umbral
+        fast: Ventana en o por encima del umbral (ni slow ni fast = sin dato)
+
+    Returns:
+        (start, end): posiciones de la primera ventana lenta y de la primera
+        ventana rápida que cierra cada racha
+    """
+    n = len(groups)
+    if n == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    group_start = np.ones(n, dtype=bool)
+    group_start[1:] = groups[1:] != groups[:-1]
+
+    # Estado por ventana con forward-fill de las ventanas sin dato (cada grupo empieza fuera de racha)
+    known = slow | fast | group_start
+    last_known = np.maximum.accumulate(np.where(known, np.arange(n), 0))
+    state = slow[last_known]
+
+    changed = group_start.copy()
+    changed[1:] |= state[1:] != state[:-1]
+    changes = np.flatnonzero(changed)
+
+    # Cada inicio de racha se cierra con el siguiente cambio de estado del mismo grupo
+    is_start = state[changes]
+    has_next = np.zeros(len(changes), dtype=bool)
+    has_next[:-1] = ~group_start[changes[1:]]
+    closed = is_start & has_next
+
+    start = changes[closed]
+    end = changes[np.flatnonzero(closed) + 1]
+    return start, end
+
+
+def detect_yellow_flags(df, speed_threshold=SPEED_THRESHOLD, window_seconds=WINDOW_SECONDS,
+                        min_duration=MIN_DURATION, by_vehicle=False, window_origin='epoch'):
+    """
+    Detecta períodos de Yellow Flag en telemetría en formato largo.
+
+    Args:
+        df: DataFrame (timestamp, vehicle_id, telemetry_name, telemetry_value)
+        speed_threshold: Velocidad promedio (km/h) bajo la cual la ventana es lenta
+        window_seconds: Tamaño de la ventana de promedio
+        min_duration: Duración mínima (segundos) de una Yellow Flag
+        by_vehicle: Detectar por vehículo (agrega 'vehicle_id' a cada período)
+        window_origin: 'epoch' (ventanas alineadas al reloj, inicio/fin = borde
+            de la ventana) o 'start' (ventanas desde la primera muestra de cada
+            grupo, inicio/fin = primera muestra de la ventana; scripts create_*)
+
+    Returns:
+        Lista de dicts {'start', 'end', 'duration'} ordenada por (vehículo,) inicio
+    """
+    speed_data = df.loc[df['telemetry_name'] == 'speed', ['timestamp', 'vehicle_id', 'telemetry_value']]
+    if len(speed_data) == 0:
+        return []
+
+    timestamps = speed_data['timestamp']
+    if window_origin == 'start':
+        group_keys = speed_data['vehicle_id'] if by_vehicle else np.zeros(len(speed_data), dtype=np.intp)
+        origin = timestamps.groupby(group_keys, observed=True).transform('min')
+        window = (timestamps - origin) // pd.Timedelta(seconds=window_seconds)
+    else:
+        window = timestamps.dt.floor(f"{window_seconds}s")
+
+    keys = [speed_data['vehicle_id'], window] if by_vehicle else [window]
+    grouped = speed_data.groupby(keys, sort=True, observed=True)
+    avg_speed = grouped['telemetry_value'].mean()
+
+    if window_origin == 'start':
+        windows = pd.DatetimeIndex(grouped['timestamp'].min())
+    elif by_vehicle:
+        windows = pd.DatetimeIndex(avg_speed.index.get_level_values(1))
+    else:
+        windows = pd.DatetimeIndex(avg_speed.index)
+
+    if by_vehicle:
+        vehicles = avg_speed.index.get_level_values(0)
+        groups = pd.factorize(vehicles)[0]
+    else:
+        vehicles = None
+        groups = np.zeros(len(avg_speed), dtype=np.intp)
+
+    speeds = avg_speed.to_numpy(dtype=np.float64)
+    start, end = find_runs(groups, speeds < speed_threshold, speeds >= speed_threshold)
+
+    durations = (windows[end] - windows[start]).total_seconds()
+    keep = durations >= min_duration
+    start, end, durations = start[keep], end[keep], durations[keep]
+
+    yellow_periods = []
+    for i in range(len(start)):
+        period = {
+            'start': windows[start[i]],
+            'end': windows[end[i]],
+            'duration': float(durations[i])
+        }
+        if by_vehicle:
+            period['vehicle_id'] = vehicles[start[i]]
+        yellow_periods.append(period)
+
+    return yellow_periods
+
+
+def period_statistics(store, vehicles, start_ns, end_ns):
+    """
+    Velocidad, freno y aceleración de uno o varios vehículos durante un período.
+
+    Args:
+        store: TelemetryStore de la carrera
+        vehicles: Vehículos a agregar juntos
+        start_ns, end_ns: Rango de tiempo inclusivo en ns
+
+    Returns:
+        Dict de agregados (None en los canales sin muestras)
+    """
+    def values(channel):
+        arrays = [store.series(vehicle_id, channel).between(start_ns, end_ns).values for vehicle_id in vehicles]
+        return arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+
+    speed = values('speed')
+    brake = values('brake_front')
+    acc_x = values('acc_x')
+    acc_y = values('acc_y')
+
+    return {
+        'samples': len(speed),
+        'min_speed': speed.min() if len(speed) > 0 else None,
+        'avg_speed': speed.mean() if len(speed) > 0 else None,
+        'speed_variance': speed.var() if len(speed) > 0 else None,
+        'avg_brake': brake.mean() if len(brake) > 0 else None,
+        'max_brake': brake.max() if len(brake) > 0 else None,
+        'avg_abs_acc_x': np.abs(acc_x).mean() if len(acc_x) > 0 else None,
+        'avg_abs_acc_y': np.abs(acc_y).mean() if len(acc_y) > 0 else None
+    }
+
+
+class YellowFlagIndex:
+    """
+    Índice de intervalos de Yellow Flags (inicio/fin en int64 ns, ordenados).
+
+    Se construye una vez al cargar la carrera; las consultas por tick son una
+    búsqueda binaria. Los timestamps de cada período se parsean una sola vez
+    (acepta pd.Timestamp o strings ISO del dcc.Store).
+
+    Con `store`, cada período guarda además sus estadísticas precalculadas:
+    'vehicle_stats' {vehicle_id: agregados} y 'field_stats' (todos los
+    vehículos juntos), para que las features del modelo sean consultas.
+    """
+
+    def __init__(self, yellow_flags, store=None):
+        flags = [
+            {**yf, 'start': pd.Timestamp(yf['start']), 'end': pd.Timestamp(yf['end'])}
+            for yf in yellow_flags
+        ]
+        flags.sort(key=lambda yf: yf['start'])
+
+        self.flags = flags
+        self.starts = np.array([yf['start'].value for yf in flags], dtype=np.int64)
+        self.ends = np.array([yf['end'].value for yf in flags], dtype=np.int64)
+
+        if store is not None:
+            vehicles = list(store.vehicles)
+            for yf, start_ns, end_ns in zip(flags, self.starts, self.ends):
+                yf['vehicle_stats'] = {
+                    vehicle_id: period_statistics(store, [vehicle_id], start_ns, end_ns)
+                    for vehicle_id in vehicles
+                }
+                yf['field_stats'] = period_statistics(store, vehicles, start_ns, end_ns)
+
+    def __len__(self):
+        return len(self.flags)
+
+    def active(self, ns):
+        """
+        Yellow Flag activa en el instante ns (inicio <= ns <= fin).
+
+        Returns:
+            (flag, segundos restantes, inicio en int64 ns: clave de la bandera
+            para cachés) o (None, None, None) si la pista está en verde
+        """
+        i = int(np.searchsorted(self.starts, ns, side='right')) - 1
+        if i < 0 or ns > self.ends[i]:
+            return None, None, None
+        return self.flags[i], int(self.ends[i] - ns) / 1e9, int(self.starts[i])
+
+    def active_positions(self, ns):
+        """Versión vectorizada de active(): posición de la bandera activa en cada ns (-1 en verde)"""
+        ns = np.asarray(ns, dtype=np.int64)
+        positions = np.searchsorted(self.starts, ns, side='right') - 1
+        if len(self.flags) == 0:
+            return positions
+        green = (positions < 0) | (ns > self.ends[np.maximum(positions, 0)])
+        return np.where(green, -1, positions)